@@ -0,0 +1,59 @@
+"""Wall-clock time for N recipes: N serial /from-text calls versus one /batch call.
+
+Start the fake upstream and the API (with RECIPE_CACHE_ENABLED=false so both
+runs pay for every generation, and RATE_LIMIT_ENABLED=false so neither run is
+throttled), then run:
+    python benchmarks/bench_batch.py --base-url http://localhost:8000 --recipes 20
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import httpx
+
+def make_items(count: int, run: str) -> list:
+    return [
+        {"ingredients": ["chicken", "rice", f"garlic {run}-{i}"], "preferences": {"servings": 2}}
+        for i in range(count)
+    ]
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--recipes", type=int, default=20)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=600) as client:
+        credentials = {"email": f"batch-{uuid.uuid4().hex[:8]}@example.com", "password": "bench"}
+        response = await client.post("/api/auth/signup", json=credentials)
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        start = time.perf_counter()
+        serial_errors = 0
+        for item in make_items(args.recipes, "serial"):
+            response = await client.post("/api/recipes/from-text", json=item, headers=headers)
+            serial_errors += response.status_code != 200
+        serial_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/recipes/batch",
+            json={"items": make_items(args.recipes, "batch")},
+            headers=headers
+        )
+        batch_s = time.perf_counter() - start
+        batch = response.json()
+
+        print(json.dumps({
+            "recipes": args.recipes,
+            "serial_s": round(serial_s, 3),
+            "serial_errors": serial_errors,
+            "batch_s": round(batch_s, 3),
+            "batch_failed": batch.get("failed"),
+            "speedup": round(serial_s / batch_s, 2)
+        }, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
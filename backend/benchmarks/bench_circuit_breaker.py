@@ -0,0 +1,127 @@
+"""Request latency and upstream load during an LLM outage, with and without the circuit breaker.
+
+Starts a fake OpenAI server and sends recipe completions at a fixed
+arrival rate through three phases: healthy, an injected outage (every
+completion fails after the usual latency) and recovery. For the outage it
+reports how long callers waited and how many calls reached the upstream;
+with the breaker open they fail fast instead. Recovery shows the
+half-open probes closing the breaker.
+Run from the backend directory:
+    python benchmarks/bench_circuit_breaker.py --requests 200 --rate 20 --latency-ms 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+# One attempt per call, so upstream requests map one to one onto router calls
+os.environ.setdefault("LLM_MAX_RETRIES", "0")
+os.environ.setdefault("LLM_HEDGING_ENABLED", "false")
+os.environ.setdefault("LLM_BREAKER_OPEN_SECONDS", "5")
+
+import httpx  # noqa: E402
+from run import percentile, wait_for_port  # noqa: E402
+
+PORT = 8103
+FAKE_URL = f"http://127.0.0.1:{PORT}"
+
+def start_fake_server(latency_ms: float) -> subprocess.Popen:
+    env = dict(os.environ, FAKE_LLM_LATENCY_MS=str(latency_ms))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+
+async def set_faults(client: httpx.AsyncClient, **faults) -> dict:
+    response = await client.post(f"{FAKE_URL}/fault", json=faults)
+    response.raise_for_status()
+    return response.json()
+
+async def run_phase(name: str, router, client: httpx.AsyncClient, args) -> dict:
+    from services.circuit_breaker import CircuitOpenError
+
+    messages = [{"role": "user", "content": "chicken, rice, garlic"}]
+    latencies = []
+    outcomes = {"ok": 0, "failed": 0, "rejected": 0}
+    await set_faults(client)  # Reset the upstream counters only
+    start = time.perf_counter()
+
+    async def request(index: int):
+        # Open-loop arrivals, like API traffic that keeps coming during an outage
+        await asyncio.sleep(max(index / args.rate - (time.perf_counter() - start), 0))
+        sent = time.perf_counter()
+        try:
+            await router.complete(messages=messages, max_tokens=1000)
+            outcomes["ok"] += 1
+        except CircuitOpenError:
+            outcomes["rejected"] += 1
+        except Exception:
+            outcomes["failed"] += 1
+        latencies.append(time.perf_counter() - sent)
+
+    await asyncio.gather(*(request(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    upstream = (await client.get(f"{FAKE_URL}/fault")).json()
+    latencies.sort()
+    backend = router.backends[0]
+    return {
+        "phase": name,
+        "requests": args.requests,
+        **outcomes,
+        "upstream_calls": upstream["requests"],
+        "upstream_calls_avoided": args.requests - upstream["requests"],
+        "seconds": round(elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "breaker": backend.breaker.stats()
+    }
+
+async def run_mode(breaker: bool, client: httpx.AsyncClient, args) -> list:
+    from services import llm_router
+
+    llm_router.LLM_BREAKER_ENABLED = breaker
+    router = llm_router.LLMRouter("recipe", llm_router.parse_routes(f"gpt-3.5-turbo@{FAKE_URL}/v1"))
+    label = "breaker" if breaker else "no_breaker"
+
+    await set_faults(client, error_rate=0.0)
+    phases = [await run_phase(f"{label}:healthy", router, client, args)]
+    await set_faults(client, error_rate=1.0)
+    phases.append(await run_phase(f"{label}:outage", router, client, args))
+    await set_faults(client, error_rate=0.0)
+    if breaker:
+        # Let the open period run out so the next calls are half-open probes
+        await asyncio.sleep(router.backends[0].breaker.retry_after())
+    phases.append(await run_phase(f"{label}:recovery", router, client, args))
+    return phases
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20, help="requests per second")
+    parser.add_argument("--latency-ms", type=float, default=2000)
+    args = parser.parse_args()
+
+    server = start_fake_server(args.latency_ms)
+    try:
+        wait_for_port(PORT)
+        from services.llm_client import close_llm_client
+
+        async with httpx.AsyncClient() as client:
+            results = [*await run_mode(False, client, args), *await run_mode(True, client, args)]
+        await close_llm_client()
+        print(json.dumps(results, indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
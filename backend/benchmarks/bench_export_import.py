@@ -0,0 +1,120 @@
+"""Throughput and memory ceiling of NDJSON import and export.
+
+Imports --recipes generated recipes for one user from a lazily produced
+upload stream, then exports them back, against a real MongoDB. Reports
+recipes/s, MB/s and the peak Python heap (tracemalloc) of each phase; the
+peak should not grow with --recipes. Uses a scratch database that is
+dropped afterwards. Run from the backend directory:
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_export_import.py --recipes 100000
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_export_import.py --recipes 100000 --gzip
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["MONGODB_DB_NAME"] = os.getenv("BENCH_DB_NAME", "recipe_export_bench")
+os.environ.setdefault("RECIPE_INDEX_ENABLED", "false")
+
+from config.database import close_db_connection, ensure_indexes, get_database  # noqa: E402
+from services.recipe_export import export_recipes, import_recipes  # noqa: E402
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+def recipe_line(index: int, start: datetime) -> bytes:
+    created_at = (start + timedelta(seconds=index)).isoformat()
+    return json.dumps({
+        "title": f"Garlic Chicken Rice Bowl {index}",
+        "ingredients": ["2 chicken breasts", "1 cup rice", "3 cloves garlic", "1 tablespoon olive oil"],
+        "instructions": [
+            "Rinse the rice and cook it in two cups of water",
+            "Sear the chicken in olive oil until golden",
+            "Add the garlic and cook until fragrant",
+            "Slice the chicken and serve over the rice"
+        ],
+        "cooking_time": 30,
+        "servings": 2,
+        "calories": 550,
+        "cuisine_type": "Asian",
+        "created_at": created_at,
+        "updated_at": created_at
+    }).encode("utf-8") + b"\n"
+
+async def upload_stream(recipes: int, compress: bool, counter: dict):
+    """Yield the upload in 64 KiB chunks, generated on the fly like a slow client."""
+    start = datetime.utcnow() - timedelta(days=365)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = bytearray()
+    for index in range(recipes):
+        buffer += recipe_line(index, start)
+        if len(buffer) >= UPLOAD_CHUNK_BYTES:
+            chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            counter["bytes"] += len(chunk)
+            yield chunk
+    tail = bytes(buffer)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    counter["bytes"] += len(tail)
+    yield tail
+
+def phase(name: str, recipes: int, transferred: int, elapsed: float, peak: int) -> dict:
+    return {
+        "phase": name,
+        "recipes": recipes,
+        "seconds": round(elapsed, 2),
+        "recipes_per_s": round(recipes / elapsed),
+        "mb_per_s": round(transferred / elapsed / 1e6, 1),
+        "transferred_mb": round(transferred / 1e6, 1),
+        "peak_heap_mb": round(peak / 1e6, 1)
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=100000)
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    user_id = str(ObjectId())
+    results = []
+    try:
+        await ensure_indexes()
+        tracemalloc.start()
+
+        counter = {"bytes": 0}
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        summary = await import_recipes(upload_stream(args.recipes, args.gzip, counter), user_id, args.gzip)
+        elapsed = time.perf_counter() - start
+        results.append({
+            **phase("import", summary["imported"], counter["bytes"], elapsed, tracemalloc.get_traced_memory()[1]),
+            "failed": summary["failed"]
+        })
+
+        exported = 0
+        transferred = 0
+        decompressor = zlib.decompressobj(47) if args.gzip else None
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        async for chunk in export_recipes(user_id, compress=args.gzip):
+            transferred += len(chunk)
+            exported += (decompressor.decompress(chunk) if decompressor else chunk).count(b"\n")
+        elapsed = time.perf_counter() - start
+        results.append(phase("export", exported, transferred, elapsed, tracemalloc.get_traced_memory()[1]))
+        tracemalloc.stop()
+
+        print(json.dumps({"gzip": args.gzip, "results": results}, indent=2))
+    finally:
+        await get_database().client.drop_database(os.environ["MONGODB_DB_NAME"])
+        await close_db_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
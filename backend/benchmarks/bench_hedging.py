@@ -0,0 +1,94 @@
+"""Tail latency of recipe completions with and without hedging.
+
+Starts two fake OpenAI servers with independent log-normal latency, routes
+the recipe task over both and compares latency percentiles and the extra
+spend from hedges. Run from the backend directory:
+    python benchmarks/bench_hedging.py --requests 400 --concurrency 16 --sigma 0.9
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+from run import percentile, wait_for_port  # noqa: E402
+
+PORTS = (8101, 8102)
+
+def start_fake_server(port: int, latency_ms: float, sigma: float) -> subprocess.Popen:
+    env = dict(os.environ, FAKE_LLM_LATENCY_MS=str(latency_ms), FAKE_LLM_LATENCY_SIGMA=str(sigma))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+
+async def run_mode(hedging: bool, args) -> dict:
+    from services import llm_router
+
+    llm_router.LLM_HEDGING_ENABLED = hedging
+    router = llm_router.LLMRouter("recipe", llm_router.parse_routes(
+        ",".join(f"gpt-3.5-turbo@http://127.0.0.1:{port}/v1" for port in PORTS)
+    ))
+    messages = [{"role": "user", "content": "chicken, rice, garlic"}]
+
+    # Enough samples for the primary's p95 to drive the hedge delay
+    await asyncio.gather(*(router.complete(messages=messages, max_tokens=1000) for _ in range(args.warmup)))
+    router.hedges = router.hedge_wins = 0
+    router.primary_cost = router.hedge_cost = 0.0
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            await router.complete(messages=messages, max_tokens=1000)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(request() for _ in range(args.requests)))
+    latencies.sort()
+    return {
+        "hedging": hedging,
+        "requests": args.requests,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "hedges": router.hedges,
+        "hedge_wins": router.hedge_wins,
+        "extra_cost_fraction": round(router.hedge_cost / router.primary_cost, 4) if router.primary_cost else 0.0
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--sigma", type=float, default=0.9)
+    args = parser.parse_args()
+
+    servers = [start_fake_server(port, args.latency_ms, args.sigma) for port in PORTS]
+    try:
+        for port in PORTS:
+            wait_for_port(port)
+        from services.llm_client import close_llm_client
+
+        results = [await run_mode(False, args), await run_mode(True, args)]
+        await close_llm_client()
+        print(json.dumps(results, indent=2))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""History paging: embedded-array $in + skip versus keyset pagination on the index.
+
+Seeds one user with --recipes recipes into the database at MONGODB_URL (use a
+throwaway local mongod, the benchmark database is dropped afterwards):
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_history.py --recipes 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers.recipe import HISTORY_PROJECTION, encode_history_cursor, decode_history_cursor  # noqa: E402
+
+BENCH_DB = "recipe_app_bench_history"
+
+async def seed(db, count: int) -> ObjectId:
+    user_id = ObjectId()
+    start = datetime.utcnow() - timedelta(days=365)
+    docs = []
+    for i in range(count):
+        created_at = start + timedelta(minutes=i)
+        docs.append({
+            "_id": ObjectId(),
+            "title": f"Recipe {i}",
+            "ingredients": ["1 cup rice", "2 eggs", "1 onion", "salt"],
+            "instructions": ["Cook the rice", "Fry the eggs", "Combine and season"] * 3,
+            "cooking_time": 30,
+            "servings": 2,
+            "user_id": str(user_id),
+            "created_at": created_at,
+            "updated_at": created_at
+        })
+    for i in range(0, count, 1000):
+        await db.recipes.insert_many(docs[i:i + 1000])
+    await db.users.insert_one({"_id": user_id, "email": "bench@example.com", "recipes": [str(d["_id"]) for d in docs]})
+    await db.recipes.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    return user_id
+
+async def old_page(db, user_id: ObjectId, skip: int, limit: int):
+    user = await db.users.find_one({"_id": user_id})
+    recipe_ids = [ObjectId(recipe_id) for recipe_id in user["recipes"]]
+    return await db.recipes.find({"_id": {"$in": recipe_ids}}).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+
+async def keyset_page(db, user_id: ObjectId, after, limit: int):
+    query = {"user_id": str(user_id)}
+    if after:
+        query.update(decode_history_cursor(after))
+    return await db.recipes.find(query, HISTORY_PROJECTION).sort(
+        [("created_at", -1), ("_id", -1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    db = client[BENCH_DB]
+    try:
+        await client.drop_database(BENCH_DB)
+        user_id = await seed(db, args.recipes)
+
+        # Deep pages hurt skip the most, so sample across the whole history
+        step = max(1, (args.recipes // args.limit) // args.pages)
+        old_ms = [await timed(old_page(db, user_id, page * args.limit, args.limit)) for page in range(0, args.pages * step, step)]
+
+        keyset_ms = []
+        after = None
+        for _ in range(args.pages * step):
+            start = time.perf_counter()
+            page = await keyset_page(db, user_id, after, args.limit)
+            keyset_ms.append((time.perf_counter() - start) * 1000)
+            if len(page) <= args.limit:
+                break
+            after = encode_history_cursor(page[args.limit - 1])
+
+        old_ms.sort()
+        keyset_ms.sort()
+        print(json.dumps({
+            "recipes": args.recipes,
+            "limit": args.limit,
+            "embedded_in_skip": {"p50_ms": round(old_ms[len(old_ms) // 2], 2), "max_ms": round(old_ms[-1], 2)},
+            "keyset_cursor": {"p50_ms": round(keyset_ms[len(keyset_ms) // 2], 2), "max_ms": round(keyset_ms[-1], 2)}
+        }, indent=2))
+    finally:
+        await client.drop_database(BENCH_DB)
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Recipe post-processing: the old strict pipeline vs services.recipe_normalize.
+
+Replays the malformed model outputs in fixtures/malformed_recipes.jsonl,
+checks that each one normalizes with exactly the expected required fields
+missing, and times both pipelines per output. Exits non-zero on a mismatch.
+
+Run from the backend directory:
+    python benchmarks/bench_normalize.py --rounds 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.recipe_normalize import normalize_recipe_output, validate_recipe  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "malformed_recipes.jsonl")
+LEGACY_REQUIRED_FIELDS = ["title", "ingredients", "instructions", "cooking_time", "servings"]
+
+def legacy_postprocess(content: str) -> dict:
+    """What _call_recipe_model used to do; any failure discarded the generation."""
+    recipe_data = json.loads(content)
+    recipe_data["instructions"] = [
+        step.lstrip("0123456789-.).• ").replace("Step ", "").replace("step ", "")
+            .replace("First, ", "").replace("Then, ", "").replace("Finally, ", "")
+            .replace("Next, ", "").capitalize()
+        for step in recipe_data["instructions"]
+        if step.strip()
+    ]
+    recipe_data["ingredients"] = [
+        ingredient.strip().lower().capitalize()
+        for ingredient in recipe_data["ingredients"]
+        if ingredient.strip()
+    ]
+    if not all(field in recipe_data for field in LEGACY_REQUIRED_FIELDS):
+        raise ValueError("Missing required fields in recipe data")
+    return recipe_data
+
+def normalized_postprocess(content: str) -> dict:
+    recipe, missing = normalize_recipe_output(content)
+    if missing:
+        # In the service this triggers a small fill-in call instead of failing
+        return recipe
+    return validate_recipe(recipe)
+
+def time_per_call(fn, outputs: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for output in outputs:
+            try:
+                fn(output)
+            except Exception:
+                pass
+    return (time.perf_counter() - start) / (rounds * len(outputs))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(FIXTURES) as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    legacy_ok = []
+    complete = 0
+    mismatches = []
+    for case in cases:
+        try:
+            legacy_postprocess(case["output"])
+            legacy_ok.append(case["output"])
+        except Exception:
+            pass
+        try:
+            recipe, missing = normalize_recipe_output(case["output"])
+            if not missing:
+                validate_recipe(recipe)
+                complete += 1
+        except Exception as e:
+            missing = [f"error: {e}"]
+        if sorted(missing) != sorted(case["missing"]):
+            mismatches.append({"name": case["name"], "expected": case["missing"], "got": missing})
+
+    outputs = [case["output"] for case in cases]
+    report = {
+        "fixtures": len(cases),
+        "legacy_usable": len(legacy_ok),
+        "normalized_complete": complete,
+        "normalized_needing_fill": len(cases) - complete,
+        "legacy_us_per_output": round(time_per_call(legacy_postprocess, outputs, args.rounds) * 1e6, 2),
+        "normalized_us_per_output": round(time_per_call(normalized_postprocess, outputs, args.rounds) * 1e6, 2),
+        # Same comparison restricted to outputs the old pipeline could handle
+        "legacy_us_per_valid_output": round(time_per_call(legacy_postprocess, legacy_ok, args.rounds) * 1e6, 2),
+        "normalized_us_per_valid_output": round(time_per_call(normalized_postprocess, legacy_ok, args.rounds) * 1e6, 2),
+        "mismatches": mismatches
+    }
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Event-loop lag under a burst of concurrent logins, before and after the hashing pool.
+
+Run from the backend directory:
+    python benchmarks/bench_password_hashing.py --logins 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import password_service  # noqa: E402
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.005) -> list:
+    """Sample how late the loop wakes a sleeping task."""
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+    return samples
+
+def summarize(name: str, samples: list, elapsed: float, logins: int) -> dict:
+    samples.sort()
+    return {
+        "mode": name,
+        "logins": logins,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(logins / elapsed, 1),
+        "loop_lag_p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+        "loop_lag_p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 2),
+        "loop_lag_max_ms": round(samples[-1] * 1000, 2)
+    }
+
+async def run(name: str, verify, logins: int, hashed: str) -> dict:
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(measure_lag(stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(verify(i, hashed) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return summarize(name, await monitor, elapsed, logins)
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    hashed = password_service.pwd_context.hash("benchmark-password")
+
+    async def inline_verify(i, hashed_password):
+        # What the handlers used to do: bcrypt directly on the event loop
+        return password_service.pwd_context.verify("benchmark-password", hashed_password)
+
+    async def pooled_verify(i, hashed_password):
+        # Distinct emails so the verified-credential cache does not short-circuit
+        return await password_service.verify_password(f"user{i}@example.com", "benchmark-password", hashed_password)
+
+    results = [
+        await run("inline", inline_verify, args.logins, hashed),
+        await run("pool", pooled_verify, args.logins, hashed)
+    ]
+    password_service.shutdown_password_pool()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
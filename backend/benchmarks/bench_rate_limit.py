@@ -0,0 +1,66 @@
+"""Per-request overhead of the generation rate limiter.
+
+Times enforce_rate_limit() against the in-process buckets over a population
+of users, including the LRU eviction path once the population exceeds the
+bucket table, and optionally the shared Mongo bucket. Run from the backend
+directory:
+    python benchmarks/bench_rate_limit.py --calls 200000 --users 10000
+    python benchmarks/bench_rate_limit.py --shared --calls 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import rate_limit  # noqa: E402
+from services.rate_limit import RateLimiter, enforce_rate_limit  # noqa: E402
+
+async def measure(limiter: RateLimiter, calls: int, users: int) -> dict:
+    rate_limit.rate_limiter = limiter
+    user_ids = [f"user-{index}" for index in range(users)]
+    picks = [random.choice(user_ids) for _ in range(calls)]
+    endpoints = [random.choice(("text", "random", "image")) for _ in range(calls)]
+    limited = 0
+    start = time.perf_counter()
+    for user_id, endpoint in zip(picks, endpoints):
+        try:
+            await enforce_rate_limit(user_id, endpoint)
+        except HTTPException:
+            limited += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "shared": limiter.shared,
+        "users": users,
+        "calls": calls,
+        "us_per_call": round(elapsed / calls * 1e6, 2),
+        "limited": limited
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--shared", action="store_true", help="Also time the Mongo-backed buckets")
+    args = parser.parse_args()
+
+    burst, refill = rate_limit.RATE_LIMIT_BURST, rate_limit.RATE_LIMIT_REFILL_PER_MINUTE
+    results = [
+        await measure(RateLimiter(burst, refill, args.users * 2), args.calls, args.users),
+        # Table smaller than the population: every miss also evicts
+        await measure(RateLimiter(burst, refill, args.users // 10), args.calls, args.users)
+    ]
+    if args.shared:
+        from config.database import close_db_connection
+
+        results.append(await measure(RateLimiter(burst, refill, args.users, shared=True), args.calls, args.users))
+        await close_db_connection()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Save latency seen by handlers: inline writes versus the write-behind buffer.
+
+Saves --saves recipes from --concurrency concurrent "handlers" against a
+real MongoDB, first writing each recipe inline (what save_recipe_to_db did)
+and then through RecipeWriter in async and sync durability. Uses a scratch
+database that is dropped afterwards. Run from the backend directory:
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_recipe_writer.py --saves 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["MONGODB_DB_NAME"] = os.getenv("BENCH_DB_NAME", "recipe_writer_bench")
+os.environ.setdefault("RECIPE_INDEX_ENABLED", "false")
+
+from run import percentile  # noqa: E402
+from config.database import close_db_connection, get_database  # noqa: E402
+from services.recipe_writer import (  # noqa: E402
+    RecipeWriter, write_recipes, recipe_write_flush_size,
+    RECIPE_WRITE_BATCH_SIZE, RECIPE_WRITE_FLUSH_INTERVAL_MS, RECIPE_WRITE_MAX_PENDING, RECIPE_WRITE_MAX_RETRIES
+)
+
+USER_IDS = [str(ObjectId()) for _ in range(50)]
+
+def make_doc(index: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "title": f"Bench Recipe {index}",
+        "ingredients": ["1 cup rice", "2 cloves garlic", "200 g chicken"],
+        "instructions": ["Cook the rice.", "Fry the garlic and chicken.", "Combine."],
+        "cooking_time": 30,
+        "servings": 2,
+        "user_id": USER_IDS[index % len(USER_IDS)],
+        "created_at": now,
+        "updated_at": now
+    }
+
+async def run_mode(mode: str, args) -> dict:
+    writer = None
+    if mode != "inline":
+        writer = RecipeWriter(
+            RECIPE_WRITE_BATCH_SIZE,
+            RECIPE_WRITE_FLUSH_INTERVAL_MS / 1000,
+            RECIPE_WRITE_MAX_PENDING,
+            RECIPE_WRITE_MAX_RETRIES,
+            mode
+        )
+        writer.start()
+    flushes_before = sum(series[-1] for series in recipe_write_flush_size._values.values())
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def save(index: int):
+        async with semaphore:
+            doc = make_doc(index)
+            start = time.perf_counter()
+            if writer is None:
+                await write_recipes([doc])
+            else:
+                await writer.submit(doc)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(save(index) for index in range(args.saves)))
+    if writer is not None:
+        await writer.stop()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    flushes = sum(series[-1] for series in recipe_write_flush_size._values.values()) - flushes_before
+    return {
+        "mode": mode,
+        "saves": args.saves,
+        "save_p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "save_p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "saves_per_s_until_durable": round(args.saves / elapsed),
+        "flushes": flushes if writer is not None else args.saves
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--saves", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    try:
+        results = [await run_mode(mode, args) for mode in ("inline", "async", "sync")]
+        print(json.dumps(results, indent=2))
+    finally:
+        await get_database().client.drop_database(os.environ["MONGODB_DB_NAME"])
+        await close_db_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""History page serialization: FastAPI's default path versus MongoJSONResponse.
+
+Builds documents shaped like the history projection and measures rows/s for
+- default: the old hand formatting loop, response_model validation and
+  stdlib JSON, as FastAPI did it for List[RecipeInDB]
+- orjson: _format_recipe plus MongoJSONResponse, no validation pass
+- orjson_summary: the same with the lighter view=summary projection
+
+Run from the backend directory:
+    python benchmarks/bench_serialization.py --rows 100 --rounds 200
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routers.recipe import RecipeInDB, SUMMARY_PROJECTION, _format_recipe  # noqa: E402
+from services.serialization import MongoJSONResponse  # noqa: E402
+
+def make_docs(rows: int) -> list:
+    start = datetime.utcnow() - timedelta(days=30)
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Garlic Chicken Rice Bowl {i}",
+            "ingredients": [f"{n + 1} cups ingredient number {n}" for n in range(12)],
+            "instructions": [f"Step text number {n} with a realistic amount of detail to read" for n in range(10)],
+            "cooking_time": 30,
+            "servings": 2,
+            "calories": 550,
+            "cuisine_type": "Asian",
+            "diet_type": "balanced",
+            "difficulty": "easy",
+            "prep_time": 10,
+            "total_time": 40,
+            "user_id": "64b7f0c2e4b0a1a2b3c4d5e6",
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i)
+        }
+        for i in range(rows)
+    ]
+
+history_adapter = TypeAdapter(List[RecipeInDB])
+
+def default_path(docs: list) -> bytes:
+    for recipe in docs:
+        recipe["id"] = str(recipe["_id"])
+        recipe["created_at"] = recipe["created_at"].isoformat()
+        recipe["updated_at"] = recipe["updated_at"].isoformat()
+        recipe.pop("_id", None)
+    validated = history_adapter.validate_python(docs)
+    content = history_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def orjson_path(docs: list) -> bytes:
+    return MongoJSONResponse([_format_recipe(recipe) for recipe in docs]).body
+
+def measure(fn, docs: list, rounds: int) -> dict:
+    # Copies are made up front: each path mutates its documents like the route does
+    batches = [copy.deepcopy(docs) for _ in range(rounds)]
+    start = time.perf_counter()
+    for batch in batches:
+        body = fn(batch)
+    elapsed = time.perf_counter() - start
+    return {
+        "rows_per_s": round(len(docs) * rounds / elapsed),
+        "us_per_page": round(elapsed / rounds * 1e6, 1),
+        "bytes_per_page": len(body)
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = make_docs(args.rows)
+    summary_docs = [
+        {field: value for field, value in doc.items() if field == "_id" or field in SUMMARY_PROJECTION}
+        for doc in docs
+    ]
+    print(json.dumps({
+        "rows": args.rows,
+        "default": measure(default_path, docs, args.rounds),
+        "orjson": measure(orjson_path, docs, args.rounds),
+        "orjson_summary": measure(orjson_path, summary_docs, args.rounds)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
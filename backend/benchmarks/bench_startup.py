@@ -0,0 +1,76 @@
+"""Cold start: import time, lifespan startup and time to the first answered request.
+
+Each run is a fresh interpreter. By default MongoDB points at an address that
+never answers, to show that the worker comes up and serves /healthz without
+waiting for the database (/readyz stays 503 until it is reachable). Run from
+the backend directory:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --mongodb-url mongodb://localhost:27017
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line of timings
+CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+import httpx
+
+async def main():
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            health = await client.get("/healthz")
+            first = time.perf_counter()
+            ready = await client.get("/readyz")
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_request_ms": (first - start) * 1000,
+        "healthz": health.status_code,
+        "readyz": ready.status_code
+    }))
+
+asyncio.run(main())
+"""
+
+def run_once(env: dict) -> dict:
+    output = subprocess.check_output([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mongodb-url", default="mongodb://10.255.255.1:27017/?serverSelectionTimeoutMS=1000")
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        MONGODB_URL=args.mongodb_url,
+        SECRET_KEY=os.getenv("SECRET_KEY", "benchmark-secret"),
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "fake"),
+        RECIPE_INDEX_ENABLED="false"
+    )
+    runs = [run_once(env) for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "mongodb_url": args.mongodb_url,
+        **{
+            f"{key}_median": round(statistics.median(run[key] for run in runs), 1)
+            for key in ("import_ms", "startup_ms", "first_request_ms")
+        },
+        "healthz": runs[-1]["healthz"],
+        "readyz": runs[-1]["readyz"]
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
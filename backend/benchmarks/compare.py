@@ -0,0 +1,36 @@
+"""Compare two benchmarks/run.py reports profile by profile.
+
+    python benchmarks/compare.py before.json after.json
+"""
+import json
+import sys
+
+METRICS = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "loop_lag_p99_ms"]
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        before = json.load(f)
+    with open(sys.argv[2]) as f:
+        after = json.load(f)
+
+    before_results = {result["profile"]: result for result in before["results"]}
+    comparison = {"before": before["revision"], "after": after["revision"], "profiles": {}}
+    for result in after["results"]:
+        baseline = before_results.get(result["profile"])
+        if not baseline:
+            continue
+        comparison["profiles"][result["profile"]] = {
+            metric: {
+                "before": baseline[metric],
+                "after": result[metric],
+                "change_pct": round((result[metric] - baseline[metric]) / baseline[metric] * 100, 1) if baseline[metric] else None
+            }
+            for metric in METRICS
+        }
+    print(json.dumps(comparison, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Run with:
+    FAKE_LLM_LATENCY_MS=2000 uvicorn benchmarks.fake_openai:app --port 8100
+
+and point the backend at it with OPENAI_BASE_URL=http://localhost:8100/v1.
+Failures can be injected at start with FAKE_LLM_ERROR_RATE, or on a running
+server with POST /fault {"error_rate": 1.0, "latency_ms": 5000}; GET /fault
+shows the current settings and how many completions were requested.
+"""
+import os
+import asyncio
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "1000"))
+# Log-normal spread around the median latency; 0 gives a fixed delay
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0"))
+# Delay between streamed chunks when the client asks for stream=true
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "20"))
+FAKE_LLM_CHUNK_CHARS = int(os.getenv("FAKE_LLM_CHUNK_CHARS", "8"))
+# Fraction of completions answered with FAKE_LLM_ERROR_STATUS after the usual latency
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_ERROR_STATUS = int(os.getenv("FAKE_LLM_ERROR_STATUS", "500"))
+
+app = FastAPI()
+
+# Mutable through /fault while the server runs
+faults = {
+    "error_rate": FAKE_LLM_ERROR_RATE,
+    "error_status": FAKE_LLM_ERROR_STATUS,
+    "latency_ms": FAKE_LLM_LATENCY_MS,
+    "requests": 0,
+    "errors": 0
+}
+
+FAKE_RECIPE = {
+    "title": "Garlic Chicken Rice Bowl",
+    "ingredients": ["2 chicken breasts", "1 cup rice", "3 cloves garlic", "1 tablespoon olive oil"],
+    "instructions": [
+        "Rinse the rice and cook it in two cups of water",
+        "Mince the garlic",
+        "Sear the chicken in olive oil until golden",
+        "Add the garlic and cook until fragrant",
+        "Slice the chicken and serve over the rice"
+    ],
+    "cooking_time": 30,
+    "servings": 2,
+    "calories": 550,
+    "cuisine_type": "Asian",
+    "diet_type": "balanced",
+    "difficulty": "easy",
+    "prep_time": 10,
+    "total_time": 40
+}
+
+FAKE_INGREDIENTS = "chicken, rice, garlic, olive oil"
+
+def _latency_seconds() -> float:
+    if FAKE_LLM_LATENCY_SIGMA > 0:
+        return faults["latency_ms"] * random.lognormvariate(0, FAKE_LLM_LATENCY_SIGMA) / 1000
+    return faults["latency_ms"] / 1000
+
+def _is_vision_request(body: dict) -> bool:
+    for message in body.get("messages", []):
+        if isinstance(message.get("content"), list):
+            return True
+    return False
+
+async def _stream_chunks(completion_id: str, model: str, content: str):
+    for start in range(0, len(content), FAKE_LLM_CHUNK_CHARS):
+        await asyncio.sleep(FAKE_LLM_TOKEN_MS / 1000)
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": content[start:start + FAKE_LLM_CHUNK_CHARS]},
+                    "finish_reason": None
+                }
+            ]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.get("/fault")
+async def get_faults():
+    return faults
+
+@app.post("/fault")
+async def set_faults(request: Request):
+    """Update error_rate, error_status or latency_ms; the counters are reset."""
+    body = await request.json()
+    for key in ("error_rate", "error_status", "latency_ms"):
+        if key in body:
+            faults[key] = type(faults[key])(body[key])
+    faults["requests"] = faults["errors"] = 0
+    return faults
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    content = FAKE_INGREDIENTS if _is_vision_request(body) else json.dumps(FAKE_RECIPE)
+    faults["requests"] += 1
+
+    if random.random() < faults["error_rate"]:
+        await asyncio.sleep(_latency_seconds())
+        faults["errors"] += 1
+        return JSONResponse(
+            {"error": {"message": "Injected upstream failure", "type": "server_error", "code": None}},
+            status_code=faults["error_status"]
+        )
+
+    if body.get("stream"):
+        return StreamingResponse(
+            _stream_chunks(completion_id, body.get("model", "fake"), content),
+            media_type="text/event-stream"
+        )
+
+    await asyncio.sleep(_latency_seconds())
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }
+        ],
+        "usage": {
+            "prompt_tokens": 300,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": 300 + len(content) // 4
+        }
+    }
@@ -0,0 +1,75 @@
+"""Load test for /api/recipes/from-text.
+
+Start the fake upstream and the API (with RATE_LIMIT_ENABLED=false, or the
+single benchmark user soon gets 429s), then run:
+    python benchmarks/load_from_text.py --base-url http://localhost:8000 --concurrency 1 4 16 64
+
+With a fake upstream latency of L seconds, throughput should grow roughly
+linearly with concurrency (up to LLM_MAX_CONCURRENCY) at about concurrency / L
+requests per second instead of staying flat at 1 / L.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+import httpx
+
+async def get_token(client: httpx.AsyncClient) -> str:
+    credentials = {"email": f"load-{uuid.uuid4().hex[:8]}@example.com", "password": "load-test"}
+    response = await client.post("/api/auth/signup", json=credentials)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_level(client: httpx.AsyncClient, token: str, concurrency: int, requests: int) -> dict:
+    payload = {"ingredients": ["chicken", "rice", "garlic"], "preferences": {"servings": 2}}
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+    rate_limited = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors, rate_limited
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/api/recipes/from-text", json=payload, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code == 429:
+                rate_limited += 1
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rate_limited": rate_limited,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_s": round(latencies[len(latencies) // 2], 3),
+        "max_s": round(latencies[-1], 3)
+    }
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests-per-worker", type=int, default=4)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+        token = await get_token(client)
+        for concurrency in args.concurrency:
+            result = await run_level(client, token, concurrency, concurrency * args.requests_per_worker)
+            print(result)
+
+if __name__ == "__main__":
+    asyncio.run(main())
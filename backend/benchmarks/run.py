@@ -0,0 +1,274 @@
+"""Offline benchmark suite.
+
+Runs the API in-process against an in-memory Mongo stand-in (or a local
+mongod) and a local fake OpenAI server, drives scripted load profiles and
+prints machine-readable JSON so results can be compared across commits:
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/run.py --profiles auth_burst text_generation --output results.json
+
+Profiles: auth_burst, text_generation, image_generation, history_paging.
+Set MONGODB_URL=mongodb://localhost:27017 to use a real mongod instead of
+mongomock, and FAKE_LLM_LATENCY_MS / FAKE_LLM_LATENCY_SIGMA to shape the
+fake upstream.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+FAKE_LLM_PORT = int(os.getenv("FAKE_LLM_PORT", "8100"))
+
+# Must be set before the app modules read their configuration at import time
+os.environ.setdefault("MONGODB_URL", "mongomock://")
+os.environ.setdefault("OPENAI_BASE_URL", f"http://127.0.0.1:{FAKE_LLM_PORT}/v1")
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("RECIPE_CACHE_ENABLED", "false")
+# The per-user limiter would turn most generation requests into 429s
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+PROFILES = ["auth_burst", "text_generation", "image_generation", "history_paging"]
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - start - self.interval)
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        samples = sorted(self.samples)
+        return {
+            "loop_lag_p50_ms": round(percentile(samples, 0.5) * 1000, 2),
+            "loop_lag_p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+            "loop_lag_max_ms": round((samples[-1] if samples else 0) * 1000, 2)
+        }
+
+async def run_load(name: str, make_request, total: int, concurrency: int) -> dict:
+    """Run make_request(i) total times with bounded concurrency and summarize."""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+    monitor = LoopLagMonitor()
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await make_request(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    lag = await monitor.stop()
+
+    latencies.sort()
+    return {
+        "profile": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        **lag
+    }
+
+async def signup(client: httpx.AsyncClient) -> dict:
+    credentials = {"email": f"bench-{uuid.uuid4().hex[:12]}@example.com", "password": "benchmark"}
+    response = await client.post("/api/auth/signup", json=credentials)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def profile_auth_burst(client: httpx.AsyncClient, args) -> dict:
+    async def request(i):
+        credentials = {"email": f"burst-{uuid.uuid4().hex[:12]}@example.com", "password": "benchmark"}
+        response = await client.post("/api/auth/signup", json=credentials)
+        if response.status_code != 200:
+            return False
+        response = await client.post("/api/auth/login", json=credentials)
+        return response.status_code == 200
+
+    return await run_load("auth_burst", request, args.requests, args.concurrency)
+
+async def profile_text_generation(client: httpx.AsyncClient, args) -> dict:
+    headers = await signup(client)
+
+    async def request(i):
+        payload = {"ingredients": ["chicken", "rice", f"garlic-{i}"], "preferences": {"servings": 2}}
+        response = await client.post("/api/recipes/from-text", json=payload, headers=headers)
+        return response.status_code == 200
+
+    return await run_load("text_generation", request, args.requests, args.concurrency)
+
+def make_test_image(size: int = 3000) -> bytes:
+    from PIL import Image
+    image = Image.new("RGB", (size, size * 3 // 4))
+    pixels = image.load()
+    for x in range(0, image.width, 8):
+        for y in range(0, image.height, 8):
+            pixels[x, y] = (x % 256, y % 256, (x * y) % 256)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+async def profile_image_generation(client: httpx.AsyncClient, args) -> dict:
+    headers = await signup(client)
+    image = make_test_image()
+
+    async def request(i):
+        files = {"image": ("ingredients.jpg", image, "image/jpeg")}
+        response = await client.post("/api/recipes/from-image", files=files, headers=headers)
+        return response.status_code == 200
+
+    result = await run_load("image_generation", request, args.requests, args.concurrency)
+    result["image_bytes"] = len(image)
+    return result
+
+async def profile_history_paging(client: httpx.AsyncClient, args) -> dict:
+    from config.database import get_recipes_collection
+    from routers.auth import decode_access_token
+
+    headers = await signup(client)
+    user_id = decode_access_token(headers["Authorization"].split()[1]).user_id
+
+    start = datetime.utcnow() - timedelta(days=365)
+    docs = [
+        {
+            "title": f"Recipe {i}",
+            "ingredients": ["1 cup rice", "2 eggs", "1 onion"],
+            "instructions": ["Cook the rice", "Fry the eggs", "Combine and season"],
+            "cooking_time": 30,
+            "servings": 2,
+            "user_id": user_id,
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i)
+        }
+        for i in range(args.history_size)
+    ]
+    for i in range(0, len(docs), 1000):
+        await get_recipes_collection().insert_many(docs[i:i + 1000])
+
+    async def request(i):
+        # Walk a few pages deep on each request, following the cursor
+        after = None
+        for _ in range(args.history_depth):
+            params = {"limit": 20}
+            if after:
+                params["after"] = after
+            response = await client.get("/api/recipes/history", params=params, headers=headers)
+            if response.status_code != 200:
+                return False
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+        return True
+
+    result = await run_load("history_paging", request, args.requests, args.concurrency)
+    result["history_size"] = args.history_size
+    return result
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Fake LLM server did not start on port {port}")
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=PROFILES)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--history-size", type=int, default=10000)
+    parser.add_argument("--history-depth", type=int, default=5)
+    parser.add_argument("--output", help="Write results to this file as well as stdout")
+    args = parser.parse_args()
+
+    fake_llm = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app",
+         "--port", str(FAKE_LLM_PORT), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    try:
+        wait_for_port(FAKE_LLM_PORT)
+
+        from main import app
+        from config.database import ensure_indexes
+
+        await ensure_indexes()
+        transport = httpx.ASGITransport(app=app)
+        results = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            for profile in args.profiles:
+                results.append(await globals()[f"profile_{profile}"](client, args))
+
+        report = {
+            "revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "mongodb": "mongomock" if os.environ["MONGODB_URL"].startswith("mongomock://") else "mongod",
+            "fake_llm_latency_ms": float(os.getenv("FAKE_LLM_LATENCY_MS", "1000")),
+            "results": results
+        }
+        output = json.dumps(report, indent=2)
+        print(output)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(output + "\n")
+    finally:
+        fake_llm.terminate()
+        fake_llm.wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
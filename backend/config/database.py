@@ -1,38 +1,150 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from pymongo.server_api import ServerApi
-import os
-from dotenv import load_dotenv
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import bson
+from config.settings import get_settings
 
-load_dotenv()
+settings = get_settings()
 
-MONGODB_URL = os.getenv("MONGODB_URL")
+MONGODB_URL = settings.mongodb_url
+DB_STATS_ENABLED = settings.db_stats_enabled
 
-# Create a new client and connect to the server
-client = AsyncIOMotorClient(MONGODB_URL, server_api=ServerApi('1'))
-db = client.recipe_app  # Use your database name here
+class DbStats:
+    """Per-request database round trips and reply bytes."""
 
-async def init_db():
+    __slots__ = ("round_trips", "bytes_received")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.bytes_received = 0
+
+# Set per request by the stats middleware; Motor copies the context into its
+# executor threads, so the listener below sees the request's DbStats object.
+db_stats: ContextVar[Optional[DbStats]] = ContextVar("db_stats", default=None)
+
+class DbStatsListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = db_stats.get()
+        if stats is not None:
+            stats.round_trips += 1
+            stats.bytes_received += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        stats = db_stats.get()
+        if stats is not None:
+            stats.round_trips += 1
+
+_client = None
+
+def get_client():
+    """Get the shared Mongo client, creating it on first use.
+
+    Creating the client does not connect, but mongodb+srv URLs resolve DNS
+    up front, so it is kept out of import time. "mongomock://" swaps in an
+    in-memory stand-in for offline benchmarks (needs mongomock-motor).
+    """
+    global _client
+    if _client is None:
+        if MONGODB_URL and MONGODB_URL.startswith("mongomock://"):
+            from mongomock_motor import AsyncMongoMockClient
+            _client = AsyncMongoMockClient()
+        else:
+            _client = AsyncIOMotorClient(
+                MONGODB_URL,
+                server_api=ServerApi('1'),
+                serverSelectionTimeoutMS=settings.mongodb_timeout_ms,
+                event_listeners=[DbStatsListener()] if DB_STATS_ENABLED else []
+            )
+    return _client
+
+async def ping_db(timeout: float) -> bool:
+    """True if the deployment answers a ping within timeout seconds."""
+    if MONGODB_URL and MONGODB_URL.startswith("mongomock://"):
+        return True
     try:
-        # Send a ping to confirm a successful connection
-        await client.admin.command('ping')
-        print("Pinged your deployment. Successfully connected to MongoDB Atlas!")
-        
-        # Create indexes
-        await get_users_collection().create_index("email", unique=True)
-        await get_recipes_collection().create_index([("user_id", 1), ("created_at", -1)])
-        print("Database indexes created successfully!")
-        
+        await asyncio.wait_for(get_client().admin.command('ping'), timeout)
+        return True
+    except Exception:
+        return False
+
+# (collection, keys, options) for every index the queries rely on. Created by
+# scripts/create_indexes.py, only checked at startup.
+INDEXES: List[Tuple[str, List[Tuple[str, object]], Dict]] = [
+    ("users", [("email", 1)], {"unique": True}),
+    ("recipes", [("user_id", 1), ("created_at", -1), ("_id", -1)], {}),
+    ("recipes", [("user_id", 1), ("cuisine_type", 1), ("created_at", -1)], {}),
+    ("recipes", [("user_id", 1), ("diet_type", 1), ("created_at", -1)], {}),
+    ("recipes", [("user_id", 1), ("title", "text"), ("ingredients", "text")],
+     {"name": "user_recipe_text", "weights": {"title": 3, "ingredients": 1}}),
+    ("favorites", [("user_id", 1), ("recipe_id", 1)], {"unique": True}),
+    ("favorites", [("user_id", 1), ("created_at", -1), ("_id", -1)], {}),
+    ("recipe_cache", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("jobs", [("status", 1), ("created_at", 1)], {}),
+    ("jobs", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("inflight_locks", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("rate_limits", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ("recipe_revisions", [("recipe_id", 1), ("revision", -1)], {"unique": True})
+]
+
+def index_name(keys: List[Tuple[str, object]], options: Dict) -> str:
+    """The name Mongo gives an index unless one is set explicitly."""
+    return options.get("name") or "_".join(f"{field}_{direction}" for field, direction in keys)
+
+async def ensure_indexes():
+    """Create any missing indexes. Safe to rerun; existing indexes are left alone."""
+    for collection, keys, options in INDEXES:
+        await get_database()[collection].create_index(keys, **options)
+
+async def missing_indexes() -> List[str]:
+    """Indexes from INDEXES that do not exist yet, as "collection.name"."""
+    missing = []
+    existing: Dict[str, Dict] = {}
+    for collection, keys, options in INDEXES:
+        if collection not in existing:
+            existing[collection] = await get_database()[collection].index_information()
+        if index_name(keys, options) not in existing[collection]:
+            missing.append(f"{collection}.{index_name(keys, options)}")
+    return missing
+
+async def check_db() -> List[str]:
+    """Startup check: wait until the deployment answers and report missing indexes.
+
+    Does not raise, so a briefly unreachable cluster delays readiness instead
+    of killing the worker.
+    """
+    delay = 0.5
+    while not await ping_db(settings.mongodb_timeout_ms / 1000):
+        print(f"Database not reachable, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 30)
+
+    try:
+        if settings.db_create_indexes_on_startup:
+            await ensure_indexes()
+        missing = await missing_indexes()
     except Exception as e:
-        print(f"Error connecting to the database: {e}")
-        raise e
+        print(f"Error checking database indexes: {e}")
+        return ["unknown"]
+    if missing:
+        print(f"Missing database indexes: {', '.join(missing)}. Run scripts/create_indexes.py")
+    return missing
 
 async def close_db_connection():
-    client.close()
-    print("Database connection closed.")
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+        print("Database connection closed.")
 
 def get_database():
     """Get database instance."""
-    return client.recipe_app
+    return get_client()[settings.mongodb_db_name]
 
 def get_users_collection():
     """Get users collection."""
@@ -40,4 +152,28 @@ def get_users_collection():
 
 def get_recipes_collection():
     """Get recipes collection."""
-    return get_database().recipes 
\ No newline at end of file
+    return get_database().recipes 
+
+def get_recipe_cache_collection():
+    """Get shared recipe generation cache collection."""
+    return get_database().recipe_cache
+
+def get_jobs_collection():
+    """Get background generation jobs collection."""
+    return get_database().jobs
+
+def get_inflight_locks_collection():
+    """Get cross-worker single-flight locks collection."""
+    return get_database().inflight_locks
+
+def get_favorites_collection():
+    """Get user favorite recipes collection."""
+    return get_database().favorites
+
+def get_rate_limits_collection():
+    """Get shared per-user rate limit buckets collection."""
+    return get_database().rate_limits
+
+def get_recipe_revisions_collection():
+    """Get previous versions of refined recipes."""
+    return get_database().recipe_revisions
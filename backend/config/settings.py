@@ -0,0 +1,67 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from dotenv import load_dotenv
+
+@lru_cache(maxsize=1)
+def load_env() -> None:
+    """Read .env into the process environment, once per process."""
+    load_dotenv()
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+@dataclass(frozen=True)
+class Settings:
+    """Connection, security and upstream settings shared across the app.
+
+    Feature tuning knobs stay next to the code they tune and are read with
+    os.getenv after load_env().
+    """
+    mongodb_url: Optional[str]
+    mongodb_db_name: str
+    mongodb_timeout_ms: int
+    db_stats_enabled: bool
+    db_create_indexes_on_startup: bool
+    readiness_timeout_seconds: float
+    secret_key: Optional[str]
+    access_token_expire_minutes: int
+    openai_api_key: Optional[str]
+    openai_base_url: Optional[str]
+    llm_timeout_seconds: float
+    llm_connect_timeout_seconds: float
+    llm_max_concurrency: int
+    llm_max_connections: int
+    llm_max_retries: int
+    llm_backoff_base_seconds: float
+    llm_backoff_max_seconds: float
+    metrics_enabled: bool
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            mongodb_url=os.getenv("MONGODB_URL"),
+            mongodb_db_name=os.getenv("MONGODB_DB_NAME", "recipe_app"),
+            mongodb_timeout_ms=int(os.getenv("MONGODB_TIMEOUT_MS", "5000")),
+            db_stats_enabled=_flag("DB_STATS_ENABLED", "false"),
+            db_create_indexes_on_startup=_flag("DB_CREATE_INDEXES_ON_STARTUP", "false"),
+            readiness_timeout_seconds=float(os.getenv("READINESS_TIMEOUT_SECONDS", "2")),
+            secret_key=os.getenv("SECRET_KEY"),
+            access_token_expire_minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")),
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            openai_base_url=os.getenv("OPENAI_BASE_URL") or None,
+            llm_timeout_seconds=float(os.getenv("LLM_TIMEOUT_SECONDS", "60")),
+            llm_connect_timeout_seconds=float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5")),
+            llm_max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+            llm_max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "64")),
+            llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            llm_backoff_base_seconds=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+            llm_backoff_max_seconds=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8")),
+            metrics_enabled=_flag("METRICS_ENABLED", "false")
+        )
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    load_env()
+    return Settings.from_env()
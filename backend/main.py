@@ -1,9 +1,56 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, recipe
-from config.database import init_db, close_db_connection
+from routers import auth, recipe, jobs
+from config.settings import get_settings
+from config.database import check_db, ping_db, close_db_connection, db_stats, DbStats, DB_STATS_ENABLED
+from services.llm_client import close_llm_client
+from services.password_service import shutdown_password_pool
+from services.image_preprocess import shutdown_image_pool
+from services.job_service import job_manager
+from services.recipe_writer import recipe_writer
+from services.recipe_index import recipe_index, RECIPE_INDEX_ENABLED
+from services.metrics import (
+    METRICS_ENABLED, registry, request_timings, http_request_duration, server_timing_header
+)
+
+settings = get_settings()
+
+async def prepare_database(app: FastAPI):
+    """Background startup: wait for the database, check indexes, then build the recipe index."""
+    app.state.missing_indexes = await check_db()
+    app.state.database_checked = True
+    if RECIPE_INDEX_ENABLED:
+        recipe_index.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here waits on the network, so the worker serves /healthz right away
+    # and reports ready once the database check has passed.
+    app.state.database_checked = False
+    app.state.missing_indexes = []
+    database_task = asyncio.create_task(prepare_database(app))
+    job_manager.start()
+    recipe_writer.start()
+    try:
+        yield
+    finally:
+        database_task.cancel()
+        await asyncio.gather(database_task, return_exceptions=True)
+        await job_manager.stop()
+        # After the jobs, which save recipes, and before the database closes
+        await recipe_writer.stop()
+        if RECIPE_INDEX_ENABLED:
+            await recipe_index.stop()
+        await close_db_connection()
+        await close_llm_client()
+        shutdown_password_pool()
+        shutdown_image_pool()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware configuration
 app.add_middleware(
@@ -14,15 +61,64 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Database connection events
-@app.on_event("startup")
-async def startup_db_client():
-    await init_db()
+# Per-request database round trips and bytes, for measuring query changes
+if DB_STATS_ENABLED:
+    @app.middleware("http")
+    async def add_db_stats_headers(request: Request, call_next):
+        stats = DbStats()
+        token = db_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            db_stats.reset(token)
+        response.headers["X-DB-Round-Trips"] = str(stats.round_trips)
+        response.headers["X-DB-Bytes"] = str(stats.bytes_received)
+        return response
+
+# Per-route latency histograms and Server-Timing headers
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        timings = []
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            request_timings.reset(token)
+        elapsed = time.perf_counter() - start
+        
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        endpoint = request.scope.get("endpoint")
+        route_label = route.path if route else (endpoint.__name__ if endpoint else "unmatched")
+        http_request_duration.observe(
+            elapsed, method=request.method, route=route_label, status=response.status_code
+        )
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+        return response
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.expose(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    await close_db_connection()
+@app.get("/readyz", include_in_schema=False)
+async def readyz(request: Request):
+    """Readiness: the database answers and every index the queries need exists."""
+    checks = {
+        "database_checked": request.app.state.database_checked,
+        "database": await ping_db(settings.readiness_timeout_seconds),
+        "missing_indexes": request.app.state.missing_indexes
+    }
+    ready = checks["database_checked"] and checks["database"] and not checks["missing_indexes"]
+    return JSONResponse({"ready": ready, **checks}, status_code=200 if ready else 503)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
-app.include_router(recipe.router, prefix="/api/recipes", tags=["Recipes"]) 
\ No newline at end of file
+app.include_router(recipe.router, prefix="/api/recipes", tags=["Recipes"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"]) 
\ No newline at end of file
@@ -0,0 +1,15 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class RecipeBase(BaseModel):
+    title: str = Field(..., description="Recipe title")
+    ingredients: List[str] = Field(..., description="List of ingredients with quantities")
+    instructions: List[str] = Field(..., description="Step by step cooking instructions")
+    cooking_time: int = Field(..., description="Cooking time in minutes", gt=0)
+    servings: int = Field(..., description="Number of servings", gt=0)
+    calories: Optional[int] = Field(None, description="Calories per serving", gt=0)
+    cuisine_type: Optional[str] = Field(None, description="Type of cuisine")
+    diet_type: Optional[str] = Field(None, description="Type of diet")
+    difficulty: Optional[str] = Field(None, description="Recipe difficulty level")
+    prep_time: Optional[int] = Field(None, description="Preparation time in minutes", gt=0)
+    total_time: Optional[int] = Field(None, description="Total time including prep and cooking", gt=0)
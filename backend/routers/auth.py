@@ -1,24 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Dict, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from bson import ObjectId
 from config.database import get_users_collection
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from services.password_service import hash_password, verify_password
+from services.user_cache import invalidate_user, user_cache, USER_PROJECTION
+from config.settings import get_settings
 
 router = APIRouter()
 
 # Security configurations
-SECRET_KEY = os.getenv("SECRET_KEY")
+SECRET_KEY = get_settings().secret_key
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+ACCESS_TOKEN_EXPIRE_MINUTES = get_settings().access_token_expire_minutes
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 # Models
@@ -30,7 +28,6 @@ class UserCreate(UserBase):
 
 class UserInDB(UserBase):
     id: str
-    recipes: List[str] = []
     created_at: datetime
     is_active: bool
 
@@ -40,14 +37,10 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[str] = None
+    exp: Optional[int] = None
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -58,7 +51,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def decode_access_token(token: str) -> TokenData:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -69,22 +62,57 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        return TokenData(email=email, user_id=payload.get("uid"), exp=payload.get("exp"))
     except JWTError:
         raise credentials_exception
-    
-    user = await get_users_collection().find_one({"email": token_data.email})
+
+async def load_token_user(token_data: TokenData) -> Dict:
+    """Minimal user projection for a decoded token, rejecting unknown or inactive users.
+
+    Lookups go through user_cache, so a user deactivated in the database is
+    rejected within USER_CACHE_TTL_SECONDS, or at once where invalidate_user
+    is called. A uid claim must match the stored user, so a token for a
+    removed account does not carry over to a new account with that email.
+    """
+    user = user_cache.get(token_data.email, token_data.exp)
     if user is None:
-        raise credentials_exception
+        user = await get_users_collection().find_one({"email": token_data.email}, USER_PROJECTION)
+        if user is not None:
+            user_cache.set(token_data.email, token_data.exp, user)
+    if (
+        user is None
+        or not user.get("is_active", False)
+        or (token_data.user_id and token_data.user_id != str(user["_id"]))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Return the minimal user projection (_id, email, is_active) for the token."""
+    return await load_token_user(decode_access_token(token))
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
+    """Return the user id for the token.
+
+    The signed uid claim identifies the user, but it is not trusted on its
+    own: the user is still checked through load_token_user, which is a cache
+    hit for most requests. Tokens issued before the uid claim existed get the
+    id from that lookup.
+    """
+    user = await load_token_user(decode_access_token(token))
+    return str(user["_id"])
+
 # Routes
 @router.post("/signup", response_model=Token)
 async def signup(user: UserCreate):
     users_collection = get_users_collection()
     
     # Check if user already exists
-    if await users_collection.find_one({"email": user.email}):
+    if await users_collection.find_one({"email": user.email}, {"_id": 1}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -93,18 +121,20 @@ async def signup(user: UserCreate):
     # Create new user
     user_data = {
         "email": user.email,
-        "hashed_password": get_password_hash(user.password),
+        "hashed_password": await hash_password(user.password),
         "created_at": datetime.utcnow(),
-        "recipes": [],  # Initialize empty recipes list
         "is_active": True
     }
     
     result = await users_collection.insert_one(user_data)
+    # Tokens of a removed account with this email must not resolve from the cache
+    invalidate_user(user.email)
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": str(result.inserted_id)},
+        expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -112,9 +142,9 @@ async def signup(user: UserCreate):
 @router.post("/login", response_model=Token)
 async def login(user: UserCreate):
     users_collection = get_users_collection()
-    user_doc = await users_collection.find_one({"email": user.email})
+    user_doc = await users_collection.find_one({"email": user.email}, {"hashed_password": 1})
     
-    if not user_doc or not verify_password(user.password, user_doc["hashed_password"]):
+    if not user_doc or not await verify_password(user.email, user.password, user_doc["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -123,16 +153,26 @@ async def login(user: UserCreate):
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": str(user_doc["_id"])},
+        expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserInDB)
-async def read_users_me(current_user = Depends(get_current_user)):
+async def read_users_me(user_id: str = Depends(get_current_user_id)):
+    current_user = await get_users_collection().find_one(
+        {"_id": ObjectId(user_id)},
+        {"hashed_password": 0, "recipes": 0}
+    )
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return {
         "id": str(current_user["_id"]),
         "email": current_user["email"],
-        "recipes": current_user.get("recipes", []),
         "created_at": current_user["created_at"],
         "is_active": current_user["is_active"]
     } 
\ No newline at end of file
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, WebSocket, WebSocketDisconnect, status
+from typing import Optional, Dict, Any
+from pydantic import BaseModel
+from datetime import datetime
+from .auth import get_current_user_id
+from .recipe import RecipeBase, RecipeCreate, generate_random, save_recipe_to_db, rate_limited
+from services.openai_service import generate_recipe
+from services.image_service import identify_ingredients
+from services.image_preprocess import PreparedImage, preprocess_image
+from services.job_service import job_manager, FINISHED_STATUSES, JOB_WEBSOCKET_TIMEOUT_SECONDS
+
+router = APIRouter()
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_wait_ms: Optional[int] = None
+    run_ms: Optional[int] = None
+
+async def _save_generated(recipe: Optional[Dict], user_id: str) -> Dict:
+    if not recipe:
+        raise ValueError("Failed to generate recipe")
+    recipe_id = await save_recipe_to_db(recipe, user_id)
+    return {"id": recipe_id, "recipe": RecipeBase(**recipe).dict()}
+
+# Job handlers; payloads are plain dicts so they can be stored in Mongo
+async def run_random_job(payload: Dict, user_id: str) -> Dict:
+    return await _save_generated(await generate_random(payload.get("preferences")), user_id)
+
+async def run_text_job(payload: Dict, user_id: str) -> Dict:
+    recipe = await generate_recipe(payload["ingredients"], payload.get("preferences"))
+    return await _save_generated(recipe, user_id)
+
+async def run_image_job(payload: Dict, user_id: str) -> Dict:
+    prepared = PreparedImage(payload["base64_image"], payload["phash"], {})
+    ingredients = await identify_ingredients(prepared)
+    if not ingredients:
+        raise ValueError("No ingredients detected in the image")
+    recipe = await generate_recipe(ingredients, payload.get("preferences"))
+    return await _save_generated(recipe, user_id)
+
+job_manager.register_handler("random", run_random_job)
+job_manager.register_handler("from-text", run_text_job)
+job_manager.register_handler("from-image", run_image_job)
+
+@router.post("/random", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_random_recipe_job(
+    preferences: dict = None,
+    user_id: str = Depends(rate_limited("random"))
+):
+    """Queue a random recipe generation and return the job immediately."""
+    return await job_manager.submit("random", {"preferences": preferences}, user_id)
+
+@router.post("/from-text", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_text_recipe_job(
+    recipe_request: RecipeCreate,
+    user_id: str = Depends(rate_limited("text"))
+):
+    """Queue a recipe generation from a list of ingredients."""
+    return await job_manager.submit("from-text", recipe_request.dict(), user_id)
+
+@router.post("/from-image", response_model=JobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_image_recipe_job(
+    image: UploadFile = File(...),
+    preferences: Optional[dict] = None,
+    user_id: str = Depends(rate_limited("image"))
+):
+    """Queue a recipe generation from an image of ingredients.
+
+    The upload is preprocessed before queueing so only the downscaled image
+    is stored with the job.
+    """
+    prepared = await preprocess_image(image)
+    payload = {
+        "base64_image": prepared.base64_image,
+        "phash": prepared.phash,
+        "preferences": preferences
+    }
+    return await job_manager.submit("from-image", payload, user_id)
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, user_id: str = Depends(get_current_user_id)):
+    """Poll a job's status and result."""
+    job = await job_manager.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+@router.websocket("/{job_id}/ws")
+async def watch_job(websocket: WebSocket, job_id: str, token: str):
+    """Send the job state on connect and again when it finishes, then close.
+
+    Browsers cannot set headers on WebSocket requests, so the access token is
+    passed as a query parameter. It is checked like a bearer token, so
+    tokens without a uid claim resolve through the user's email.
+    """
+    try:
+        user_id = await get_current_user_id(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    try:
+        job = await job_manager.get(job_id, user_id)
+        if job is None:
+            await websocket.send_json({"error": "Job not found"})
+            await websocket.close()
+            return
+        await websocket.send_json(JobStatus(**job).model_dump(mode="json"))
+        if job["status"] not in FINISHED_STATUSES:
+            job = await job_manager.wait(job_id, user_id, JOB_WEBSOCKET_TIMEOUT_SECONDS)
+            if job is None:
+                # Expired or deleted while we were waiting
+                await websocket.send_json({"error": "Job not found"})
+            else:
+                await websocket.send_json(JobStatus(**job).model_dump(mode="json"))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
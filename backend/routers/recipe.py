@@ -1,39 +1,71 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
-from typing import List, Optional, Dict
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Tuple, Union, AsyncIterator, Literal
 from pydantic import BaseModel, Field
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+import asyncio
 import base64
 import io
-from config.database import get_users_collection, get_recipes_collection
-from .auth import get_current_user
-from services.openai_service import generate_recipe
-from services.image_service import process_ingredient_image
+import json
+import math
+import os
+import random
+from config.database import get_recipes_collection, get_favorites_collection, get_recipe_revisions_collection
+from models.recipe import RecipeBase
+from .auth import get_current_user_id
+from services.openai_service import generate_recipe, stream_recipe, apply_preferences
+from services.image_service import identify_ingredients
+from services.image_preprocess import preprocess_image
+from services.recipe_cache import recipe_cache
+from services.metrics import span
+from services.serialization import MongoJSONResponse
+from services.recipe_versions import touch_recipes_version, get_recipes_version, recipes_etag, etag_matches
+from services.recipe_index import recipe_index, RECIPE_INDEX_ENABLED, RECIPE_INDEX_MIN_COVERAGE
+from services.rate_limit import enforce_rate_limit
+from services.recipe_writer import recipe_writer, write_recipes
+from services.recipe_refine import refine_recipe, parse_local_edit
+from services.recipe_export import export_recipes, import_recipes
+from services.circuit_breaker import CircuitOpenError
 
 router = APIRouter()
 
-class RecipeBase(BaseModel):
-    title: str = Field(..., description="Recipe title")
-    ingredients: List[str] = Field(..., description="List of ingredients with quantities")
-    instructions: List[str] = Field(..., description="Step by step cooking instructions")
-    cooking_time: int = Field(..., description="Cooking time in minutes", gt=0)
-    servings: int = Field(..., description="Number of servings", gt=0)
-    calories: Optional[int] = Field(None, description="Calories per serving", gt=0)
-    cuisine_type: Optional[str] = Field(None, description="Type of cuisine")
-    diet_type: Optional[str] = Field(None, description="Type of diet")
-    difficulty: Optional[str] = Field(None, description="Recipe difficulty level")
-    prep_time: Optional[int] = Field(None, description="Preparation time in minutes", gt=0)
-    total_time: Optional[int] = Field(None, description="Total time including prep and cooking", gt=0)
+# How /random interacts with the recipe cache: "off" always calls the model,
+# "vary" spreads identical requests over a fixed number of cached variants.
+RANDOM_RECIPE_CACHE_MODE = os.getenv("RANDOM_RECIPE_CACHE_MODE", "off")
+RANDOM_RECIPE_CACHE_VARIANTS = int(os.getenv("RANDOM_RECIPE_CACHE_VARIANTS", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "25"))
+BATCH_CONCURRENCY_PER_USER = int(os.getenv("BATCH_CONCURRENCY_PER_USER", "4"))
+# Share of a stored recipe's ingredients the user must have for it to stand in while the model is unavailable
+RECIPE_DEGRADED_MIN_COVERAGE = float(os.getenv("RECIPE_DEGRADED_MIN_COVERAGE", "0.5"))
 
 class RecipeCreate(BaseModel):
     ingredients: List[str] = Field(..., description="List of ingredients")
     preferences: Optional[dict] = Field(default={}, description="Recipe preferences")
 
+class BatchRecipeRequest(BaseModel):
+    items: List[RecipeCreate] = Field(..., description="Ingredient/preference sets to generate", min_length=1)
+
+class BatchRecipeResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    recipe: Optional[RecipeBase] = None
+    error: Optional[str] = None
+    # Served from stored recipes because generation was unavailable
+    degraded: bool = False
+
+class BatchRecipeResponse(BaseModel):
+    results: List[BatchRecipeResult]
+    succeeded: int
+    failed: int
+
 class RecipeInDB(RecipeBase):
     id: str
     user_id: str
     created_at: datetime
     updated_at: datetime
+    revision: Optional[int] = None
 
     class Config:
         json_encoders = {
@@ -47,43 +79,113 @@ class RecipeInDB(RecipeBase):
         minutes = self.cooking_time % 60
         return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
 
-async def save_recipe_to_db(recipe: RecipeBase, user_id: str) -> str:
-    """Save recipe to database and return the recipe ID."""
-    recipe_doc = {
+class RecipeRefineRequest(BaseModel):
+    instruction: Optional[str] = Field(None, description='Edit to apply, e.g. "make it vegetarian"', max_length=500)
+    servings: Optional[int] = Field(None, description="Scale ingredient quantities to this many servings", gt=0)
+    units: Optional[Literal["metric", "imperial"]] = Field(None, description="Convert ingredient measures")
+
+class RecipeRefineResponse(BaseModel):
+    recipe: RecipeInDB
+    changed_fields: List[str]
+    # mode, tokens used and saved, latency against a full regeneration
+    report: Dict[str, Union[str, int, float, None]]
+
+class RecipeSummary(BaseModel):
+    """List view of a recipe without the ingredient and instruction arrays."""
+    id: str
+    title: str
+    cooking_time: int
+    servings: int
+    calories: Optional[int] = None
+    cuisine_type: Optional[str] = None
+    diet_type: Optional[str] = None
+    difficulty: Optional[str] = None
+    total_time: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+def build_recipe_doc(recipe: Union[RecipeBase, Dict], user_id: str) -> Dict:
+    """Validate a recipe and turn it into a recipes collection document."""
+    if isinstance(recipe, dict):
+        recipe = RecipeBase(**recipe)
+    
+    now = datetime.utcnow()
+    return {
         **recipe.dict(),
         "user_id": str(user_id),
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+        "created_at": now,
+        "updated_at": now
     }
+
+async def save_recipe_to_db(
+    recipe: Union[RecipeBase, Dict],
+    user_id: str,
+    source_recipe_id: Optional[str] = None
+) -> str:
+    """Save recipe to database and return the recipe ID.
+
+    The ID is assigned here and the write goes through the write-behind
+    recipe_writer, so with RECIPE_WRITE_DURABILITY=async the recipe may land
+    a flush interval after this returns. source_recipe_id marks a copy of an
+    existing recipe served from the retrieval index, which is not indexed again.
+    """
+    recipe_doc = build_recipe_doc(recipe, user_id)
+    recipe_doc["_id"] = ObjectId()
+    if source_recipe_id:
+        recipe_doc["source_recipe_id"] = source_recipe_id
     
-    result = await get_recipes_collection().insert_one(recipe_doc)
-    
-    if not result.inserted_id:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to save recipe"
+    with span("recipe_write"):
+        await recipe_writer.submit(recipe_doc)
+    return str(recipe_doc["_id"])
+
+# Per-user semaphores shared by concurrent batches from the same account
+_batch_semaphores: Dict[str, asyncio.Semaphore] = {}
+_batch_semaphore_users: Dict[str, int] = {}
+
+def _acquire_batch_semaphore(user_id: str) -> asyncio.Semaphore:
+    if user_id not in _batch_semaphores:
+        _batch_semaphores[user_id] = asyncio.Semaphore(BATCH_CONCURRENCY_PER_USER)
+    _batch_semaphore_users[user_id] = _batch_semaphore_users.get(user_id, 0) + 1
+    return _batch_semaphores[user_id]
+
+def _release_batch_semaphore(user_id: str):
+    _batch_semaphore_users[user_id] -= 1
+    if not _batch_semaphore_users[user_id]:
+        del _batch_semaphore_users[user_id]
+        del _batch_semaphores[user_id]
+
+def rate_limited(endpoint: str):
+    """Dependency returning the user id after charging the call to the user's rate limit bucket."""
+    async def dependency(response: Response, user_id: str = Depends(get_current_user_id)) -> str:
+        response.headers.update(await enforce_rate_limit(user_id, endpoint))
+        return user_id
+    return dependency
+
+async def generate_random(preferences: Optional[Dict] = None) -> Optional[Dict]:
+    """Generate a random recipe, honouring RANDOM_RECIPE_CACHE_MODE."""
+    if RANDOM_RECIPE_CACHE_MODE == "vary":
+        return await generate_recipe(
+            [], preferences,
+            cache_salt=f"random-{random.randrange(RANDOM_RECIPE_CACHE_VARIANTS)}"
         )
-    
-    # Update user's recipes list
-    await get_users_collection().update_one(
-        {"_id": ObjectId(user_id)},
-        {"$push": {"recipes": str(result.inserted_id)}}
-    )
-    
-    return str(result.inserted_id)
+    return await generate_recipe([], preferences, use_cache=False)
 
 @router.post("/random", response_model=RecipeBase)
 async def generate_random_recipe(
+    response: Response,
     preferences: dict = None,
-    current_user = Depends(get_current_user)
+    user_id: str = Depends(rate_limited("random"))
 ):
     """Generate a random recipe based on optional preferences."""
     try:
-        recipe = await generate_recipe([], preferences)
+        try:
+            recipe = await generate_random(preferences)
+        except CircuitOpenError as e:
+            return await serve_degraded([], preferences, user_id, response, e)
         
         if recipe:
             # Save recipe and update user's recipes list
-            recipe_id = await save_recipe_to_db(recipe, current_user["_id"])
+            recipe_id = await save_recipe_to_db(recipe, user_id)
             return recipe
         else:
             raise HTTPException(
@@ -91,6 +193,8 @@ async def generate_random_recipe(
                 detail="Failed to generate recipe"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -99,20 +203,24 @@ async def generate_random_recipe(
 
 @router.post("/from-image", response_model=RecipeBase)
 async def generate_recipe_from_ingredients_image(
+    response: Response,
     image: UploadFile = File(...),
     preferences: Optional[dict] = None,
-    current_user = Depends(get_current_user)
+    user_id: str = Depends(rate_limited("image"))
 ):
     """Generate a recipe from an image of ingredients."""
     try:
-        # Read the image file
-        image_content = await image.read()
-        
-        # Convert to base64
-        base64_image = base64.b64encode(image_content).decode('utf-8')
+        # Read, orient and downscale the image before it goes upstream
+        with span("image_preprocess"):
+            prepared = await preprocess_image(image)
         
         # Process the image and get ingredients
-        ingredients = await process_ingredient_image(base64_image)
+        try:
+            ingredients = await identify_ingredients(prepared)
+        except CircuitOpenError as e:
+            # Nothing to match stored recipes against without the ingredients
+            raise service_unavailable(e)
+        response.headers["X-Image-Stats"] = prepared.stats_header()
         
         if not ingredients:
             raise HTTPException(
@@ -120,11 +228,14 @@ async def generate_recipe_from_ingredients_image(
                 detail="No ingredients detected in the image"
             )
         
-        recipe = await generate_recipe(ingredients, preferences)
+        try:
+            recipe = await generate_recipe(ingredients, preferences)
+        except CircuitOpenError as e:
+            return await serve_degraded(ingredients, preferences, user_id, response, e)
         
         if recipe:
             # Save recipe and update user's recipes list
-            recipe_id = await save_recipe_to_db(recipe, current_user["_id"])
+            recipe_id = await save_recipe_to_db(recipe, user_id)
             return recipe
         else:
             raise HTTPException(
@@ -132,27 +243,134 @@ async def generate_recipe_from_ingredients_image(
                 detail="Failed to generate recipe"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
+async def retrieve_stored_recipe(
+    ingredients: List[str],
+    preferences: Optional[Dict],
+    min_coverage: float
+) -> Optional[Dict]:
+    """Best stored recipe from the retrieval index, or None if nothing covers enough."""
+    if not RECIPE_INDEX_ENABLED or not recipe_index.ready:
+        return None
+    with span("index_search"):
+        matches = recipe_index.search(ingredients, preferences, limit=3, min_coverage=min_coverage)
+    return await _load_stored_recipe([recipe_id for recipe_id, coverage in matches])
+
+async def _load_stored_recipe(recipe_ids: List[str]) -> Optional[Dict]:
+    """First of the recipes that still exists, marked with _source_recipe_id."""
+    for recipe_id in recipe_ids:
+        with span("mongo_find_recipe"):
+            # Imported recipes may still be in an index snapshot from before they were excluded
+            doc = await get_recipes_collection().find_one(
+                {"_id": ObjectId(recipe_id), "imported": {"$ne": True}},
+                {field: 1 for field in RecipeBase.model_fields}
+            )
+        if doc:
+            doc.pop("_id", None)
+            doc["_source_recipe_id"] = recipe_id
+            return doc
+    return None
+
+def service_unavailable(error: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Recipe generation is temporarily unavailable, retry later",
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
+
+async def find_degraded_recipe(ingredients: List[str], preferences: Optional[Dict]) -> Optional[Dict]:
+    """Stored recipe to answer with while the model is unavailable.
+
+    With ingredients the user must have RECIPE_DEGRADED_MIN_COVERAGE of its
+    ingredients; without (random recipes) any stored recipe matching the
+    preferences will do.
+    """
+    if ingredients:
+        return await retrieve_stored_recipe(ingredients, preferences, RECIPE_DEGRADED_MIN_COVERAGE)
+    if not RECIPE_INDEX_ENABLED or not recipe_index.ready:
+        return None
+    return await _load_stored_recipe(recipe_index.sample(preferences))
+
+async def save_degraded_recipe(
+    ingredients: List[str],
+    preferences: Optional[Dict],
+    user_id: str
+) -> Optional[Tuple[str, RecipeBase]]:
+    """Copy a stored recipe to the user in place of a generated one. Returns (id, recipe) or None."""
+    stored = await find_degraded_recipe(ingredients, preferences)
+    if not stored:
+        return None
+    source_recipe_id = stored.pop("_source_recipe_id")
+    recipe = RecipeBase(**apply_preferences(stored, preferences))
+    recipe_id = await save_recipe_to_db(recipe, user_id, source_recipe_id=source_recipe_id)
+    return recipe_id, recipe
+
+async def serve_degraded(
+    ingredients: List[str],
+    preferences: Optional[Dict],
+    user_id: str,
+    response: Response,
+    error: CircuitOpenError
+) -> RecipeBase:
+    """Answer with a stored recipe while the LLM breaker is open, or raise 503 with Retry-After."""
+    saved = await save_degraded_recipe(ingredients, preferences, user_id)
+    if saved is None:
+        print(f"No stored recipe to serve while degraded: {str(error)}")
+        raise service_unavailable(error)
+    response.headers["X-Degraded"] = "stored-recipe"
+    return saved[1]
+
 @router.post("/from-text", response_model=RecipeBase)
 async def generate_recipe_from_ingredients_text(
     recipe_request: RecipeCreate,
-    current_user = Depends(get_current_user)
+    response: Response,
+    mode: Literal["generate", "retrieve", "auto"] = "generate",
+    user_id: str = Depends(get_current_user_id)
 ):
-    """Generate a recipe from a list of ingredients."""
+    """Generate a recipe from a list of ingredients.
+
+    mode=retrieve answers only from recipes already stored, mode=auto uses a
+    stored recipe when it covers enough of the user's ingredients and falls
+    back to the model otherwise. Only calls that reach the model count
+    against the rate limit.
+    """
     try:
-        recipe = await generate_recipe(
-            recipe_request.ingredients,
-            recipe_request.preferences
-        )
+        if mode != "generate":
+            stored = await retrieve_stored_recipe(
+                recipe_request.ingredients,
+                recipe_request.preferences,
+                RECIPE_INDEX_MIN_COVERAGE if mode == "auto" else 0.0
+            )
+            if stored:
+                source_recipe_id = stored.pop("_source_recipe_id")
+                recipe = RecipeBase(**apply_preferences(stored, recipe_request.preferences))
+                await save_recipe_to_db(recipe, user_id, source_recipe_id=source_recipe_id)
+                return recipe
+            if mode == "retrieve":
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="No stored recipe matches these ingredients"
+                )
+        
+        response.headers.update(await enforce_rate_limit(user_id, "text"))
+        try:
+            recipe = await generate_recipe(
+                recipe_request.ingredients,
+                recipe_request.preferences
+            )
+        except CircuitOpenError as e:
+            return await serve_degraded(recipe_request.ingredients, recipe_request.preferences, user_id, response, e)
         
         if recipe:
             # Save recipe and update user's recipes list
-            recipe_id = await save_recipe_to_db(recipe, current_user["_id"])
+            recipe_id = await save_recipe_to_db(recipe, user_id)
             return recipe
         else:
             raise HTTPException(
@@ -160,50 +378,631 @@ async def generate_recipe_from_ingredients_text(
                 detail="Failed to generate recipe"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
-@router.get("/history", response_model=List[RecipeInDB])
+@router.post("/batch", response_model=BatchRecipeResponse)
+async def generate_recipe_batch(
+    batch_request: BatchRecipeRequest,
+    response: Response,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Generate several recipes concurrently and save them with a single bulk write.
+
+    Items that fail are reported individually; the rest of the batch still succeeds.
+    """
+    if len(batch_request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can contain at most {BATCH_MAX_ITEMS} items"
+        )
+    response.headers.update(await enforce_rate_limit(user_id, "text", units=len(batch_request.items)))
+    
+    results = [BatchRecipeResult(index=index) for index in range(len(batch_request.items))]
+    docs: List[Dict] = []
+    doc_indexes: List[int] = []
+    semaphore = _acquire_batch_semaphore(user_id)
+    
+    async def generate_item(index: int, item: RecipeCreate):
+        source_recipe_id = None
+        async with semaphore:
+            try:
+                recipe = await generate_recipe(item.ingredients, item.preferences)
+            except CircuitOpenError as e:
+                recipe = await find_degraded_recipe(item.ingredients, item.preferences)
+                if not recipe:
+                    results[index].error = str(e)
+                    return
+                source_recipe_id = recipe.pop("_source_recipe_id")
+                recipe = apply_preferences(recipe, item.preferences)
+                results[index].degraded = True
+        if not recipe:
+            results[index].error = "Failed to generate recipe"
+            return
+        try:
+            doc = build_recipe_doc(recipe, user_id)
+        except Exception as e:
+            results[index].error = str(e)
+            return
+        if source_recipe_id:
+            doc["source_recipe_id"] = source_recipe_id
+        results[index].recipe = RecipeBase(**recipe)
+        docs.append(doc)
+        doc_indexes.append(index)
+    
+    try:
+        await asyncio.gather(*(
+            generate_item(index, item) for index, item in enumerate(batch_request.items)
+        ))
+    finally:
+        _release_batch_semaphore(user_id)
+    
+    if docs:
+        # Already one bulk write, so the batch skips the write-behind buffer
+        with span("mongo_insert_many"):
+            failed_positions = await write_recipes(docs)
+        
+        # insert_many sets _id on each document, so ids are known even for partial failures
+        for position, (index, doc) in enumerate(zip(doc_indexes, docs)):
+            if position in failed_positions:
+                results[index].recipe = None
+                results[index].error = failed_positions[position]
+            else:
+                results[index].id = str(doc["_id"])
+    
+    succeeded = sum(1 for result in results if result.id)
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+def format_sse(event: str, data) -> str:
+    """Format a single server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def recipe_event_stream(
+    ingredients: List[str],
+    preferences: Optional[Dict],
+    user_id: str
+) -> AsyncIterator[str]:
+    """Relay stream_recipe() events as SSE and persist the recipe once it is complete.
+
+    While the LLM breaker is open the stream ends with a "done" event for a
+    stored recipe marked degraded, or an "error" event carrying retry_after.
+    """
+    try:
+        async for event, data in stream_recipe(ingredients, preferences):
+            if event == "recipe":
+                recipe = RecipeBase(**data)
+                recipe_id = await save_recipe_to_db(recipe, user_id)
+                yield format_sse("done", {"id": recipe_id, "recipe": recipe.dict()})
+            else:
+                yield format_sse(event, data)
+    except CircuitOpenError as e:
+        # The breaker rejects before the first token, so no partial recipe was sent
+        saved = await save_degraded_recipe(ingredients, preferences, user_id)
+        if saved is None:
+            yield format_sse("error", {"detail": str(e), "retry_after": math.ceil(e.retry_after)})
+        else:
+            recipe_id, recipe = saved
+            yield format_sse("done", {"id": recipe_id, "recipe": recipe.dict(), "degraded": True})
+    except Exception as e:
+        print(f"Error streaming recipe: {str(e)}")
+        yield format_sse("error", {"detail": str(e)})
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"  # Stop reverse proxies from buffering the stream
+}
+
+@router.post("/from-text/stream")
+async def stream_recipe_from_ingredients_text(
+    recipe_request: RecipeCreate,
+    response: Response,
+    user_id: str = Depends(rate_limited("text"))
+):
+    """Stream a recipe generated from a list of ingredients as server-sent events."""
+    return StreamingResponse(
+        recipe_event_stream(
+            recipe_request.ingredients,
+            recipe_request.preferences,
+            user_id
+        ),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, **response.headers}
+    )
+
+@router.post("/from-image/stream")
+async def stream_recipe_from_ingredients_image(
+    response: Response,
+    image: UploadFile = File(...),
+    preferences: Optional[dict] = None,
+    user_id: str = Depends(rate_limited("image"))
+):
+    """Stream a recipe generated from an image of ingredients as server-sent events."""
+    with span("image_preprocess"):
+        prepared = await preprocess_image(image)
+    try:
+        ingredients = await identify_ingredients(prepared)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    
+    if not ingredients:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No ingredients detected in the image"
+        )
+    
+    return StreamingResponse(
+        recipe_event_stream(ingredients, preferences, user_id),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, **response.headers, "X-Image-Stats": prepared.stats_header()}
+    )
+
+@router.get("/cache/stats")
+async def get_recipe_cache_stats(user_id: str = Depends(get_current_user_id)):
+    """Get recipe generation cache hit/miss counters."""
+    return recipe_cache.stats()
+
+# Fields returned by the history list; everything RecipeInDB needs and nothing else
+HISTORY_PROJECTION = {field: 1 for field in RecipeInDB.model_fields if field != "id"}
+SUMMARY_PROJECTION = {field: 1 for field in RecipeSummary.model_fields if field != "id"}
+HISTORY_MAX_LIMIT = 100
+
+def _format_recipe(recipe: Dict) -> Dict:
+    """Map a projected recipe document onto the response schema, in place.
+
+    Dates stay datetimes; MongoJSONResponse encodes them directly.
+    """
+    recipe["id"] = str(recipe.pop("_id"))
+    recipe.pop("score", None)
+    return recipe
+
+async def check_recipes_etag(request: Request, user_id: str) -> str:
+    """ETag for this view of the user's recipes; raises 304 if the client has it.
+
+    Keyed on the user's latest recipe change, so a poll that matches costs one
+    _id lookup on the user document and no recipes query.
+    """
+    version = await get_recipes_version(user_id)
+    etag = recipes_etag(user_id, version, f"{request.url.path}?{request.url.query}")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return etag
+
+def _cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+def encode_history_cursor(recipe: Dict) -> str:
+    """Opaque keyset cursor pointing just past the given recipe."""
+    raw = json.dumps({"c": recipe["created_at"].isoformat(), "i": str(recipe["_id"])})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_history_cursor(cursor: str) -> Dict:
+    """Turn a cursor back into a filter for the next page."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at = datetime.fromisoformat(raw["c"])
+        recipe_id = ObjectId(raw["i"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": recipe_id}}
+        ]
+    }
+
+@router.get("/history", response_model=List[Union[RecipeInDB, RecipeSummary]])
 async def get_user_recipes(
-    current_user = Depends(get_current_user),
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
     limit: int = 10,
-    skip: int = 0
+    after: Optional[str] = None,
+    view: Literal["full", "summary"] = "full"
 ):
-    """Get user's recipe history."""
+    """Get user's recipe history, newest first.
+
+    Pages are served from the (user_id, created_at, _id) index. When more
+    recipes exist, the X-Next-Cursor header holds the value to pass as
+    ?after= for the next page. view=summary leaves out ingredients and
+    instructions. Send the ETag back in If-None-Match to get a 304 when
+    nothing changed.
+    """
+    try:
+        etag = await check_recipes_etag(request, user_id)
+        limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+        query = {"user_id": str(user_id)}
+        if after:
+            query.update(decode_history_cursor(after))
+        
+        # Fetch one extra row to know whether another page exists
+        with span("mongo_history_find"):
+            recipes = await get_recipes_collection().find(
+                query, SUMMARY_PROJECTION if view == "summary" else HISTORY_PROJECTION
+            ).sort(
+                [("created_at", -1), ("_id", -1)]
+            ).limit(limit + 1).to_list(length=limit + 1)
+        
+        headers = _cache_headers(etag)
+        if len(recipes) > limit:
+            recipes = recipes[:limit]
+            headers["X-Next-Cursor"] = encode_history_cursor(recipes[-1])
+        
+        with span("serialize"):
+            return MongoJSONResponse([_format_recipe(recipe) for recipe in recipes], headers=headers)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+class RecipeSearchResponse(BaseModel):
+    results: List[RecipeInDB]
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+# Fields counted per value in search results
+SEARCH_FACETS = ("cuisine_type", "diet_type", "difficulty")
+
+def _range_filter(minimum: Optional[int], maximum: Optional[int]) -> Optional[Dict]:
+    bounds = {}
+    if minimum is not None:
+        bounds["$gte"] = minimum
+    if maximum is not None:
+        bounds["$lte"] = maximum
+    return bounds or None
+
+def build_search_query(
+    user_id: str,
+    q: Optional[str] = None,
+    cuisine_type: Optional[str] = None,
+    diet_type: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    min_cooking_time: Optional[int] = None,
+    max_cooking_time: Optional[int] = None,
+    min_calories: Optional[int] = None,
+    max_calories: Optional[int] = None
+) -> Dict:
+    """Mongo filter for a history search; every condition is pushed down to the server."""
+    query = {"user_id": str(user_id)}
+    if q and q.strip():
+        # Served by the (user_id, title, ingredients) text index
+        query["$text"] = {"$search": q.strip()}
+    for field, value in (("cuisine_type", cuisine_type), ("diet_type", diet_type), ("difficulty", difficulty)):
+        if value:
+            query[field] = value
+    for field, bounds in (
+        ("cooking_time", _range_filter(min_cooking_time, max_cooking_time)),
+        ("calories", _range_filter(min_calories, max_calories))
+    ):
+        if bounds:
+            query[field] = bounds
+    return query
+
+def build_search_pipeline(query: Dict, limit: int, offset: int) -> List[Dict]:
+    """One aggregation returning a page of results, the total and the facet counts."""
+    projection = dict(HISTORY_PROJECTION)
+    if "$text" in query:
+        projection["score"] = {"$meta": "textScore"}
+        sort = {"score": {"$meta": "textScore"}, "created_at": -1, "_id": -1}
+    else:
+        sort = {"created_at": -1, "_id": -1}
+    
+    facets = {
+        field: [
+            {"$match": {field: {"$ne": None}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}
+        ]
+        for field in SEARCH_FACETS
+    }
+    return [
+        {"$match": query},
+        {"$project": projection},
+        {"$facet": {
+            "results": [{"$sort": sort}, {"$skip": offset}, {"$limit": limit}],
+            "total": [{"$count": "count"}],
+            **facets
+        }}
+    ]
+
+@router.get("/search", response_model=RecipeSearchResponse)
+async def search_user_recipes(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    q: Optional[str] = None,
+    cuisine_type: Optional[str] = None,
+    diet_type: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    min_cooking_time: Optional[int] = None,
+    max_cooking_time: Optional[int] = None,
+    min_calories: Optional[int] = None,
+    max_calories: Optional[int] = None,
+    limit: int = 10,
+    offset: int = 0
+):
+    """Search the user's recipe history with facet counts for the matching recipes.
+
+    q matches words in titles and ingredients (best matches first); the other
+    parameters filter exactly. Facets count cuisine_type, diet_type and
+    difficulty values across all matches, not just the returned page.
+    """
     try:
-        # Get the user's recipe IDs from the users collection
-        user = await get_users_collection().find_one(
-            {"_id": ObjectId(current_user["_id"])}
+        etag = await check_recipes_etag(request, user_id)
+        limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+        offset = max(0, offset)
+        query = build_search_query(
+            user_id, q, cuisine_type, diet_type, difficulty,
+            min_cooking_time, max_cooking_time, min_calories, max_calories
         )
         
-        if not user or "recipes" not in user:
-            return []
+        with span("mongo_search_aggregate"):
+            pages = await get_recipes_collection().aggregate(
+                build_search_pipeline(query, limit, offset)
+            ).to_list(length=1)
+        page = pages[0] if pages else {}
         
-        # Convert recipe IDs to ObjectId
-        recipe_ids = [ObjectId(recipe_id) for recipe_id in user["recipes"]]
+        return MongoJSONResponse({
+            "results": [_format_recipe(recipe) for recipe in page.get("results", [])],
+            "total": page["total"][0]["count"] if page.get("total") else 0,
+            "facets": {
+                field: {bucket["_id"]: bucket["count"] for bucket in page.get(field, [])}
+                for field in SEARCH_FACETS
+            }
+        }, headers=_cache_headers(etag))
         
-        # Get recipes from the recipes collection
-        recipes = await get_recipes_collection().find(
-            {"_id": {"$in": recipe_ids}}
-        ).sort(
-            "created_at", -1
-        ).skip(skip).limit(limit).to_list(length=limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+def _parse_recipe_id(recipe_id: str) -> ObjectId:
+    if not ObjectId.is_valid(recipe_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    return ObjectId(recipe_id)
+
+@router.get("/favorites", response_model=List[RecipeInDB])
+async def get_favorite_recipes(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    limit: int = 10,
+    after: Optional[str] = None
+):
+    """Get the user's favorite recipes, most recently favorited first.
+
+    Paged like /history: pass the X-Next-Cursor header back as ?after=.
+    """
+    try:
+        etag = await check_recipes_etag(request, user_id)
+        limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+        query = {"user_id": str(user_id)}
+        if after:
+            query.update(decode_history_cursor(after))
+        
+        with span("mongo_favorites_find"):
+            favorites = await get_favorites_collection().find(
+                query, {"recipe_id": 1, "created_at": 1}
+            ).sort(
+                [("created_at", -1), ("_id", -1)]
+            ).limit(limit + 1).to_list(length=limit + 1)
         
-        # Add the recipe ID to each recipe and format dates
-        for recipe in recipes:
-            recipe["id"] = str(recipe["_id"])
-            recipe["created_at"] = recipe["created_at"].isoformat()
-            recipe["updated_at"] = recipe["updated_at"].isoformat()
-            # Remove the _id field as we have id
-            recipe.pop("_id", None)
+        headers = _cache_headers(etag)
+        if len(favorites) > limit:
+            favorites = favorites[:limit]
+            headers["X-Next-Cursor"] = encode_history_cursor(favorites[-1])
+        if not favorites:
+            return MongoJSONResponse([], headers=headers)
         
-        return recipes
+        with span("mongo_favorite_recipes_find"):
+            recipes = await get_recipes_collection().find(
+                {"_id": {"$in": [favorite["recipe_id"] for favorite in favorites]}, "user_id": str(user_id)},
+                HISTORY_PROJECTION
+            ).to_list(length=len(favorites))
         
+        # Keep favorite order; recipes deleted since favoriting are skipped
+        by_id = {recipe["_id"]: recipe for recipe in recipes}
+        return MongoJSONResponse([
+            _format_recipe(by_id[favorite["recipe_id"]])
+            for favorite in favorites
+            if favorite["recipe_id"] in by_id
+        ], headers=headers)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/favorites/{recipe_id}", status_code=status.HTTP_201_CREATED)
+async def add_favorite_recipe(recipe_id: str, user_id: str = Depends(get_current_user_id)):
+    """Mark one of the user's recipes as a favorite. Adding it twice is a no-op."""
+    object_id = _parse_recipe_id(recipe_id)
+    if not await get_recipes_collection().find_one({"_id": object_id, "user_id": str(user_id)}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    
+    try:
+        result = await get_favorites_collection().update_one(
+            {"user_id": str(user_id), "recipe_id": object_id},
+            {"$setOnInsert": {"created_at": datetime.utcnow()}},
+            upsert=True
+        )
+        if result.upserted_id:
+            await touch_recipes_version(user_id)
+    except DuplicateKeyError:
+        # A concurrent request created it first
+        pass
+    return {"recipe_id": recipe_id, "favorite": True}
+
+@router.delete("/favorites/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_favorite_recipe(recipe_id: str, user_id: str = Depends(get_current_user_id)):
+    """Remove a recipe from the user's favorites."""
+    object_id = _parse_recipe_id(recipe_id)
+    result = await get_favorites_collection().delete_one({"user_id": str(user_id), "recipe_id": object_id})
+    if result.deleted_count:
+        await touch_recipes_version(user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+@router.get("/export")
+async def export_user_recipes(
+    user_id: str = Depends(get_current_user_id),
+    since: Optional[datetime] = None,
+    gzip: bool = False
+):
+    """Stream the user's whole history as NDJSON, one recipe per line, oldest first.
+
+    gzip=true returns a .ndjson.gz file. since limits the export to recipes
+    created from then on, for incremental pulls.
+    """
+    filename = "recipes.ndjson.gz" if gzip else "recipes.ndjson"
+    return StreamingResponse(
+        export_recipes(user_id, since, compress=gzip),
+        media_type="application/gzip" if gzip else NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import")
+async def import_user_recipes(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    gzip: bool = False
+):
+    """Add recipes from an NDJSON request body, e.g. a file from /export.
+
+    The body is parsed as it arrives and written in insert_many chunks.
+    Gzipped bodies are accepted with gzip=true or Content-Encoding: gzip.
+    Invalid lines are skipped and listed by line number.
+    """
+    compressed = gzip or request.headers.get("content-encoding", "").lower() == "gzip"
+    try:
+        return await import_recipes(request.stream(), user_id, compressed)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.post("/{recipe_id}/refine", response_model=RecipeRefineResponse)
+async def refine_user_recipe(
+    recipe_id: str,
+    refine_request: RecipeRefineRequest,
+    response: Response,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Edit a stored recipe instead of regenerating it.
+
+    The previous version is kept in recipe_revisions and the recipe's
+    revision number goes up by one. Only edits that need the model count
+    against the rate limit.
+    """
+    if not (refine_request.instruction or refine_request.servings or refine_request.units):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide an instruction, servings or units"
+        )
+    object_id = _parse_recipe_id(recipe_id)
+    try:
+        recipe = await get_recipes_collection().find_one({"_id": object_id, "user_id": str(user_id)}, HISTORY_PROJECTION)
+        if not recipe:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Recipe not found"
+            )
+        
+        if refine_request.instruction and not parse_local_edit(refine_request.instruction):
+            response.headers.update(await enforce_rate_limit(user_id, "refine"))
+        try:
+            refined, changed, report = await refine_recipe(
+                recipe,
+                refine_request.instruction,
+                refine_request.servings,
+                refine_request.units
+            )
+        except CircuitOpenError as e:
+            # Local edits never reach the model, so only model edits can end up here
+            raise service_unavailable(e)
+        if not changed:
+            return {"recipe": _format_recipe(recipe), "changed_fields": [], "report": report}
+        
+        revision = recipe.get("revision") or 1
+        now = datetime.utcnow()
+        try:
+            # Unique on (recipe_id, revision): of two concurrent refinements only one gets here
+            await get_recipe_revisions_collection().insert_one({
+                "recipe_id": object_id,
+                "user_id": str(user_id),
+                "revision": revision,
+                "recipe": {field: recipe[field] for field in RecipeBase.model_fields if field in recipe},
+                "edit": refine_request.model_dump(exclude_none=True),
+                "created_at": now
+            })
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Recipe was changed concurrently, fetch it and retry"
+            )
+        
+        unset = {field: "" for field in RecipeBase.model_fields if field in recipe and field not in refined}
+        update = {"$set": {**refined, "updated_at": now, "revision": revision + 1}}
+        if unset:
+            update["$unset"] = unset
+        with span("mongo_update_recipe"):
+            result = await get_recipes_collection().update_one(
+                {"_id": object_id, "user_id": str(user_id), "revision": recipe.get("revision")},
+                update
+            )
+        if not result.matched_count:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Recipe was changed concurrently, fetch it and retry"
+            )
+        await touch_recipes_version(user_id, now)
+        
+        recipe.update(refined, updated_at=now, revision=revision + 1)
+        for field in unset:
+            recipe.pop(field, None)
+        return {"recipe": _format_recipe(recipe), "changed_fields": changed, "report": report}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+# Declared last so the fixed paths above (/history, /search, /favorites, ...) match first
+@router.get("/{recipe_id}", response_model=RecipeInDB)
+async def get_recipe(recipe_id: str, request: Request, user_id: str = Depends(get_current_user_id)):
+    """Get one of the user's recipes, with the same ETag handling as /history."""
+    object_id = _parse_recipe_id(recipe_id)
+    etag = await check_recipes_etag(request, user_id)
+    
+    with span("mongo_find_recipe"):
+        recipe = await get_recipes_collection().find_one({"_id": object_id, "user_id": str(user_id)}, HISTORY_PROJECTION)
+    if not recipe:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    return MongoJSONResponse(_format_recipe(recipe), headers=_cache_headers(etag))
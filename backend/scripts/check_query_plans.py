@@ -0,0 +1,121 @@
+"""Fail if any history, search, favorites or export query would scan the whole collection.
+
+Explains the queries the API issues against a real mongod (explain is not
+available on mongomock) after creating the indexes in INDEXES, and exits
+non-zero when a winning plan contains a COLLSCAN stage. Run it in CI or
+before deploying index changes, from the backend directory:
+    MONGODB_URL=mongodb://localhost:27017 python scripts/check_query_plans.py
+tests/test_query_plans.py runs the same checks under pytest.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Set
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import (  # noqa: E402
+    close_db_connection, ensure_indexes, get_database, get_recipes_collection, get_favorites_collection
+)
+from routers.recipe import (  # noqa: E402
+    HISTORY_PROJECTION, build_search_query, build_search_pipeline, decode_history_cursor,
+    encode_history_cursor
+)
+from services.recipe_export import EXPORT_PROJECTION  # noqa: E402
+
+USER_ID = str(ObjectId())
+
+SEARCHES = {
+    "search_all": {},
+    "search_text": {"q": "chicken rice"},
+    "search_cuisine": {"cuisine_type": "Italian"},
+    "search_diet_and_time": {"diet_type": "vegan", "max_cooking_time": 30},
+    "search_calories": {"min_calories": 200, "max_calories": 600},
+    "search_text_and_filters": {"q": "pasta", "cuisine_type": "Italian", "difficulty": "easy"}
+}
+
+def stages(plan):
+    """Yield every stage name in an explain plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from stages(value)
+
+def winning_plans(explain):
+    """Winning plans only; rejected alternatives may legitimately scan."""
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == "winningPlan":
+                yield value
+            elif key != "rejectedPlans":
+                yield from winning_plans(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            yield from winning_plans(value)
+
+async def explain_find(collection, query, projection, sort):
+    return await collection.find(query, projection).sort(sort).limit(11).explain()
+
+async def explain_aggregate(collection, pipeline):
+    return await get_database().command(
+        "explain",
+        {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner"
+    )
+
+def plan_stages(explain) -> Set[str]:
+    return {stage for plan in winning_plans(explain) for stage in stages(plan)}
+
+async def collect_explains() -> Dict[str, Dict]:
+    """Create the indexes, then explain every query the API issues, by name."""
+    await ensure_indexes()
+    recipes = get_recipes_collection()
+    cursor = decode_history_cursor(encode_history_cursor({"created_at": datetime.utcnow(), "_id": ObjectId()}))
+
+    explains = {
+        "history_first_page": await explain_find(
+            recipes, {"user_id": USER_ID}, HISTORY_PROJECTION, [("created_at", -1), ("_id", -1)]
+        ),
+        "history_next_page": await explain_find(
+            recipes, {"user_id": USER_ID, **cursor}, HISTORY_PROJECTION, [("created_at", -1), ("_id", -1)]
+        ),
+        "export": await explain_find(
+            recipes, {"user_id": USER_ID, "created_at": {"$gte": datetime(2024, 1, 1)}}, EXPORT_PROJECTION,
+            [("created_at", 1), ("_id", 1)]
+        ),
+        "favorites": await explain_find(
+            get_favorites_collection(), {"user_id": USER_ID}, {"recipe_id": 1, "created_at": 1},
+            [("created_at", -1), ("_id", -1)]
+        )
+    }
+    for name, params in SEARCHES.items():
+        pipeline = build_search_pipeline(build_search_query(USER_ID, **params), limit=10, offset=0)
+        explains[name] = await explain_aggregate(recipes, pipeline)
+    return explains
+
+async def check():
+    failures = 0
+    for name, explain in (await collect_explains()).items():
+        names = plan_stages(explain)
+        scanned = "COLLSCAN" in names
+        failures += scanned
+        print(f"{'FAIL' if scanned else 'ok  '} {name}: {', '.join(sorted(names)) or 'no plan'}")
+    return failures
+
+async def main():
+    try:
+        failures = await check()
+    finally:
+        await close_db_connection()
+    if failures:
+        print(f"{failures} queries fall back to a collection scan")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
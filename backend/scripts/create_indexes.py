@@ -0,0 +1,39 @@
+"""Create every index the API relies on (config.database.INDEXES).
+
+The API only checks that the indexes exist at startup and reports missing
+ones on /readyz. Run this once per deployment, before rolling out code that
+needs a new index, from the backend directory:
+    python scripts/create_indexes.py [--check]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import close_db_connection, ensure_indexes, missing_indexes  # noqa: E402
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check", action="store_true", help="Only list missing indexes; exit 1 if any")
+    args = parser.parse_args()
+    try:
+        missing = await missing_indexes()
+        if args.check:
+            for name in missing:
+                print(f"missing {name}")
+            if missing:
+                sys.exit(1)
+            print("All indexes present.")
+            return
+
+        await ensure_indexes()
+        for name in missing:
+            print(f"created {name}")
+        print("All indexes present.")
+    finally:
+        await close_db_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""One-shot migration away from the embedded users.recipes array.
+
+History is now served from the recipes collection's (user_id, created_at, _id)
+index, so the array is dead weight. This script:
+1. backfills user_id on any recipe that is only referenced from a user's array
+2. removes the recipes array from every user document
+3. creates the history index and drops the old (user_id, created_at) one
+
+Run from the backend directory:
+    python scripts/migrate_drop_user_recipes.py [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import close_db_connection, get_users_collection, get_recipes_collection  # noqa: E402
+
+OLD_HISTORY_INDEX = "user_id_1_created_at_-1"
+
+async def migrate(dry_run: bool):
+    users = get_users_collection()
+    recipes = get_recipes_collection()
+
+    backfilled = 0
+    users_with_array = 0
+    async for user in users.find({"recipes": {"$exists": True}}, {"recipes": 1}):
+        users_with_array += 1
+        recipe_ids = [ObjectId(recipe_id) for recipe_id in user.get("recipes", []) if ObjectId.is_valid(recipe_id)]
+        if not recipe_ids or dry_run:
+            continue
+        result = await recipes.update_many(
+            {"_id": {"$in": recipe_ids}, "user_id": {"$exists": False}},
+            {"$set": {"user_id": str(user["_id"])}}
+        )
+        backfilled += result.modified_count
+
+    print(f"Users with an embedded recipes array: {users_with_array}")
+    if dry_run:
+        print("Dry run, nothing changed.")
+        return
+
+    print(f"Recipes backfilled with user_id: {backfilled}")
+
+    result = await users.update_many({"recipes": {"$exists": True}}, {"$unset": {"recipes": ""}})
+    print(f"Users migrated: {result.modified_count}")
+
+    await recipes.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    existing = await recipes.index_information()
+    if OLD_HISTORY_INDEX in existing:
+        await recipes.drop_index(OLD_HISTORY_INDEX)
+        print(f"Dropped index {OLD_HISTORY_INDEX}")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    try:
+        await migrate(args.dry_run)
+    finally:
+        await close_db_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main())
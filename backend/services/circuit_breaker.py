@@ -0,0 +1,136 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Count-based circuit breaker with error-rate and slow-call thresholds.
+
+    Closed: calls pass and their outcomes fill a sliding window. Once the
+    window holds min_calls outcomes and the failure or slow-call rate reaches
+    its threshold, the breaker opens and calls fail fast for open_seconds.
+    Half-open: up to half_open_probes calls go through; if they all succeed
+    in time the breaker closes, and any failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 25.0,
+        slow_call_rate: float = 0.8,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 2
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._state = CLOSED
+        # (failed, slow) per finished call while closed
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        return self._state
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now, without taking a probe slot."""
+        state = self.state
+        if state == HALF_OPEN:
+            return self._probes_in_flight < self.half_open_probes
+        return state == CLOSED
+
+    def retry_after(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def acquire(self) -> bool:
+        """Admit a call or raise CircuitOpenError. Returns True if the call is a half-open probe."""
+        if not self.available():
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.retry_after() or self.open_seconds)
+        if self._state == HALF_OPEN:
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def release(self, probe: bool):
+        """The call ended without telling anything about the upstream, e.g. it was cancelled."""
+        if probe and self._state == HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record_success(self, probe: bool, elapsed: Optional[float] = None):
+        slow = elapsed is not None and elapsed >= self.slow_call_seconds
+        if probe and self._state == HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if slow:
+                self._trip()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._state = CLOSED
+                self._outcomes.clear()
+            return
+        if self._state == CLOSED:
+            self._outcomes.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self, probe: bool):
+        if probe and self._state == HALF_OPEN:
+            self._trip()
+            return
+        if self._state == CLOSED:
+            self._outcomes.append((True, False))
+            self._evaluate()
+
+    def _evaluate(self):
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+        if failures / calls >= self.failure_rate or slow / calls >= self.slow_call_rate:
+            self._trip()
+
+    def _trip(self):
+        print(f"Circuit breaker {self.name} opened for {self.open_seconds:.0f}s")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+        self.opens += 1
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "opens": self.opens,
+            "rejected": self.rejected,
+            "retry_after_seconds": round(self.retry_after(), 1)
+        }
@@ -0,0 +1,119 @@
+import os
+import asyncio
+import base64
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from config.settings import load_env
+
+load_env()
+
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+class PreparedImage:
+    """A downscaled JPEG ready for the vision model, with its perceptual hash and stage stats."""
+
+    def __init__(self, base64_image: str, phash: int, stats: Dict):
+        self.base64_image = base64_image
+        self.phash = phash
+        self.stats = stats
+
+    def stats_header(self) -> str:
+        return ";".join(f"{key}={value}" for key, value in self.stats.items())
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+    return _executor
+
+async def read_upload(upload: UploadFile, max_bytes: int = IMAGE_MAX_UPLOAD_BYTES) -> bytes:
+    """Read an upload in chunks, rejecting it as soon as it exceeds max_bytes."""
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit"
+            )
+    return bytes(buffer)
+
+def difference_hash(image: Image.Image, hash_size: int = 8) -> int:
+    """64-bit dHash; near-duplicate photos differ in only a few bits."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def _prepare(data: bytes) -> Tuple[bytes, int, Dict]:
+    """Fix orientation, downscale, recompress and hash an image. Runs in the worker pool."""
+    stats = {}
+    start = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is not a valid image"
+        )
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    stats["decode_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    stats["resize_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    phash = difference_hash(image)
+    stats["hash_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    return output.getvalue(), phash, stats
+
+async def preprocess_image(upload: UploadFile) -> PreparedImage:
+    """Read, orient, downscale and hash an uploaded ingredient photo."""
+    start = time.perf_counter()
+    data = await read_upload(upload)
+    read_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    loop = asyncio.get_running_loop()
+    jpeg, phash, stats = await loop.run_in_executor(_get_executor(), _prepare, data)
+
+    return PreparedImage(
+        base64.b64encode(jpeg).decode("utf-8"),
+        phash,
+        {
+            "bytes_in": len(data),
+            "bytes_out": len(jpeg),
+            "read_ms": read_ms,
+            **stats
+        }
+    )
+
+def shutdown_image_pool():
+    """Stop the preprocessing pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -1,40 +1,96 @@
 import os
-from typing import List
-from openai import OpenAI
-from dotenv import load_dotenv
+import hashlib
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from services.llm_router import vision_router
+from services.circuit_breaker import CircuitOpenError
+from services.image_preprocess import PreparedImage
+from services.metrics import span, registry, Gauge
+from services.singleflight import create_flight
+from config.settings import load_env
 
-load_dotenv()
+load_env()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+IMAGE_HASH_CACHE_SIZE = int(os.getenv("IMAGE_HASH_CACHE_SIZE", "1024"))
+# Maximum differing dHash bits for two photos to count as the same ingredients
+IMAGE_HASH_MAX_DISTANCE = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "6"))
+
+class IngredientHashCache:
+    """LRU of detected ingredient lists keyed by perceptual hash, matched by Hamming distance."""
+
+    def __init__(self, max_entries: int, max_distance: int):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[int, List[str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, phash: int) -> Optional[List[str]]:
+        best_hash, best_distance = None, self.max_distance + 1
+        for cached_hash in self._entries:
+            distance = (cached_hash ^ phash).bit_count()
+            if distance < best_distance:
+                best_hash, best_distance = cached_hash, distance
+                if distance == 0:
+                    break
+        if best_hash is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(best_hash)
+        return list(self._entries[best_hash])
+
+    def set(self, phash: int, ingredients: List[str]):
+        self._entries[phash] = list(ingredients)
+        self._entries.move_to_end(phash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+ingredient_hash_cache = IngredientHashCache(IMAGE_HASH_CACHE_SIZE, IMAGE_HASH_MAX_DISTANCE)
+vision_flight = create_flight("vision")
+
+image_hash_cache_lookups = registry.register(Gauge(
+    "image_hash_cache_lookups", "Perceptual-hash ingredient cache lookups", ("result",)
+))
+
+def _collect_image_hash_cache():
+    image_hash_cache_lookups.set(ingredient_hash_cache.hits, result="hit")
+    image_hash_cache_lookups.set(ingredient_hash_cache.misses, result="miss")
+
+registry.register_collector(_collect_image_hash_cache)
 
 async def process_ingredient_image(base64_image: str) -> List[str]:
-    """Process an image to identify ingredients using GPT-4 Vision."""
+    """Process an image to identify ingredients using GPT-4 Vision.
+
+    Raises CircuitOpenError when the vision upstream is failing.
+    """
     try:
-        response = await client.chat.completions.create(
-            model="gpt-4-vision-preview",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional chef who specializes in identifying ingredients from images. Focus on main ingredients that would be used in cooking."
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "List the main ingredients you can see in this image. Please:\n1. Only list actual ingredients (no packaging, containers, or utensils)\n2. Include approximate quantities if visible\n3. List each ingredient in its basic form\n4. Separate ingredients with commas\n5. Don't include numbering or bullet points"
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+        with span("llm_vision"):
+            response = await vision_router.complete(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "You are a professional chef who specializes in identifying ingredients from images. Focus on main ingredients that would be used in cooking."
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": "List the main ingredients you can see in this image. Please:\n1. Only list actual ingredients (no packaging, containers, or utensils)\n2. Include approximate quantities if visible\n3. List each ingredient in its basic form\n4. Separate ingredients with commas\n5. Don't include numbering or bullet points"
+                            },
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                }
                             }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1000
-        )
+                        ]
+                    }
+                ],
+                max_tokens=1000
+            )
 
         if not response.choices or not response.choices[0].message.content:
             return []
@@ -49,6 +105,27 @@ async def process_ingredient_image(base64_image: str) -> List[str]:
 
         return ingredients
 
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"Error processing image: {str(e)}")
-        return [] 
\ No newline at end of file
+        return [] 
+
+async def identify_ingredients(prepared: PreparedImage) -> List[str]:
+    """Identify ingredients in a preprocessed image, reusing results for near-duplicate photos."""
+    start = time.perf_counter()
+    ingredients = ingredient_hash_cache.get(prepared.phash)
+    if ingredients is not None:
+        prepared.stats["hash_cache"] = "hit"
+    else:
+        prepared.stats["hash_cache"] = "miss"
+        # Identical uploads in flight at the same time share one vision call
+        content_key = hashlib.sha256(prepared.base64_image.encode("ascii")).hexdigest()
+        ingredients = list(await vision_flight.do(
+            content_key,
+            lambda: process_ingredient_image(prepared.base64_image)
+        ))
+        if ingredients:
+            ingredient_hash_cache.set(prepared.phash, ingredients)
+    prepared.stats["vision_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return ingredients
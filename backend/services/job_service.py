@@ -0,0 +1,242 @@
+import os
+import asyncio
+import socket
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from config.settings import load_env
+from config.database import get_jobs_collection
+
+load_env()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "500"))
+# "local" keeps jobs in memory; "mongo" persists them so they survive restarts
+# and can be picked up by any API worker.
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "local")
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+# How long a job WebSocket waits for the job to finish before closing
+JOB_WEBSOCKET_TIMEOUT_SECONDS = float(os.getenv("JOB_WEBSOCKET_TIMEOUT_SECONDS", "600"))
+
+JobHandler = Callable[[Dict, str], Awaitable[Dict]]
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+def _ms_between(start: Optional[datetime], end: Optional[datetime]) -> Optional[int]:
+    if not start or not end:
+        return None
+    return int((end - start).total_seconds() * 1000)
+
+def format_job(job: Dict) -> Dict:
+    """Public view of a job, with queue wait and run time for sizing the pool."""
+    return {
+        "id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "queue_wait_ms": _ms_between(job["created_at"], job.get("started_at")),
+        "run_ms": _ms_between(job.get("started_at"), job.get("finished_at"))
+    }
+
+class JobManager:
+    """Bounded pool of background workers running generation jobs."""
+
+    def __init__(self, workers: int, queue_size: int, backend: str):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.backend = backend
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: Dict[str, Dict] = {}
+        # One event per active wait(), so the dict only holds jobs someone is waiting on
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register_handler(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: Dict, user_id: str) -> Dict:
+        """Queue a job and return its initial state immediately."""
+        job = {
+            "_id": ObjectId(),
+            "kind": kind,
+            "user_id": str(user_id),
+            "payload": payload,
+            "status": "queued",
+            "created_at": datetime.utcnow()
+        }
+
+        if self.backend == "mongo":
+            queued = await get_jobs_collection().count_documents({"status": "queued"}, limit=self.queue_size)
+            if queued >= self.queue_size:
+                self._raise_queue_full()
+            await get_jobs_collection().insert_one(job)
+        else:
+            self._prune()
+            try:
+                self._queue.put_nowait(str(job["_id"]))
+            except asyncio.QueueFull:
+                self._raise_queue_full()
+            self._jobs[str(job["_id"])] = job
+
+        return format_job(job)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Dict]:
+        """Return a job owned by user_id, or None."""
+        if self.backend == "mongo":
+            if not ObjectId.is_valid(job_id):
+                return None
+            job = await get_jobs_collection().find_one(
+                {"_id": ObjectId(job_id), "user_id": str(user_id)},
+                {"payload": 0}
+            )
+        else:
+            job = self._jobs.get(job_id)
+            if job and job["user_id"] != str(user_id):
+                job = None
+        return format_job(job) if job else None
+
+    async def wait(self, job_id: str, user_id: str, timeout: float) -> Optional[Dict]:
+        """Wait until a job finishes (or timeout) and return its latest state."""
+        # Registered before the first read so a finish in between is not missed
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, set()).add(event)
+        deadline = asyncio.get_running_loop().time() + timeout
+        try:
+            while True:
+                job = await self.get(job_id, user_id)
+                if job is None or job["status"] in FINISHED_STATUSES:
+                    return job
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    return job
+                # Jobs run by another API worker only show up by polling
+                poll_interval = JOB_POLL_INTERVAL_SECONDS * 4 if self.backend != "mongo" else JOB_POLL_INTERVAL_SECONDS
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def _raise_queue_full(self):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Job queue is full, please retry",
+            headers={"Retry-After": "5"}
+        )
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATUSES and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _claim(self) -> Optional[Dict]:
+        if self.backend != "mongo":
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job:
+                job["status"] = "running"
+                job["started_at"] = datetime.utcnow()
+            return job
+
+        # Queued jobs, or running jobs whose worker died and let the lease lapse
+        now = datetime.utcnow()
+        job = await get_jobs_collection().find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ]},
+            {"$set": {
+                "status": "running",
+                "started_at": now,
+                "worker": self.worker_id,
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS)
+            }},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+        return job
+
+    async def _finish(self, job: Dict, result: Optional[Dict], error: Optional[str]):
+        job["status"] = "failed" if error else "succeeded"
+        job["result"] = result
+        job["error"] = error
+        job["finished_at"] = datetime.utcnow()
+
+        if self.backend == "mongo":
+            await get_jobs_collection().update_one(
+                {"_id": job["_id"]},
+                {"$set": {
+                    "status": job["status"],
+                    "result": result,
+                    "error": error,
+                    "finished_at": job["finished_at"],
+                    "expires_at": job["finished_at"] + timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+                }, "$unset": {"payload": ""}}
+            )
+        else:
+            job.pop("payload", None)
+
+        for event in self._waiters.get(str(job["_id"]), ()):
+            event.set()
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error claiming job: {str(e)}")
+                await asyncio.sleep(JOB_POLL_INTERVAL_SECONDS)
+                continue
+            if job is None:
+                continue
+
+            handler = self._handlers.get(job["kind"])
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown job kind: {job['kind']}")
+                result = await handler(job["payload"], job["user_id"])
+                await self._finish(job, result, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                print(f"Error running job {job['_id']}: {detail}")
+                try:
+                    await self._finish(job, None, detail)
+                except Exception as finish_error:
+                    print(f"Error recording job failure: {str(finish_error)}")
+
+job_manager = JobManager(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_QUEUE_BACKEND)
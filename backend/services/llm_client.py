@@ -0,0 +1,143 @@
+import asyncio
+import random
+from typing import Dict, Optional, AsyncIterator
+import httpx
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+from config.settings import get_settings
+from services.metrics import record_token_usage
+
+settings = get_settings()
+
+# Upstream configuration
+OPENAI_API_KEY = settings.openai_api_key
+OPENAI_BASE_URL = settings.openai_base_url
+LLM_TIMEOUT_SECONDS = settings.llm_timeout_seconds
+LLM_CONNECT_TIMEOUT_SECONDS = settings.llm_connect_timeout_seconds
+LLM_MAX_CONCURRENCY = settings.llm_max_concurrency
+LLM_MAX_CONNECTIONS = settings.llm_max_connections
+LLM_MAX_RETRIES = settings.llm_max_retries
+LLM_BACKOFF_BASE_SECONDS = settings.llm_backoff_base_seconds
+LLM_BACKOFF_MAX_SECONDS = settings.llm_backoff_max_seconds
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_clients: Dict[Optional[str], AsyncOpenAI] = {}
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_llm_client(base_url: Optional[str] = None) -> AsyncOpenAI:
+    """Get the shared async OpenAI client for an endpoint, creating it on first use.
+
+    base_url=None is the default OPENAI_BASE_URL endpoint; each other endpoint
+    gets its own connection pool.
+    """
+    base_url = base_url or OPENAI_BASE_URL
+    client = _clients.get(base_url)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+        )
+        client = _clients[base_url] = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=base_url,
+            http_client=http_client,
+            max_retries=0  # Retries are handled below so they respect the semaphore
+        )
+    return client
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+def _backoff_delay(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After when the upstream sends one."""
+    if isinstance(error, APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+    ceiling = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+async def chat_completion(timeout: Optional[float] = None, base_url: Optional[str] = None, **kwargs):
+    """Create a chat completion through the shared client.
+
+    In-flight upstream calls are bounded by a global semaphore and 429/5xx or
+    connection errors are retried with jittered backoff.
+    """
+    client = get_llm_client(base_url)
+    attempt = 0
+    while True:
+        try:
+            async with _get_semaphore():
+                response = await client.chat.completions.create(
+                    timeout=timeout or LLM_TIMEOUT_SECONDS,
+                    **kwargs
+                )
+            record_token_usage(kwargs.get("model", ""), response.usage)
+            return response
+        except Exception as e:
+            if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _backoff_delay(attempt, e)
+            attempt += 1
+            print(f"Upstream LLM call failed ({e}), retrying in {delay:.2f}s (attempt {attempt})")
+            await asyncio.sleep(delay)
+
+async def stream_chat_completion(
+    timeout: Optional[float] = None,
+    base_url: Optional[str] = None,
+    **kwargs
+) -> AsyncIterator[str]:
+    """Stream the content deltas of a chat completion.
+
+    The semaphore slot is held until the stream is exhausted or closed. Only
+    failures before the first chunk are retried, since a partially consumed
+    stream cannot be replayed to the caller.
+    """
+    client = get_llm_client(base_url)
+    attempt = 0
+    async with _get_semaphore():
+        while True:
+            try:
+                stream = await client.chat.completions.create(
+                    timeout=timeout or LLM_TIMEOUT_SECONDS,
+                    stream=True,
+                    **kwargs
+                )
+                break
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _backoff_delay(attempt, e)
+                attempt += 1
+                print(f"Upstream LLM stream failed ({e}), retrying in {delay:.2f}s (attempt {attempt})")
+                await asyncio.sleep(delay)
+
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.response.aclose()
+
+async def close_llm_client():
+    """Close the shared clients and their connection pools."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
@@ -0,0 +1,371 @@
+import os
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from config.settings import load_env
+from services.llm_client import chat_completion, stream_chat_completion
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from services.metrics import registry, Gauge
+
+load_env()
+
+# Ordered backends per task, comma-separated "model" or "model@base_url" entries.
+# The first healthy backend is the primary; the next one receives hedges.
+LLM_ROUTES_RECIPE = os.getenv("LLM_ROUTES_RECIPE", "gpt-3.5-turbo")
+LLM_ROUTES_VISION = os.getenv("LLM_ROUTES_VISION", "gpt-4-vision-preview")
+# "ordered" keeps the configured preference, "latency" picks the fastest healthy backend
+LLM_ROUTING_STRATEGY = os.getenv("LLM_ROUTING_STRATEGY", "ordered")
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+# Hedge after this percentile of the primary's recent latencies
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+# Used until a backend has LLM_HEDGE_MIN_SAMPLES latency samples
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Hedges stop once their spend exceeds this fraction of primary spend
+LLM_HEDGE_MAX_EXTRA_COST = float(os.getenv("LLM_HEDGE_MAX_EXTRA_COST", "0.1"))
+# With a single backend, hedge by calling it a second time; off by default since it
+# doubles slow calls against the same upstream
+LLM_HEDGE_SAME_BACKEND = os.getenv("LLM_HEDGE_SAME_BACKEND", "false").lower() == "true"
+# USD per 1K tokens, "model=prompt_price:completion_price" comma-separated
+LLM_MODEL_PRICES = os.getenv(
+    "LLM_MODEL_PRICES",
+    "gpt-3.5-turbo=0.0015:0.002,gpt-4-vision-preview=0.01:0.03"
+)
+LLM_EWMA_ALPHA = float(os.getenv("LLM_EWMA_ALPHA", "0.2"))
+# Backends whose error EWMA is above this are skipped while another is healthy
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))
+# Error EWMA halves every this many seconds without new calls, so a skipped backend recovers
+LLM_ERROR_HALF_LIFE_SECONDS = float(os.getenv("LLM_ERROR_HALF_LIFE_SECONDS", "30"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+# Per-backend circuit breaker: opens when the failure or slow-call rate over the
+# last LLM_BREAKER_WINDOW calls reaches its threshold, fails fast, then probes
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() == "true"
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "25"))
+LLM_BREAKER_SLOW_CALL_RATE = float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", "0.8"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "2"))
+
+def parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    prices = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, price = entry.partition("=")
+        prompt_price, _, completion_price = price.partition(":")
+        prices[model.strip()] = (float(prompt_price), float(completion_price or prompt_price))
+    return prices
+
+MODEL_PRICES = parse_prices(LLM_MODEL_PRICES)
+
+class Backend:
+    """One model on one endpoint, with live latency, error and spend statistics."""
+
+    def __init__(self, model: str, base_url: Optional[str] = None):
+        self.model = model
+        self.base_url = base_url
+        self.name = f"{model}@{base_url}" if base_url else model
+        self.latency_ewma: Optional[float] = None
+        self._error_ewma = 0.0
+        self._error_updated_at = time.monotonic()
+        self.calls = 0
+        self.errors = 0
+        self.cost = 0.0
+        self.tokens_per_call: Optional[float] = None
+        self._latencies: Deque[float] = deque(maxlen=LLM_LATENCY_WINDOW)
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_rate=LLM_BREAKER_FAILURE_RATE,
+            slow_call_seconds=LLM_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=LLM_BREAKER_SLOW_CALL_RATE,
+            window=LLM_BREAKER_WINDOW,
+            min_calls=LLM_BREAKER_MIN_CALLS,
+            open_seconds=LLM_BREAKER_OPEN_SECONDS,
+            half_open_probes=LLM_BREAKER_HALF_OPEN_PROBES
+        )
+
+    @property
+    def error_ewma(self) -> float:
+        idle = time.monotonic() - self._error_updated_at
+        return self._error_ewma * 0.5 ** (idle / LLM_ERROR_HALF_LIFE_SECONDS)
+
+    @property
+    def healthy(self) -> bool:
+        return self.error_ewma <= LLM_MAX_ERROR_RATE
+
+    def _record_outcome(self, failed: bool):
+        self._error_ewma = self._ewma(self.error_ewma, 1.0 if failed else 0.0)
+        self._error_updated_at = time.monotonic()
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self._latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + LLM_EWMA_ALPHA * (sample - current)
+
+    def record_latency(self, elapsed: float):
+        self._latencies.append(elapsed)
+        self.latency_ewma = self._ewma(self.latency_ewma, elapsed)
+
+    def record_success(self, elapsed: float, usage) -> float:
+        """Update statistics for a finished call and return what it cost."""
+        self.calls += 1
+        self.record_latency(elapsed)
+        self._record_outcome(False)
+        cost = 0.0
+        if usage is not None:
+            prompt_price, completion_price = MODEL_PRICES.get(self.model, (0.0, 0.0))
+            cost = ((usage.prompt_tokens or 0) * prompt_price + (usage.completion_tokens or 0) * completion_price) / 1000
+            self.tokens_per_call = self._ewma(self.tokens_per_call, usage.total_tokens or 0)
+        self.cost += cost
+        return cost
+
+    def record_error(self):
+        self.calls += 1
+        self.errors += 1
+        self._record_outcome(True)
+
+    def record_stream(self):
+        # Stream duration depends on output length, so it is kept out of the latency window
+        self.calls += 1
+        self._record_outcome(False)
+
+    def estimated_call_cost(self) -> float:
+        """Cost of a call cancelled before it reported usage, from recent calls."""
+        if not self.tokens_per_call:
+            return 0.0
+        prompt_price, completion_price = MODEL_PRICES.get(self.model, (0.0, 0.0))
+        return self.tokens_per_call * max(prompt_price, completion_price) / 1000
+
+    def stats(self) -> Dict:
+        p95 = self.percentile(0.95)
+        return {
+            "backend": self.name,
+            "healthy": self.healthy,
+            "calls": self.calls,
+            "errors": self.errors,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_ewma": round(self.error_ewma, 4),
+            "cost_usd": round(self.cost, 6),
+            "breaker": self.breaker.stats()
+        }
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Timeouts, connection errors, 5xx and 429 count against a backend's breaker; other 4xx do not."""
+    status_code = getattr(error, "status_code", None)
+    return status_code is None or status_code >= 500 or status_code == 429
+
+def parse_routes(spec: str) -> List[Backend]:
+    backends = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, base_url = entry.partition("@")
+        backends.append(Backend(model.strip(), base_url.strip() or None))
+    return backends
+
+class LLMRouter:
+    """Routes one task's completions over an ordered list of backends.
+
+    A completion goes to the primary backend. If it is still running after
+    the primary's p95 latency, a hedge is sent to the next backend, the first
+    response wins and the other call is cancelled. With a single backend
+    there is no hedge unless LLM_HEDGE_SAME_BACKEND is set. Hedges are
+    skipped once their spend passes LLM_HEDGE_MAX_EXTRA_COST of the primary
+    spend. Errors fail over to the next backend in order. Backends whose circuit breaker is
+    open are skipped; with every breaker open, calls raise CircuitOpenError
+    at once instead of queueing on a failing upstream.
+    """
+
+    def __init__(self, task: str, backends: List[Backend]):
+        if not backends:
+            raise ValueError(f"No LLM backends configured for {task}")
+        self.task = task
+        self.backends = backends
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.primary_cost = 0.0
+        self.hedge_cost = 0.0
+
+    @property
+    def model(self) -> str:
+        """The preferred model, e.g. for cache keys."""
+        return self.backends[0].model
+
+    def ranked(self) -> List[Backend]:
+        """Backends in the order to try them. Raises CircuitOpenError if every breaker is open."""
+        backends = self.backends
+        if LLM_BREAKER_ENABLED:
+            backends = [backend for backend in backends if backend.breaker.available()]
+            if not backends:
+                for backend in self.backends:
+                    backend.breaker.rejected += 1
+                retry_after = min(backend.breaker.retry_after() or backend.breaker.open_seconds for backend in self.backends)
+                raise CircuitOpenError(f"LLM {self.task}", retry_after)
+        healthy = [backend for backend in backends if backend.healthy]
+        unhealthy = [backend for backend in backends if not backend.healthy]
+        if LLM_ROUTING_STRATEGY == "latency":
+            # Unmeasured backends sort first so they get sampled
+            healthy.sort(key=lambda backend: backend.latency_ewma or 0.0)
+        return healthy + unhealthy
+
+    def hedge_delay(self, backend: Backend) -> float:
+        delay = backend.percentile(LLM_HEDGE_PERCENTILE)
+        if delay is None:
+            delay = LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(delay, LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    def hedge_allowed(self) -> bool:
+        return LLM_HEDGING_ENABLED and self.hedge_cost <= self.primary_cost * LLM_HEDGE_MAX_EXTRA_COST
+
+    async def _call(self, backend: Backend, hedge: bool, kwargs: Dict) -> Any:
+        probe = backend.breaker.acquire() if LLM_BREAKER_ENABLED else False
+        start = time.perf_counter()
+        try:
+            response = await chat_completion(base_url=backend.base_url, model=backend.model, **kwargs)
+        except asyncio.CancelledError:
+            # Lost the race. Its elapsed time is cut short, so it stays out of
+            # the latency window that sets the hedge delay; only the spend counts.
+            backend.breaker.release(probe)
+            cost = backend.estimated_call_cost()
+            backend.cost += cost
+            self._charge(cost, hedge)
+            raise
+        except Exception as e:
+            backend.record_error()
+            self._record_breaker_failure(backend, probe, e)
+            raise
+        elapsed = time.perf_counter() - start
+        backend.breaker.record_success(probe, elapsed)
+        self._charge(backend.record_success(elapsed, response.usage), hedge)
+        return response
+
+    def _record_breaker_failure(self, backend: Backend, probe: bool, error: Exception):
+        if is_upstream_failure(error):
+            backend.breaker.record_failure(probe)
+        else:
+            backend.breaker.release(probe)
+
+    def _charge(self, cost: float, hedge: bool):
+        if hedge:
+            self.hedge_cost += cost
+        else:
+            self.primary_cost += cost
+
+    async def complete(self, **kwargs) -> Any:
+        """Chat completion for this task; kwargs are passed through except model."""
+        ranked = self.ranked()
+        primary = ranked[0]
+        if len(ranked) > 1:
+            secondary = ranked[1]
+        else:
+            secondary = primary if LLM_HEDGE_SAME_BACKEND else None
+        hedge = secondary is not None and self.hedge_allowed()
+        primary_task = asyncio.create_task(self._call(primary, False, kwargs))
+        tasks = {primary_task}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary) if hedge else None)
+            if not done:
+                self.hedges += 1
+                hedge_task = asyncio.create_task(self._call(secondary, True, kwargs))
+                tasks.add(hedge_task)
+                while tasks:
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    winner = next((task for task in done if not task.exception()), None)
+                    if winner is not None:
+                        self.hedge_wins += winner is hedge_task
+                        return winner.result()
+                # Both failed
+                raise primary_task.exception()
+            if not primary_task.exception():
+                return primary_task.result()
+            error = primary_task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # Primary failed before a hedge was needed: fail over in order
+        for backend in ranked[1:]:
+            try:
+                return await self._call(backend, False, kwargs)
+            except Exception as e:
+                error = e
+        raise error
+
+    async def stream(self, **kwargs) -> AsyncIterator[str]:
+        """Stream from the primary backend. Streams are not hedged: the
+        first chunk arrives quickly and a partial stream cannot be swapped."""
+        backend = self.ranked()[0]
+        probe = backend.breaker.acquire() if LLM_BREAKER_ENABLED else False
+        try:
+            async for delta in stream_chat_completion(base_url=backend.base_url, model=backend.model, **kwargs):
+                yield delta
+        except Exception as e:
+            backend.record_error()
+            self._record_breaker_failure(backend, probe, e)
+            raise
+        except BaseException:
+            # Client went away mid-stream, which says nothing about the backend
+            backend.breaker.release(probe)
+            raise
+        backend.record_stream()
+        backend.breaker.record_success(probe)
+
+    def stats(self) -> Dict:
+        return {
+            "task": self.task,
+            "hedging": LLM_HEDGING_ENABLED,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "primary_cost_usd": round(self.primary_cost, 6),
+            "hedge_cost_usd": round(self.hedge_cost, 6),
+            "backends": [backend.stats() for backend in self.backends]
+        }
+
+recipe_router = LLMRouter("recipe", parse_routes(LLM_ROUTES_RECIPE))
+vision_router = LLMRouter("vision", parse_routes(LLM_ROUTES_VISION))
+
+llm_backend_latency = registry.register(Gauge(
+    "llm_backend_latency_seconds", "Upstream latency per backend (EWMA and hedge percentile)", ("task", "backend", "stat")
+))
+llm_backend_error_rate = registry.register(Gauge(
+    "llm_backend_error_rate", "Upstream error EWMA per backend", ("task", "backend")
+))
+llm_cost = registry.register(Gauge(
+    "llm_cost_usd", "Estimated upstream spend", ("task", "backend", "kind")
+))
+llm_hedges = registry.register(Gauge(
+    "llm_hedges", "Hedged requests fired and won by the hedge", ("task", "result")
+))
+llm_breaker_state = registry.register(Gauge(
+    "llm_breaker_state", "Circuit breaker state per backend: 0 closed, 1 half-open, 2 open", ("task", "backend")
+))
+llm_breaker_events = registry.register(Gauge(
+    "llm_breaker_events", "Times a backend's breaker opened, and calls it rejected", ("task", "backend", "event")
+))
+
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+def _collect_llm_routers():
+    for router in (recipe_router, vision_router):
+        for backend in router.backends:
+            if backend.latency_ewma is not None:
+                llm_backend_latency.set(backend.latency_ewma, task=router.task, backend=backend.name, stat="ewma")
+            hedge_at = backend.percentile(LLM_HEDGE_PERCENTILE)
+            if hedge_at is not None:
+                llm_backend_latency.set(hedge_at, task=router.task, backend=backend.name, stat="hedge_percentile")
+            llm_backend_error_rate.set(backend.error_ewma, task=router.task, backend=backend.name)
+            llm_cost.set(backend.cost, task=router.task, backend=backend.name, kind="total")
+            llm_breaker_state.set(BREAKER_STATE_VALUES[backend.breaker.state], task=router.task, backend=backend.name)
+            llm_breaker_events.set(backend.breaker.opens, task=router.task, backend=backend.name, event="opened")
+            llm_breaker_events.set(backend.breaker.rejected, task=router.task, backend=backend.name, event="rejected")
+        llm_cost.set(router.hedge_cost, task=router.task, backend="all", kind="hedge")
+        llm_hedges.set(router.hedges, task=router.task, result="fired")
+        llm_hedges.set(router.hedge_wins, task=router.task, result="won")
+
+registry.register_collector(_collect_llm_routers)
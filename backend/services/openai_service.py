@@ -1,12 +1,38 @@
-import os
-from typing import Optional, Dict, List
-from openai import OpenAI
-from dotenv import load_dotenv
+from typing import Optional, Dict, List, Any, AsyncIterator, Tuple
+import copy
 import json
+import os
+from config.settings import load_env
+from services.llm_router import recipe_router
+from services.circuit_breaker import CircuitOpenError
+from services.recipe_cache import recipe_cache, make_recipe_cache_key, RECIPE_CACHE_ENABLED
+from services.recipe_stream import IncrementalJSONParser
+from services.recipe_normalize import (
+    clean_instruction, clean_ingredient, normalize_recipe, missing_fields, parse_recipe_json, validate_recipe
+)
+from services.metrics import span
+from services.singleflight import (
+    create_flight, acquire_shared_lock, release_shared_lock, wait_for_shared_result, SINGLEFLIGHT_SHARED
+)
+
+load_env()
+
+# Preferred model of the recipe route; part of every recipe cache key
+RECIPE_MODEL = recipe_router.model
+
+RECIPE_SYSTEM_PROMPT = """You are a professional chef creating detailed, accurate recipes. 
+                    Important formatting rules:
+                    - DO NOT include any numbers, bullets, or prefixes in instruction steps
+                    - Each instruction should start directly with an action verb
+                    - Example correct format: "Mix the flour and water" (not "1. Mix" or "First, mix")
+                    - Keep instructions clear and concise
+                    - Use precise measurements in ingredients
+                    - STRICTLY follow the specified number of servings and other preferences"""
 
-load_dotenv()
+# Token budget for the follow-up call that only fills in missing fields
+RECIPE_FILL_MAX_TOKENS = int(os.getenv("RECIPE_FILL_MAX_TOKENS", "400"))
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+recipe_flight = create_flight("recipe")
 
 def create_recipe_prompt(ingredients: List[str], preferences: Optional[Dict] = None) -> str:
     base_prompt = """Create a detailed recipe using the available ingredients and following the specified preferences. Format the response as a JSON object with the following structure:
@@ -52,79 +78,262 @@ Important requirements:
     
     return base_prompt
 
-async def generate_recipe(ingredients: List[str], preferences: Optional[Dict] = None) -> Optional[Dict]:
-    """Generate a recipe using OpenAI's GPT-3.5."""
-    try:
-        prompt = create_recipe_prompt(ingredients, preferences)
-        
-        response = await client.chat.completions.create(
-            model="gpt-3.5-turbo",
+def build_recipe_messages(ingredients: List[str], preferences: Optional[Dict] = None) -> List[Dict]:
+    return [
+        {
+            "role": "system",
+            "content": RECIPE_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": create_recipe_prompt(ingredients, preferences)
+        }
+    ]
+
+def apply_preferences(recipe_data: Dict, preferences: Optional[Dict] = None) -> Dict:
+    """Overwrite generated fields with the preferences the user asked for."""
+    if preferences:
+        if preferences.get('servings'):
+            recipe_data["servings"] = int(preferences["servings"])
+        if preferences.get('cookingTime'):
+            recipe_data["cooking_time"] = int(preferences["cookingTime"])
+        if preferences.get('calories'):
+            recipe_data["calories"] = int(preferences["calories"])
+        if preferences.get('cuisineType') and preferences['cuisineType'] != 'any':
+            recipe_data["cuisine_type"] = preferences["cuisineType"]
+        if preferences.get('dietType') and preferences['dietType'] != 'any':
+            recipe_data["diet_type"] = preferences["dietType"]
+        if preferences.get('difficulty'):
+            recipe_data["difficulty"] = preferences["difficulty"]
+    return recipe_data
+
+async def fill_missing_fields(
+    recipe_data: Dict,
+    missing: List[str],
+    ingredients: List[str],
+    preferences: Optional[Dict] = None
+) -> Dict:
+    """Ask the model for just the missing fields of an otherwise usable recipe."""
+    partial = json.dumps(recipe_data, ensure_ascii=False)
+    with span("llm_recipe_fill"):
+        response = await recipe_router.complete(
             response_format={ "type": "json_object" },
             messages=[
+                *build_recipe_messages(ingredients, preferences),
+                {"role": "assistant", "content": partial},
                 {
-                    "role": "system",
-                    "content": """You are a professional chef creating detailed, accurate recipes. 
-                    Important formatting rules:
-                    - DO NOT include any numbers, bullets, or prefixes in instruction steps
-                    - Each instruction should start directly with an action verb
-                    - Example correct format: "Mix the flour and water" (not "1. Mix" or "First, mix")
-                    - Keep instructions clear and concise
-                    - Use precise measurements in ingredients
-                    - STRICTLY follow the specified number of servings and other preferences"""
-                },
+                    "role": "user",
+                    "content": (
+                        f"The recipe above is missing: {', '.join(missing)}. "
+                        f"Reply with a JSON object containing only those keys."
+                    )
+                }
+            ],
+            temperature=0.2,
+            max_tokens=RECIPE_FILL_MAX_TOKENS
+        )
+
+    if response.choices and response.choices[0].message.content:
+        filled = normalize_recipe(parse_recipe_json(response.choices[0].message.content))
+        for field in missing:
+            if filled.get(field):
+                recipe_data[field] = filled[field]
+    return recipe_data
+
+RECIPE_REFINE_SYSTEM_PROMPT = """You edit existing recipes.
+                    - Reply with a JSON object containing only the fields you change, with the same keys and formats as the recipe
+                    - Lists (ingredients, instructions) are replaced whole, so return the complete new list
+                    - Instruction steps have no numbers or prefixes
+                    - Keep everything the edit does not require changing"""
+
+# Token budget for a refinement patch; full generations get 1000
+RECIPE_REFINE_MAX_TOKENS = int(os.getenv("RECIPE_REFINE_MAX_TOKENS", "700"))
+
+async def refine_recipe_with_model(recipe_data: Dict, instruction: str) -> Tuple[Dict, Any]:
+    """Ask the model for the fields an edit changes. Returns (normalized patch, usage)."""
+    with span("llm_recipe_refine"):
+        response = await recipe_router.complete(
+            response_format={ "type": "json_object" },
+            messages=[
+                {"role": "system", "content": RECIPE_REFINE_SYSTEM_PROMPT},
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": (
+                        f"Recipe: {json.dumps(recipe_data, ensure_ascii=False, separators=(',', ':'))}\n"
+                        f"Edit: {instruction}"
+                    )
                 }
             ],
+            temperature=0.3,
+            max_tokens=RECIPE_REFINE_MAX_TOKENS
+        )
+
+    if not response.choices or not response.choices[0].message.content:
+        raise ValueError("Empty refinement from model")
+    return normalize_recipe(parse_recipe_json(response.choices[0].message.content)), response.usage
+
+async def finish_recipe(
+    recipe_data: Dict,
+    ingredients: List[str],
+    preferences: Optional[Dict] = None
+) -> Dict:
+    """Apply preferences, fill any missing required fields and validate. Raises on failure."""
+    apply_preferences(recipe_data, preferences)
+    missing = missing_fields(recipe_data)
+    if missing:
+        print(f"Recipe missing {missing}, requesting just those fields")
+        await fill_missing_fields(recipe_data, missing, ingredients, preferences)
+        missing = missing_fields(recipe_data)
+        if missing:
+            raise ValueError(f"Missing required fields in recipe data: {', '.join(missing)}")
+    return validate_recipe(recipe_data)
+
+async def _call_recipe_model(ingredients: List[str], preferences: Optional[Dict] = None) -> Optional[Dict]:
+    """One upstream completion plus post-processing. Raises on failure."""
+    with span("llm_recipe"):
+        response = await recipe_router.complete(
+            response_format={ "type": "json_object" },
+            messages=build_recipe_messages(ingredients, preferences),
             temperature=0.7,
             max_tokens=1000
         )
 
-        if response.choices and response.choices[0].message.content:
-            recipe_data = json.loads(response.choices[0].message.content)
-            
-            # Clean up instructions to remove any numbering or bullets
-            recipe_data["instructions"] = [
-                # Remove any numbers, bullets, or prefixes like "Step 1:", "First,"
-                step.lstrip("0123456789-.).• ").replace("Step ", "").replace("step ", "")
-                    .replace("First, ", "").replace("Then, ", "").replace("Finally, ", "")
-                    .replace("Next, ", "").capitalize()
-                for step in recipe_data["instructions"]
-                if step.strip()
-            ]
-            
-            # Clean up ingredients to ensure consistent formatting
-            recipe_data["ingredients"] = [
-                ingredient.strip().lower().capitalize()
-                for ingredient in recipe_data["ingredients"]
-                if ingredient.strip()
-            ]
-            
-            # Ensure all required fields are present and preferences are followed
-            required_fields = ["title", "ingredients", "instructions", "cooking_time", "servings"]
-            if not all(field in recipe_data for field in required_fields):
-                raise ValueError("Missing required fields in recipe data")
-            
-            # Enforce preferences if specified
-            if preferences:
-                if preferences.get('servings'):
-                    recipe_data["servings"] = int(preferences["servings"])
-                if preferences.get('cookingTime'):
-                    recipe_data["cooking_time"] = int(preferences["cookingTime"])
-                if preferences.get('calories'):
-                    recipe_data["calories"] = int(preferences["calories"])
-                if preferences.get('cuisineType') and preferences['cuisineType'] != 'any':
-                    recipe_data["cuisine_type"] = preferences["cuisineType"]
-                if preferences.get('dietType') and preferences['dietType'] != 'any':
-                    recipe_data["diet_type"] = preferences["dietType"]
-                if preferences.get('difficulty'):
-                    recipe_data["difficulty"] = preferences["difficulty"]
-            
-            return recipe_data
-        
+    if not response.choices or not response.choices[0].message.content:
         return None
 
+    with span("recipe_postprocess"):
+        # Tolerates fenced or truncated JSON and coerces values like "30 minutes"
+        recipe_data = normalize_recipe(parse_recipe_json(response.choices[0].message.content))
+    
+    return await finish_recipe(recipe_data, ingredients, preferences)
+
+async def _generate_and_cache(
+    ingredients: List[str],
+    preferences: Optional[Dict],
+    cache_key: Optional[str]
+) -> Optional[Dict]:
+    """Leader side of a coalesced generation: call the model and fill the cache."""
+    shared_lock = SINGLEFLIGHT_SHARED and RECIPE_CACHE_ENABLED and cache_key is not None
+    if shared_lock and not await acquire_shared_lock(cache_key):
+        # Another API worker is generating the same recipe; wait for its cache entry
+        cached = await wait_for_shared_result(cache_key, lambda: recipe_cache.get(cache_key, record_stats=False))
+        if cached is not None:
+            return cached
+        shared_lock = False
+
+    try:
+        recipe_data = await _call_recipe_model(ingredients, preferences)
+        if recipe_data and cache_key and RECIPE_CACHE_ENABLED:
+            await recipe_cache.set(cache_key, recipe_data)
+        return recipe_data
+    finally:
+        if shared_lock:
+            await release_shared_lock(cache_key)
+
+async def generate_recipe(
+    ingredients: List[str],
+    preferences: Optional[Dict] = None,
+    use_cache: bool = True,
+    cache_salt: Optional[str] = None
+) -> Optional[Dict]:
+    """Generate a recipe using OpenAI's GPT-3.5.
+
+    Identical normalized requests are served from the recipe cache, and
+    concurrent identical requests share a single upstream call. Pass
+    use_cache=False to always get a fresh completion, or a cache_salt to keep
+    several variants of the same request. Raises CircuitOpenError when the
+    upstream is failing, so callers can serve something else.
+    """
+    try:
+        cache_key = None
+        if use_cache:
+            cache_key = make_recipe_cache_key(ingredients, preferences, RECIPE_MODEL, cache_salt)
+            if RECIPE_CACHE_ENABLED:
+                cached = await recipe_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+        if cache_key is None:
+            return await _call_recipe_model(ingredients, preferences)
+
+        recipe_data = await recipe_flight.do(
+            cache_key,
+            lambda: _generate_and_cache(ingredients, preferences, cache_key)
+        )
+        # Every coalesced caller gets its own copy to modify
+        return copy.deepcopy(recipe_data)
+
+    except CircuitOpenError:
+        raise
     except Exception as e:
         print(f"Error generating recipe: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+
+async def stream_recipe(
+    ingredients: List[str],
+    preferences: Optional[Dict] = None,
+    use_cache: bool = True
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream a recipe as (event, data) pairs while the model is still writing it.
+
+    Emits "field" for each top-level scalar (title, cooking_time, ...),
+    "ingredient" and "instruction" for each completed list item, and finally
+    "recipe" with the assembled, cleaned-up recipe dict.
+    """
+    cache_key = None
+    if use_cache and RECIPE_CACHE_ENABLED:
+        cache_key = make_recipe_cache_key(ingredients, preferences, RECIPE_MODEL)
+        cached = await recipe_cache.get(cache_key)
+        if cached is not None:
+            for field, value in cached.items():
+                if field not in ("ingredients", "instructions"):
+                    yield "field", {field: value}
+            for ingredient in cached.get("ingredients", []):
+                yield "ingredient", ingredient
+            for index, step in enumerate(cached.get("instructions", [])):
+                yield "instruction", {"index": index, "text": step}
+            yield "recipe", cached
+            return
+
+    parser = IncrementalJSONParser()
+    recipe_data: Dict[str, Any] = {"ingredients": [], "instructions": []}
+
+    async for delta in recipe_router.stream(
+        response_format={ "type": "json_object" },
+        messages=build_recipe_messages(ingredients, preferences),
+        temperature=0.7,
+        max_tokens=1000
+    ):
+        for kind, field, value in parser.feed(delta):
+            if kind == "item" and field == "instructions":
+                if not isinstance(value, str) or not value.strip():
+                    continue
+                step = clean_instruction(value)
+                recipe_data["instructions"].append(step)
+                yield "instruction", {"index": len(recipe_data["instructions"]) - 1, "text": step}
+            elif kind == "item" and field == "ingredients":
+                if not isinstance(value, str) or not value.strip():
+                    continue
+                ingredient = clean_ingredient(value)
+                recipe_data["ingredients"].append(ingredient)
+                yield "ingredient", ingredient
+            elif kind == "field":
+                recipe_data[field] = value
+                yield "field", {field: value}
+
+    # List items were cleaned as they streamed; coerce the scalar fields
+    scalars = {
+        field: value for field, value in recipe_data.items()
+        if field not in ("ingredients", "instructions")
+    }
+    recipe_data = {
+        **normalize_recipe(scalars),
+        "ingredients": recipe_data["ingredients"],
+        "instructions": recipe_data["instructions"]
+    }
+    recipe_data = await finish_recipe(recipe_data, ingredients, preferences)
+
+    if cache_key:
+        await recipe_cache.set(cache_key, recipe_data)
+
+    yield "recipe", recipe_data
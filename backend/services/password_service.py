@@ -0,0 +1,108 @@
+import os
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from config.settings import load_env
+
+load_env()
+
+# "thread" is enough for bcrypt, which releases the GIL; "process" isolates
+# hashing completely from the API worker.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+CREDENTIAL_CACHE_TTL_SECONDS = int(os.getenv("CREDENTIAL_CACHE_TTL_SECONDS", "300"))
+CREDENTIAL_CACHE_MAX_ENTRIES = int(os.getenv("CREDENTIAL_CACHE_MAX_ENTRIES", "10000"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor: Optional[Executor] = None
+_pending = 0
+
+# Verified-credential cache. Keys are HMACs under a per-process secret so the
+# cache never holds plaintext passwords, and they include the stored hash so a
+# password change invalidates old entries.
+_cache_secret = secrets.token_bytes(32)
+_verified: "OrderedDict[bytes, float]" = OrderedDict()
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash"
+            )
+    return _executor
+
+async def _run_in_pool(fn, *args):
+    """Run a hashing function in the pool, rejecting work once the queue is full."""
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+def _credential_key(email: str, plain_password: str, hashed_password: str) -> bytes:
+    message = "\0".join([email, plain_password, hashed_password]).encode("utf-8")
+    return hmac.new(_cache_secret, message, hashlib.sha256).digest()
+
+def _is_cached(key: bytes) -> bool:
+    expires_at = _verified.get(key)
+    if expires_at is None:
+        return False
+    if expires_at < time.monotonic():
+        del _verified[key]
+        return False
+    return True
+
+def _remember(key: bytes):
+    _verified[key] = time.monotonic() + CREDENTIAL_CACHE_TTL_SECONDS
+    _verified.move_to_end(key)
+    while len(_verified) > CREDENTIAL_CACHE_MAX_ENTRIES:
+        _verified.popitem(last=False)
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the worker pool."""
+    return await _run_in_pool(_hash, password)
+
+async def verify_password(email: str, plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the worker pool, skipping bcrypt for recently verified credentials."""
+    key = _credential_key(email, plain_password, hashed_password)
+    if CREDENTIAL_CACHE_TTL_SECONDS > 0 and _is_cached(key):
+        return True
+
+    verified = await _run_in_pool(_verify, plain_password, hashed_password)
+    if verified and CREDENTIAL_CACHE_TTL_SECONDS > 0:
+        _remember(key)
+    return verified
+
+def shutdown_password_pool():
+    """Stop the hashing pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
@@ -0,0 +1,145 @@
+import os
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from config.settings import load_env
+from config.database import get_rate_limits_collection
+from services.metrics import registry, Counter
+
+load_env()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Bucket size in cost units, and how many units flow back per minute
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "30"))
+RATE_LIMIT_REFILL_PER_MINUTE = float(os.getenv("RATE_LIMIT_REFILL_PER_MINUTE", "10"))
+# Cost units per call, by endpoint kind; batch is charged per item
+RATE_LIMIT_COSTS = os.getenv("RATE_LIMIT_COSTS", "text=1,random=1,image=4,refine=1")
+RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "100000"))
+# Share buckets between workers through Mongo; otherwise each process limits on its own
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "false").lower() == "true"
+
+def parse_costs(spec: str) -> Dict[str, float]:
+    costs = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, cost = entry.partition("=")
+        costs[kind.strip()] = float(cost)
+    return costs
+
+ENDPOINT_COSTS = parse_costs(RATE_LIMIT_COSTS)
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+class RateLimiter:
+    """Per-user token buckets weighted by endpoint cost.
+
+    Buckets live in an in-process LRU; with shared=True they are kept in Mongo
+    and updated atomically, so every worker draws from the same bucket. A cost
+    larger than the bucket is clamped to the bucket size, so such a request
+    needs a full bucket rather than never passing.
+    """
+
+    def __init__(self, capacity: float, refill_per_minute: float, max_users: int, shared: bool = False):
+        self.capacity = capacity
+        self.rate = refill_per_minute / 60
+        self.max_users = max_users
+        self.shared = shared
+        # user_id -> [tokens, updated_at]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def _retry_after(self, tokens: float, cost: float) -> float:
+        return (cost - tokens) / self.rate if self.rate > 0 else 3600.0
+
+    def take_local(self, user_id: str, cost: float) -> RateLimitResult:
+        cost = min(cost, self.capacity)
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = [self.capacity, now]
+            self._buckets[user_id] = bucket
+            if len(self._buckets) > self.max_users:
+                # The evicted user comes back with a full bucket; that is the cheap failure mode
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+            bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return RateLimitResult(True, bucket[0], 0.0)
+        return RateLimitResult(False, bucket[0], self._retry_after(bucket[0], cost))
+
+    async def take_shared(self, user_id: str, cost: float) -> RateLimitResult:
+        cost = min(cost, self.capacity)
+        elapsed_seconds = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}, 1000]}
+        refilled = {"$min": [
+            self.capacity,
+            {"$add": [{"$ifNull": ["$tokens", self.capacity]}, {"$multiply": [elapsed_seconds, self.rate]}]}
+        ]}
+        # Refill, test and take in one server-side update so concurrent workers cannot overdraw
+        pipeline = [
+            {"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+            {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                # Idle buckets are full again by then, so the TTL index can drop them
+                "expires_at": {"$add": ["$$NOW", self._full_refill_ms()]}
+            }}
+        ]
+        doc = await get_rate_limits_collection().find_one_and_update(
+            {"_id": user_id},
+            pipeline,
+            projection={"tokens": 1, "allowed": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc["allowed"]:
+            return RateLimitResult(True, doc["tokens"], 0.0)
+        return RateLimitResult(False, doc["tokens"], self._retry_after(doc["tokens"], cost))
+
+    def _full_refill_ms(self) -> int:
+        return int(self.capacity / self.rate * 1000) if self.rate > 0 else 86400000
+
+    async def take(self, user_id: str, cost: float) -> RateLimitResult:
+        if self.shared:
+            try:
+                return await self.take_shared(user_id, cost)
+            except Exception as e:
+                print(f"Error updating shared rate limit, using local bucket: {str(e)}")
+        return self.take_local(user_id, cost)
+
+rate_limiter = RateLimiter(RATE_LIMIT_BURST, RATE_LIMIT_REFILL_PER_MINUTE, RATE_LIMIT_MAX_USERS, RATE_LIMIT_SHARED)
+
+rate_limit_decisions = registry.register(Counter(
+    "rate_limit_decisions", "Generation requests checked against the per-user rate limit", ("endpoint", "result")
+))
+
+def rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    return {
+        "X-RateLimit-Limit": str(int(rate_limiter.capacity)),
+        "X-RateLimit-Remaining": str(int(result.remaining))
+    }
+
+async def enforce_rate_limit(user_id: str, endpoint: str, units: int = 1) -> Dict[str, str]:
+    """Charge units calls of an endpoint kind to the user's bucket.
+
+    Returns the quota headers to send, or raises 429 with Retry-After.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return {}
+    result = await rate_limiter.take(user_id, ENDPOINT_COSTS.get(endpoint, 1.0) * units)
+    rate_limit_decisions.inc(endpoint=endpoint, result="allowed" if result.allowed else "limited")
+    headers = rate_limit_headers(result)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded, retry later",
+            headers={**headers, "Retry-After": str(math.ceil(result.retry_after))}
+        )
+    return headers
@@ -0,0 +1,160 @@
+import os
+import copy
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List
+from config.settings import load_env
+from config.database import get_recipe_cache_collection
+from services.metrics import registry, Gauge
+
+load_env()
+
+RECIPE_CACHE_ENABLED = os.getenv("RECIPE_CACHE_ENABLED", "true").lower() == "true"
+RECIPE_CACHE_TTL_SECONDS = int(os.getenv("RECIPE_CACHE_TTL_SECONDS", "86400"))
+RECIPE_CACHE_MAX_ENTRIES = int(os.getenv("RECIPE_CACHE_MAX_ENTRIES", "2048"))
+RECIPE_CACHE_SHARED = os.getenv("RECIPE_CACHE_SHARED", "false").lower() == "true"
+
+# The preference fields create_recipe_prompt() actually reads; anything else
+# the client sends must not fragment the cache.
+PROMPT_PREFERENCE_FIELDS = ["servings", "cookingTime", "calories", "cuisineType", "dietType", "difficulty"]
+
+def normalize_ingredients(ingredients: List[str]) -> List[str]:
+    """Lowercase, collapse whitespace, dedupe and sort an ingredient list."""
+    return sorted({
+        " ".join(ingredient.lower().split())
+        for ingredient in ingredients
+        if ingredient and ingredient.strip()
+    })
+
+def normalize_preferences(preferences: Optional[Dict]) -> Dict:
+    """Keep only the preference fields that change the prompt, as strings."""
+    if not preferences:
+        return {}
+    normalized = {}
+    for field in PROMPT_PREFERENCE_FIELDS:
+        value = preferences.get(field)
+        if not value:
+            continue
+        if field in ("cuisineType", "dietType") and value == "any":
+            continue
+        normalized[field] = str(value).strip().lower()
+    return normalized
+
+def make_recipe_cache_key(
+    ingredients: List[str],
+    preferences: Optional[Dict],
+    model: str,
+    salt: Optional[str] = None
+) -> str:
+    """Canonical hash of the normalized request and model name."""
+    canonical = json.dumps(
+        {
+            "ingredients": normalize_ingredients(ingredients),
+            "preferences": normalize_preferences(preferences),
+            "model": model,
+            "salt": salt
+        },
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class RecipeCache:
+    """Two-tier recipe cache: an in-process LRU with TTL and an optional shared Mongo tier."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, shared: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str, record_stats: bool = True) -> Optional[Dict]:
+        value = self._get_local(key)
+        if value is not None:
+            if record_stats:
+                self.local_hits += 1
+            return copy.deepcopy(value)
+
+        if self.shared:
+            try:
+                doc = await get_recipe_cache_collection().find_one(
+                    {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                    {"recipe": 1}
+                )
+            except Exception as e:
+                print(f"Error reading shared recipe cache: {str(e)}")
+                doc = None
+            if doc:
+                if record_stats:
+                    self.shared_hits += 1
+                self._set_local(key, doc["recipe"])
+                return copy.deepcopy(doc["recipe"])
+
+        if record_stats:
+            self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict):
+        value = copy.deepcopy(value)
+        self._set_local(key, value)
+
+        if self.shared:
+            try:
+                await get_recipe_cache_collection().replace_one(
+                    {"_id": key},
+                    {
+                        "recipe": value,
+                        "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                    },
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"Error writing shared recipe cache: {str(e)}")
+
+    def stats(self) -> Dict:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "enabled": RECIPE_CACHE_ENABLED,
+            "shared": self.shared,
+            "entries": len(self._entries),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else 0.0
+        }
+
+recipe_cache = RecipeCache(RECIPE_CACHE_MAX_ENTRIES, RECIPE_CACHE_TTL_SECONDS, RECIPE_CACHE_SHARED)
+
+recipe_cache_lookups = registry.register(Gauge(
+    "recipe_cache_lookups", "Recipe generation cache lookups", ("result",)
+))
+
+def _collect_recipe_cache():
+    recipe_cache_lookups.set(recipe_cache.local_hits, result="local_hit")
+    recipe_cache_lookups.set(recipe_cache.shared_hits, result="shared_hit")
+    recipe_cache_lookups.set(recipe_cache.misses, result="miss")
+
+registry.register_collector(_collect_recipe_cache)
@@ -0,0 +1,198 @@
+import os
+import asyncio
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+import orjson
+from pydantic import ValidationError
+from config.settings import load_env
+from config.database import get_recipes_collection
+from models.recipe import RecipeBase
+from services.serialization import dumps
+from services.recipe_writer import write_recipes
+from services.recipe_versions import touch_recipes_version
+
+load_env()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Bytes gathered before a chunk is handed to the response
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_RECIPES = int(os.getenv("IMPORT_MAX_RECIPES", "100000"))
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", "1048576"))
+# Line errors returned to the client; the count covers all of them
+IMPORT_MAX_REPORTED_ERRORS = 100
+# Most bytes a gzipped upload may expand to per decompress step
+IMPORT_DECOMPRESS_CHUNK_BYTES = 65536
+
+EXPORT_FIELDS = [*RecipeBase.model_fields, "created_at", "updated_at", "revision"]
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+
+async def export_recipes(
+    user_id: str,
+    since: Optional[datetime] = None,
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    """Stream the user's recipes as NDJSON, oldest first, optionally gzipped.
+
+    Reads straight from one cursor in EXPORT_BATCH_SIZE batches, so memory
+    stays at one batch plus one output chunk whatever the history size.
+    """
+    query: Dict = {"user_id": str(user_id)}
+    if since:
+        query["created_at"] = {"$gte": since}
+    cursor = get_recipes_collection().find(query, EXPORT_PROJECTION).sort(
+        [("created_at", 1), ("_id", 1)]
+    ).batch_size(EXPORT_BATCH_SIZE)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    buffer = bytearray()
+    async for recipe in cursor:
+        recipe["id"] = str(recipe.pop("_id"))
+        buffer += dumps(recipe)
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+
+    tail = bytes(buffer)
+    if compressor:
+        tail = compressor.compress(tail) + compressor.flush()
+    if tail:
+        yield tail
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Stored dates are naive UTC
+    return parsed.replace(tzinfo=None) - parsed.utcoffset() if parsed.tzinfo else parsed
+
+def build_import_doc(line: bytes, user_id: str, now: datetime) -> Dict:
+    """One NDJSON line -> recipes document for user_id. Raises ValueError on bad input.
+
+    Ids and owners in the file are ignored; export dates are kept so an
+    exported history imports in the same order. The document is marked
+    imported, which keeps it out of the shared retrieval index.
+    """
+    try:
+        data = orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    try:
+        recipe = RecipeBase(**data)
+    except ValidationError as e:
+        raise ValueError(f"Invalid recipe: {e.error_count()} validation errors") from e
+    created_at = _parse_datetime(data.get("created_at")) or now
+    return {
+        **recipe.model_dump(),
+        "user_id": str(user_id),
+        "created_at": created_at,
+        "updated_at": _parse_datetime(data.get("updated_at")) or created_at,
+        "imported": True
+    }
+
+async def _iter_lines(chunks: AsyncIterator[bytes], compressed: bool) -> AsyncIterator[bytes]:
+    """Split a (possibly gzipped) byte stream into lines without holding more than one line.
+
+    Gzip input is expanded at most IMPORT_DECOMPRESS_CHUNK_BYTES at a time, so
+    a small, highly compressed chunk cannot balloon in memory. Raises
+    ValueError as soon as a line exceeds IMPORT_MAX_LINE_BYTES.
+    """
+    decompressor = zlib.decompressobj(47) if compressed else None
+    pending = b""
+
+    def split(data: bytes) -> List[bytes]:
+        nonlocal pending
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        if len(pending) > IMPORT_MAX_LINE_BYTES or any(len(line) > IMPORT_MAX_LINE_BYTES for line in lines):
+            raise ValueError(f"Line longer than {IMPORT_MAX_LINE_BYTES} bytes")
+        return lines
+
+    async for chunk in chunks:
+        if not decompressor:
+            for line in split(chunk):
+                yield line
+            continue
+        data = decompressor.decompress(chunk, IMPORT_DECOMPRESS_CHUNK_BYTES)
+        while True:
+            for line in split(data):
+                yield line
+            if not decompressor.unconsumed_tail:
+                break
+            data = decompressor.decompress(decompressor.unconsumed_tail, IMPORT_DECOMPRESS_CHUNK_BYTES)
+    if decompressor:
+        for line in split(decompressor.flush()):
+            yield line
+    if pending:
+        yield pending
+
+async def import_recipes(chunks: AsyncIterator[bytes], user_id: str, compressed: bool = False) -> Dict:
+    """Insert recipes from an NDJSON upload in IMPORT_CHUNK_SIZE insert_many calls.
+
+    Parsing the next chunk overlaps with writing the previous one; at most
+    one chunk is in flight. Bad lines are skipped and reported by line number.
+    """
+    imported = 0
+    failed = 0
+    errors: List[Dict] = []
+    docs: List[Dict] = []
+    write_task: Optional[asyncio.Task] = None
+    now = datetime.utcnow()
+
+    def record_error(line_number: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "error": error})
+
+    async def write(batch: List[Dict], batch_line_numbers: List[int]):
+        nonlocal imported
+        failed_positions = await write_recipes(batch)
+        imported += len(batch) - len(failed_positions)
+        for position, error in failed_positions.items():
+            record_error(batch_line_numbers[position], error)
+
+    line_numbers: List[int] = []
+    line_number = 0
+    accepted = 0
+    try:
+        async for line in _iter_lines(chunks, compressed):
+            line_number += 1
+            if not line.strip():
+                continue
+            if accepted >= IMPORT_MAX_RECIPES:
+                record_error(line_number, f"Import limit of {IMPORT_MAX_RECIPES} recipes reached")
+                break
+            try:
+                docs.append(build_import_doc(line, user_id, now))
+                line_numbers.append(line_number)
+                accepted += 1
+            except ValueError as e:
+                record_error(line_number, str(e))
+                continue
+
+            if len(docs) >= IMPORT_CHUNK_SIZE:
+                if write_task:
+                    await write_task
+                write_task = asyncio.create_task(write(docs, line_numbers))
+                docs, line_numbers = [], []
+    except (ValueError, zlib.error) as e:
+        record_error(line_number + 1, str(e))
+    finally:
+        if write_task:
+            await write_task
+    if docs:
+        await write(docs, line_numbers)
+    if imported:
+        # Imported dates can predate the current version, so bump it to now
+        await touch_recipes_version(user_id)
+    return {"imported": imported, "failed": failed, "errors": errors}
@@ -0,0 +1,291 @@
+import os
+import asyncio
+import json
+import random
+import re
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from config.settings import load_env
+from config.database import get_recipes_collection
+from services.metrics import registry, Gauge
+from services.recipe_normalize import coerce_minutes
+
+load_env()
+
+RECIPE_INDEX_ENABLED = os.getenv("RECIPE_INDEX_ENABLED", "true").lower() == "true"
+RECIPE_INDEX_SNAPSHOT_PATH = os.getenv("RECIPE_INDEX_SNAPSHOT_PATH", "recipe_index.json")
+RECIPE_INDEX_SNAPSHOT_SECONDS = int(os.getenv("RECIPE_INDEX_SNAPSHOT_SECONDS", "600"))
+# Minimum fraction of a stored recipe's ingredients the user must have for mode=auto
+RECIPE_INDEX_MIN_COVERAGE = float(os.getenv("RECIPE_INDEX_MIN_COVERAGE", "0.8"))
+# A stored recipe may run this much longer than the requested cooking time
+RECIPE_INDEX_TIME_TOLERANCE = float(os.getenv("RECIPE_INDEX_TIME_TOLERANCE", "1.25"))
+
+# Assumed to be in every pantry, so they never count against coverage
+PANTRY_STAPLES = frozenset({"salt", "pepper", "water", "oil", "sugar", "flour", "butter"})
+
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+_NON_LETTERS = re.compile(r"[^a-z]+")
+_STOPWORDS = frozenset("""
+    cup cups tbsp tablespoon tablespoons tsp teaspoon teaspoons g kg gram grams ml l liter liters
+    oz ounce ounces lb lbs pound pounds pinch clove cloves can cans slice slices piece pieces
+    handful bunch dash package packages stick sticks sprig sprigs jar jars
+    large small medium fresh freshly chopped minced diced sliced grated shredded crushed ground
+    peeled finely roughly thinly cooked raw dried frozen boneless skinless whole halved
+    to taste optional of and or for the a an into about plus more extra
+""".split())
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+def tokenize_ingredient(ingredient: str) -> FrozenSet[str]:
+    """Canonical tokens of one ingredient line: "2 cups chopped Tomatoes" -> {"tomato"}."""
+    text = _PARENTHETICAL.sub(" ", ingredient.lower())
+    return frozenset(
+        _singular(word)
+        for word in _NON_LETTERS.split(text)
+        if len(word) > 2 and word not in _STOPWORDS
+    )
+
+def _normalize_filter(value) -> Optional[str]:
+    if not value or value == "any":
+        return None
+    return str(value).strip().lower()
+
+class RecipeIndex:
+    """In-memory inverted index from ingredient tokens to stored recipes.
+
+    Documents are numbered internally and postings are compact arrays of
+    those numbers. Each document keeps its per-ingredient token sets for
+    coverage scoring and a few fields for preference filters.
+    """
+
+    def __init__(self):
+        self._recipe_ids: List[str] = []
+        self._filters: List[Tuple[Optional[str], Optional[str], Optional[int]]] = []
+        self._ingredients: List[Tuple[FrozenSet[str], ...]] = []
+        self._postings: Dict[str, array] = {}
+        self._signatures: Set[int] = set()
+        self._watermark: Optional[datetime] = None
+        self._tasks: List[asyncio.Task] = []
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._recipe_ids)
+
+    def token_count(self) -> int:
+        return len(self._postings)
+
+    def add(self, recipe: Dict) -> bool:
+        """Index a stored recipe document.
+
+        Copies of already indexed recipes are skipped, and so are imported
+        recipes: they are user-supplied and the index is shared by everyone.
+        """
+        if recipe.get("source_recipe_id") or recipe.get("imported"):
+            return False
+        ingredient_sets = tuple(
+            tokens for tokens in (tokenize_ingredient(item) for item in recipe.get("ingredients", []))
+            if tokens
+        )
+        if not ingredient_sets:
+            return False
+        signature = hash(frozenset(ingredient_sets))
+        if signature in self._signatures:
+            return False
+        self._signatures.add(signature)
+
+        doc = len(self._recipe_ids)
+        self._recipe_ids.append(str(recipe["_id"]))
+        self._filters.append((
+            _normalize_filter(recipe.get("cuisine_type")),
+            _normalize_filter(recipe.get("diet_type")),
+            recipe.get("cooking_time")
+        ))
+        self._ingredients.append(ingredient_sets)
+        for token in frozenset().union(*ingredient_sets):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = array("I")
+            postings.append(doc)
+
+        created_at = recipe.get("created_at")
+        if isinstance(created_at, datetime) and (self._watermark is None or created_at > self._watermark):
+            self._watermark = created_at
+        return True
+
+    def _matches_filters(self, doc: int, preferences: Optional[Dict]) -> bool:
+        if not preferences:
+            return True
+        cuisine, diet, cooking_time = self._filters[doc]
+        wanted_cuisine = _normalize_filter(preferences.get("cuisineType"))
+        if wanted_cuisine and cuisine != wanted_cuisine:
+            return False
+        wanted_diet = _normalize_filter(preferences.get("dietType"))
+        if wanted_diet and diet != wanted_diet:
+            return False
+        # Free-form client value: "30", "30 minutes", "1h"; anything unparseable is ignored
+        wanted_time = coerce_minutes(preferences.get("cookingTime"))
+        if wanted_time and (not cooking_time or cooking_time > wanted_time * RECIPE_INDEX_TIME_TOLERANCE):
+            return False
+        return True
+
+    def search(
+        self,
+        ingredients: List[str],
+        preferences: Optional[Dict] = None,
+        limit: int = 5,
+        min_coverage: float = 0.0
+    ) -> List[Tuple[str, float]]:
+        """Return (recipe_id, coverage) pairs, best coverage first.
+
+        Coverage is the fraction of a recipe's ingredients the user has, with
+        pantry staples always counted as available.
+        """
+        available: Set[str] = set(PANTRY_STAPLES)
+        for ingredient in ingredients:
+            available |= tokenize_ingredient(ingredient)
+
+        candidates: Set[int] = set()
+        for token in available - PANTRY_STAPLES:
+            postings = self._postings.get(token)
+            if postings is not None:
+                candidates.update(postings)
+
+        scored = []
+        for doc in candidates:
+            if not self._matches_filters(doc, preferences):
+                continue
+            ingredient_sets = self._ingredients[doc]
+            covered = sum(1 for tokens in ingredient_sets if not tokens.isdisjoint(available))
+            coverage = covered / len(ingredient_sets)
+            if coverage >= min_coverage:
+                scored.append((coverage, -len(ingredient_sets), doc))
+
+        scored.sort(reverse=True)
+        return [(self._recipe_ids[doc], round(coverage, 4)) for coverage, _, doc in scored[:limit]]
+
+    def sample(self, preferences: Optional[Dict] = None, limit: int = 3) -> List[str]:
+        """Up to limit recipe ids matching the preference filters, from a random starting point."""
+        if not self._recipe_ids:
+            return []
+        count = len(self._recipe_ids)
+        start = random.randrange(count)
+        sampled = []
+        for offset in range(count):
+            doc = (start + offset) % count
+            if self._matches_filters(doc, preferences):
+                sampled.append(self._recipe_ids[doc])
+                if len(sampled) >= limit:
+                    break
+        return sampled
+
+    def _snapshot_data(self) -> Dict:
+        return {
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            "docs": [
+                [recipe_id, list(filters), [sorted(tokens) for tokens in ingredient_sets]]
+                for recipe_id, filters, ingredient_sets in zip(self._recipe_ids, self._filters, self._ingredients)
+            ]
+        }
+
+    async def save_snapshot(self, path: str = RECIPE_INDEX_SNAPSHOT_PATH):
+        """Write the index to disk atomically, serializing off the event loop."""
+        data = self._snapshot_data()
+
+        def write():
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+
+        await asyncio.to_thread(write)
+
+    async def load_snapshot(self, path: str = RECIPE_INDEX_SNAPSHOT_PATH) -> bool:
+        if not os.path.exists(path):
+            return False
+
+        def read():
+            with open(path) as f:
+                return json.load(f)
+
+        data = await asyncio.to_thread(read)
+        for recipe_id, (cuisine, diet, cooking_time), ingredient_sets in data["docs"]:
+            self.add({
+                "_id": recipe_id,
+                "cuisine_type": cuisine,
+                "diet_type": diet,
+                "cooking_time": cooking_time,
+                # Tokens are already canonical, so re-tokenizing them is a no-op
+                "ingredients": [" ".join(tokens) for tokens in ingredient_sets]
+            })
+        if data.get("watermark"):
+            self._watermark = datetime.fromisoformat(data["watermark"])
+        return True
+
+    async def catch_up(self):
+        """Index recipes stored after the snapshot watermark (or all of them)."""
+        query = {"source_recipe_id": {"$exists": False}, "imported": {"$ne": True}}
+        if self._watermark:
+            query["created_at"] = {"$gt": self._watermark}
+        cursor = get_recipes_collection().find(
+            query,
+            {"ingredients": 1, "cuisine_type": 1, "diet_type": 1, "cooking_time": 1, "created_at": 1}
+        ).batch_size(1000)
+        async for recipe in cursor:
+            self.add(recipe)
+
+    async def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            loaded = await self.load_snapshot()
+            await self.catch_up()
+            self.ready = True
+            print(
+                f"Recipe index ready: {len(self)} recipes, {self.token_count()} tokens "
+                f"({'snapshot + ' if loaded else ''}catch-up in {time.perf_counter() - start:.2f}s)"
+            )
+        except Exception as e:
+            print(f"Error building recipe index: {str(e)}")
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(RECIPE_INDEX_SNAPSHOT_SECONDS)
+            if self.ready:
+                try:
+                    await self.save_snapshot()
+                except Exception as e:
+                    print(f"Error saving recipe index snapshot: {str(e)}")
+
+    def start(self):
+        """Build the index in the background and snapshot it periodically."""
+        self._tasks = [asyncio.create_task(self._warm_up()), asyncio.create_task(self._snapshot_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.ready:
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                print(f"Error saving recipe index snapshot: {str(e)}")
+
+recipe_index = RecipeIndex()
+
+recipe_index_size = registry.register(Gauge(
+    "recipe_index_size", "Recipes and distinct tokens in the retrieval index", ("kind",)
+))
+
+def _collect_recipe_index():
+    recipe_index_size.set(len(recipe_index), kind="recipes")
+    recipe_index_size.set(recipe_index.token_count(), kind="tokens")
+
+registry.register_collector(_collect_recipe_index)
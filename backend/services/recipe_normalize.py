@@ -0,0 +1,206 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from models.recipe import RecipeBase
+
+REQUIRED_RECIPE_FIELDS = ["title", "ingredients", "instructions", "cooking_time", "servings"]
+TIME_FIELDS = ("cooking_time", "prep_time", "total_time")
+COUNT_FIELDS = ("servings", "calories")
+TEXT_FIELDS = ("title", "cuisine_type", "diet_type", "difficulty")
+
+# Truncated output is repaired by cutting back to an earlier comma at most this often
+MAX_REPAIR_ATTEMPTS = 20
+
+# Numbering, bullets, "Step 3:" and sequencing words, in any combination, at the start of a step
+_STEP_PREFIX = re.compile(
+    r"^(?:\s*(?:step\s*\d+\s*[.):\-]?|\d+\s*[.):\-])\s*|\s*[-•*·]+\s*|\s*(?:first|then|next|finally|after that|lastly)\s*,\s*)+",
+    re.IGNORECASE
+)
+_BULLET_PREFIX = re.compile(r"^\s*(?:[-•*·]+|\d+[.)])\s+")
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+# Hours, optionally followed by minutes with or without a unit: "1 hour 15 min", "1h30", "1hr30min"
+_HOURS = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:hours|hour|hrs|hr|h)(?![a-z])(?:\s*(\d+)(?:\s*(?:minutes|minute|mins|min|m)(?![a-z]))?)?",
+    re.IGNORECASE
+)
+_MINUTES = re.compile(r"(\d+(?:\.\d+)?)\s*(?:m|min|mins|minute|minutes)\b", re.IGNORECASE)
+
+# Cheap first-character test so clean steps skip the regex entirely
+_PREFIX_START = frozenset("0123456789-•*·sSfFtTnNaAlL")
+
+def _capitalize_first(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+def clean_instruction(step: str) -> str:
+    """Strip leading numbers, bullets and "Step 1:"/"First," prefixes in one pass."""
+    text = " ".join(step.split())
+    if text[:1] in _PREFIX_START:
+        text = _STEP_PREFIX.sub("", text, count=1)
+    return _capitalize_first(text)
+
+def clean_ingredient(ingredient: str) -> str:
+    text = " ".join(ingredient.split())
+    if text[:1] in _PREFIX_START:
+        text = _BULLET_PREFIX.sub("", text, count=1)
+    return _capitalize_first(text)
+
+def _close_truncated(text: str) -> str:
+    """Close an unterminated string and any open arrays/objects."""
+    closers = []
+    in_string = False
+    escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            closers.append("}")
+        elif char == "[":
+            closers.append("]")
+        elif char in "}]" and closers:
+            closers.pop()
+
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(closers))
+
+def parse_recipe_json(content: str) -> Dict:
+    """Parse model output as a JSON object, repairing the usual damage.
+
+    Handles markdown fences, prose around the object, trailing commas and
+    output cut off by max_tokens. Raises ValueError when nothing usable is left.
+    """
+    try:
+        data = json.loads(content)
+        if isinstance(data, dict):
+            return data
+    except json.JSONDecodeError:
+        pass
+
+    fenced = _FENCE.search(content)
+    text = fenced.group(1) if fenced else content
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object in model output")
+    text = _TRAILING_COMMA.sub(r"\1", text[start:].strip())
+
+    # Complete output with trailing prose: decode just the first object
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text)
+        if isinstance(data, dict):
+            return data
+    except json.JSONDecodeError:
+        pass
+
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        try:
+            data = json.loads(_TRAILING_COMMA.sub(r"\1", _close_truncated(text)))
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+        # Drop the last, partially written member and try again
+        cut = text.rfind(",")
+        if cut <= 0:
+            break
+        text = text[:cut]
+    raise ValueError("Unrecoverable JSON in model output")
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return float(match.group())
+    return None
+
+def coerce_minutes(value: Any) -> Optional[int]:
+    """30, "30", "30 minutes", "1 hour 15 mins", "1h30", "1.5 hours" -> minutes, or None."""
+    if isinstance(value, str):
+        hours = _HOURS.search(value)
+        if hours:
+            if hours.group(2):
+                minutes = float(hours.group(2))
+            else:
+                # "1 hour and 15 minutes": the minutes come after some other words
+                match = _MINUTES.search(value, hours.end())
+                minutes = float(match.group(1)) if match else 0
+            total = float(hours.group(1)) * 60 + minutes
+            return round(total) or None
+    number = _to_number(value)
+    return round(number) if number and number > 0 else None
+
+def coerce_count(value: Any) -> Optional[int]:
+    """4, "4", "4-6 servings", "about 450 kcal" -> the first positive number, or None."""
+    number = _to_number(value)
+    return round(number) if number and number > 0 else None
+
+def _coerce_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = value.splitlines() if "\n" in value else value.split(";")
+    if not isinstance(value, list):
+        return []
+    items = []
+    for item in value:
+        if isinstance(item, dict):
+            # {"quantity": "2 cups", "name": "flour"} -> "2 cups flour"
+            item = " ".join(str(part) for part in item.values() if part not in (None, ""))
+        elif not isinstance(item, str):
+            item = str(item) if item is not None else ""
+        if item.strip():
+            items.append(item)
+    return items
+
+def normalize_recipe(data: Dict) -> Dict:
+    """Coerce raw model output towards RecipeBase; unusable fields are dropped."""
+    recipe: Dict[str, Any] = {}
+    for field in TEXT_FIELDS:
+        value = data.get(field)
+        if value is not None and not isinstance(value, (dict, list)) and str(value).strip():
+            recipe[field] = str(value).strip()
+    for field in TIME_FIELDS:
+        minutes = coerce_minutes(data.get(field))
+        if minutes:
+            recipe[field] = minutes
+    for field in COUNT_FIELDS:
+        count = coerce_count(data.get(field))
+        if count:
+            recipe[field] = count
+
+    ingredients = [clean_ingredient(item) for item in _coerce_list(data.get("ingredients"))]
+    instructions = [clean_instruction(step) for step in _coerce_list(data.get("instructions"))]
+    if ingredients:
+        recipe["ingredients"] = [item for item in ingredients if item]
+    if instructions:
+        recipe["instructions"] = [step for step in instructions if step]
+    return recipe
+
+def missing_fields(recipe: Dict) -> List[str]:
+    return [field for field in REQUIRED_RECIPE_FIELDS if not recipe.get(field)]
+
+def validate_recipe(recipe: Dict) -> Dict:
+    """Validate against RecipeBase and return the plain dict, without unset optional fields."""
+    try:
+        return RecipeBase(**recipe).model_dump(exclude_none=True)
+    except ValidationError as e:
+        raise ValueError(f"Invalid recipe: {e.error_count()} validation errors") from e
+
+def normalize_recipe_output(content: str) -> Tuple[Dict, List[str]]:
+    """Raw completion text -> (normalized recipe, required fields still missing)."""
+    recipe = normalize_recipe(parse_recipe_json(content))
+    return recipe, missing_fields(recipe)
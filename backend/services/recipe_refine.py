@@ -0,0 +1,245 @@
+import json
+import re
+import time
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+from models.recipe import RecipeBase
+from services.llm_router import recipe_router
+from services.openai_service import build_recipe_messages, refine_recipe_with_model
+from services.recipe_normalize import validate_recipe
+
+# Rough characters per token, for estimating what a full regeneration would cost
+CHARS_PER_TOKEN = 4
+
+UNICODE_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+
+_AMOUNT = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?(?:\s*[½⅓⅔¼¾⅛])?|[½⅓⅔¼¾⅛])"
+_LEADING_QUANTITY = re.compile(rf"^({_AMOUNT})(?:(\s*(?:-|–|to)\s*)({_AMOUNT}))?")
+_UNIT = re.compile(
+    r"^\s*(fl\.?\s*oz|cups?|tablespoons?|tbsps?|tbs|teaspoons?|tsps?|ounces?|oz|pounds?|lbs?|"
+    r"grams?|g|kilograms?|kg|milliliters?|millilitres?|ml|liters?|litres?|l)\b\.?",
+    re.IGNORECASE
+)
+_TEMPERATURE = re.compile(r"(\d+)\s*(°\s*|degrees?\s*)?([CF])\b", re.IGNORECASE)
+# Largest snap error, relative to the amount, before a fraction gives way to a decimal
+FRACTION_TOLERANCE = 0.05
+
+# unit -> (dimension, size in ml or g)
+UNITS = {
+    "cup": ("volume", 236.6), "tbsp": ("volume", 14.79), "tsp": ("volume", 4.93),
+    "fl oz": ("volume", 29.57), "ml": ("volume", 1.0), "l": ("volume", 1000.0),
+    "oz": ("mass", 28.35), "lb": ("mass", 453.6), "g": ("mass", 1.0), "kg": ("mass", 1000.0)
+}
+METRIC_UNITS = {"ml", "l", "g", "kg"}
+
+# Edits simple enough to apply without the model
+_LOCAL_SERVINGS = re.compile(
+    r"^(?:please\s+)?(?:scale|make|change|adjust|resize)?\s*(?:it|this|the recipe|recipe)?\s*"
+    r"(?:up|down)?\s*(?:to|for)?\s*(\d+)\s*(?:servings?|people|persons|portions)\.?$",
+    re.IGNORECASE
+)
+_LOCAL_UNITS = re.compile(
+    r"^(?:please\s+)?(?:convert|switch|change)?\s*(?:it|this|the recipe|recipe|units)?\s*"
+    r"(?:to|into)?\s*(metric|imperial)(?:\s+units)?\.?$",
+    re.IGNORECASE
+)
+
+def _canonical_unit(unit: str) -> str:
+    unit = " ".join(unit.lower().rstrip(".").split())
+    if unit.startswith("fl"):
+        return "fl oz"
+    if unit.startswith("cup"):
+        return "cup"
+    if unit.startswith(("tablespoon", "tbsp", "tbs")):
+        return "tbsp"
+    if unit.startswith(("teaspoon", "tsp")):
+        return "tsp"
+    if unit.startswith(("ounce", "oz")):
+        return "oz"
+    if unit.startswith(("pound", "lb")):
+        return "lb"
+    if unit.startswith("kilo") or unit == "kg":
+        return "kg"
+    if unit.startswith("gram") or unit == "g":
+        return "g"
+    if unit.startswith("milli") or unit == "ml":
+        return "ml"
+    return "l"
+
+def parse_amount(text: str) -> float:
+    """Parse "1 1/2", "3/4", "2.5", "1½" or "½" into a number."""
+    text = text.strip()
+    if text[-1] in UNICODE_FRACTIONS:
+        whole = text[:-1].strip()
+        return (float(whole) if whole else 0.0) + UNICODE_FRACTIONS[text[-1]]
+    total = 0.0
+    for part in text.split():
+        total += float(Fraction(part)) if "/" in part else float(part)
+    return total
+
+def format_amount(value: float) -> str:
+    """Kitchen-friendly amount: common fractions below 10, whole numbers above."""
+    if value >= 10:
+        return str(round(value))
+    whole = int(value)
+    remainder = value - whole
+    for denominator in (2, 3, 4, 8):
+        numerator = round(remainder * denominator)
+        if abs(remainder - numerator / denominator) <= FRACTION_TOLERANCE * value:
+            if numerator == 0:
+                if whole:
+                    return str(whole)
+                continue
+            if numerator == denominator:
+                return str(whole + 1)
+            fraction = str(Fraction(numerator, denominator))
+            return f"{whole} {fraction}" if whole else fraction
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+def scale_ingredient(ingredient: str, factor: float) -> str:
+    """Scale the leading quantity (or range) of an ingredient line."""
+    match = _LEADING_QUANTITY.match(ingredient)
+    if not match:
+        return ingredient
+    low = format_amount(parse_amount(match.group(1)) * factor)
+    if match.group(3):
+        high = format_amount(parse_amount(match.group(3)) * factor)
+        return f"{low}{match.group(2)}{high}{ingredient[match.end():]}"
+    return f"{low}{ingredient[match.end():]}"
+
+def _round_metric(value: float) -> float:
+    return round(value / 5) * 5 if value > 20 else round(value)
+
+def convert_quantity(amount: float, unit: str, system: str) -> Optional[Tuple[float, str]]:
+    """Convert an amount to the target unit system, or None if it already is in it."""
+    dimension, size = UNITS[unit]
+    if (unit in METRIC_UNITS) == (system == "metric"):
+        return None
+    base = amount * size
+    if system == "metric":
+        if dimension == "mass":
+            return (round(base / 1000, 2), "kg") if base >= 1000 else (_round_metric(base), "g")
+        return (round(base / 1000, 2), "l") if base >= 1000 else (_round_metric(base), "ml")
+    if dimension == "mass":
+        ounces = base / UNITS["oz"][1]
+        return (ounces / 16, "lb") if ounces >= 16 else (ounces, "oz")
+    for target in ("tsp", "tbsp", "cup"):
+        amount = base / UNITS[target][1]
+        if target == "cup" or amount < {"tsp": 3, "tbsp": 4}[target]:
+            return amount, target
+
+def convert_ingredient(ingredient: str, system: str) -> str:
+    match = _LEADING_QUANTITY.match(ingredient)
+    if not match or match.group(3):
+        return ingredient
+    unit_match = _UNIT.match(ingredient[match.end():])
+    if not unit_match:
+        return ingredient
+    converted = convert_quantity(parse_amount(match.group(1)), _canonical_unit(unit_match.group(1)), system)
+    if converted is None:
+        return ingredient
+    amount, unit = converted
+    amount_text = format_amount(amount) if system == "imperial" else f"{amount:g}"
+    if system == "imperial" and unit == "cup" and amount > 1:
+        unit = "cups"
+    rest = ingredient[match.end() + unit_match.end():]
+    return f"{amount_text} {unit}{rest}"
+
+def convert_temperatures(step: str, system: str) -> str:
+    def replace(match: re.Match) -> str:
+        # Without ° or "degrees", only "180C" / "400 F" style counts; "2 c" is two cups
+        if not match.group(2) and (len(match.group(1)) < 2 or match.group(3).islower()):
+            return match.group(0)
+        degrees, scale = int(match.group(1)), match.group(3).upper()
+        if system == "metric" and scale == "F":
+            return f"{round((degrees - 32) * 5 / 9 / 10) * 10}°C"
+        if system == "imperial" and scale == "C":
+            return f"{round((degrees * 9 / 5 + 32) / 25) * 25}°F"
+        return match.group(0)
+    return _TEMPERATURE.sub(replace, step)
+
+def scale_recipe(recipe: Dict, servings: int) -> Dict:
+    """Scale ingredient quantities to a new number of servings. Calories stay per serving."""
+    factor = servings / recipe["servings"]
+    return {
+        **recipe,
+        "servings": servings,
+        "ingredients": [scale_ingredient(ingredient, factor) for ingredient in recipe["ingredients"]]
+    }
+
+def convert_recipe_units(recipe: Dict, system: str) -> Dict:
+    """Convert ingredient measures and oven temperatures to metric or imperial."""
+    return {
+        **recipe,
+        "ingredients": [convert_ingredient(ingredient, system) for ingredient in recipe["ingredients"]],
+        "instructions": [convert_temperatures(step, system) for step in recipe["instructions"]]
+    }
+
+def parse_local_edit(instruction: Optional[str]) -> Dict:
+    """Recognize instructions that are just a servings change or a unit conversion."""
+    if not instruction:
+        return {}
+    text = " ".join(instruction.split())
+    servings = _LOCAL_SERVINGS.match(text)
+    if servings and int(servings.group(1)) > 0:
+        return {"servings": int(servings.group(1))}
+    units = _LOCAL_UNITS.match(text)
+    if units:
+        return {"units": units.group(1).lower()}
+    return {}
+
+def estimate_full_regeneration_tokens(recipe: Dict) -> int:
+    """Prompt plus completion tokens a fresh generation of this recipe would take."""
+    messages = build_recipe_messages(recipe["ingredients"], {"servings": recipe.get("servings")})
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    completion_chars = len(json.dumps(recipe, ensure_ascii=False))
+    return (prompt_chars + completion_chars) // CHARS_PER_TOKEN
+
+async def refine_recipe(
+    recipe: Dict,
+    instruction: Optional[str] = None,
+    servings: Optional[int] = None,
+    units: Optional[str] = None
+) -> Tuple[Dict, List[str], Dict]:
+    """Apply an edit to a stored recipe and return (refined recipe, changed fields, report).
+
+    Servings scaling and unit conversion are applied locally, also when the
+    instruction is nothing more than that. Anything else goes to the model
+    as the stored recipe plus the instruction, and only the fields it
+    returns are replaced. The report compares tokens and latency with a
+    full regeneration. Raises ValueError if the result is not a valid recipe.
+    """
+    current = {field: recipe[field] for field in RecipeBase.model_fields if recipe.get(field) is not None}
+    local = parse_local_edit(instruction)
+    if local:
+        instruction = None
+    servings = servings or local.get("servings")
+    units = units or local.get("units")
+
+    refined = dict(current)
+    usage = None
+    start = time.perf_counter()
+    # Primary backend's recent latency, which full generations dominate
+    full_latency = recipe_router.backends[0].latency_ewma
+    if instruction:
+        patch, usage = await refine_recipe_with_model(current, instruction)
+        refined.update({field: value for field, value in patch.items() if field in RecipeBase.model_fields})
+    if servings and servings != refined.get("servings"):
+        refined = scale_recipe(refined, servings)
+    if units:
+        refined = convert_recipe_units(refined, units)
+    refined = validate_recipe(refined)
+    elapsed = time.perf_counter() - start
+
+    changed = [field for field in RecipeBase.model_fields if refined.get(field) != current.get(field)]
+    full_tokens = estimate_full_regeneration_tokens(refined)
+    used_tokens = (usage.total_tokens or 0) if usage is not None else 0
+    report = {
+        "mode": "model" if instruction else "local",
+        "tokens_used": used_tokens,
+        "full_regeneration_tokens_estimate": full_tokens,
+        "tokens_saved_estimate": max(full_tokens - used_tokens, 0),
+        "latency_ms": round(elapsed * 1000, 1),
+        "full_regeneration_latency_ms_estimate": round(full_latency * 1000, 1) if full_latency else None
+    }
+    return refined, changed, report
@@ -0,0 +1,98 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+STRUCTURAL_CHARS = "{}[],:"
+
+class _Frame:
+    __slots__ = ("kind", "key", "expecting_key")
+
+    def __init__(self, kind: str, key: Optional[str]):
+        self.kind = kind
+        self.key = key
+        self.expecting_key = kind == "object"
+
+class IncrementalJSONParser:
+    """Incremental parser for a streamed JSON object.
+
+    Text can be fed in arbitrary chunks. feed() returns the values completed
+    by that chunk as (kind, field, value) tuples:
+    - ("field", key, value) for a scalar directly under the top-level object
+    - ("item", key, value) for a scalar inside a top-level array, e.g. one
+      instruction step under "instructions"
+    Deeper nesting is tracked but not reported. Anything before the opening
+    brace (such as a markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._scalar: List[str] = []
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Optional[str], Any]]:
+        events: List[Tuple[str, Optional[str], Any]] = []
+        for ch in text:
+            if self.done:
+                break
+            if self._in_string:
+                self._string.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_value(json.loads("".join(self._string)), events)
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string = [ch]
+                continue
+
+            if ch in STRUCTURAL_CHARS or ch.isspace():
+                self._flush_scalar(events)
+                if ch == "{" or ch == "[":
+                    parent_key = self._stack[-1].key if self._stack else None
+                    self._stack.append(_Frame("object" if ch == "{" else "array", parent_key))
+                elif ch == "}" or ch == "]":
+                    if self._stack:
+                        self._stack.pop()
+                        if not self._stack:
+                            self.done = True
+                elif ch == "," and self._stack and self._stack[-1].kind == "object":
+                    self._stack[-1].expecting_key = True
+                continue
+
+            if self._stack:
+                self._scalar.append(ch)
+        return events
+
+    def _flush_scalar(self, events: List[Tuple[str, Optional[str], Any]]):
+        if not self._scalar:
+            return
+        token = "".join(self._scalar)
+        self._scalar = []
+        try:
+            value = json.loads(token)
+        except ValueError:
+            return
+        self._on_value(value, events)
+
+    def _on_value(self, value: Any, events: List[Tuple[str, Optional[str], Any]]):
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        if top.kind == "object" and top.expecting_key:
+            top.key = value
+            top.expecting_key = False
+            return
+
+        depth = len(self._stack)
+        if depth == 1 and top.kind == "object":
+            events.append(("field", top.key, value))
+        elif depth == 2 and top.kind == "array" and self._stack[0].kind == "object":
+            events.append(("item", top.key, value))
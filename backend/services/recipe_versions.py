@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from config.database import get_users_collection
+
+async def touch_recipes_version(user_id: str, updated_at: Optional[datetime] = None):
+    """Record that the user's recipes or favorites changed at updated_at."""
+    if not ObjectId.is_valid(user_id):
+        return
+    try:
+        await get_users_collection().update_one(
+            {"_id": ObjectId(user_id)},
+            {"$max": {"recipes_updated_at": updated_at or datetime.utcnow()}}
+        )
+    except Exception as e:
+        # A missed bump only costs clients a stale 304 until the next write
+        print(f"Error updating recipes version: {str(e)}")
+
+async def touch_recipes_versions(versions: Dict[str, datetime]):
+    """touch_recipes_version for several users in one bulk write."""
+    updates = [
+        UpdateOne({"_id": ObjectId(user_id)}, {"$max": {"recipes_updated_at": updated_at}})
+        for user_id, updated_at in versions.items()
+        if ObjectId.is_valid(user_id)
+    ]
+    if not updates:
+        return
+    try:
+        await get_users_collection().bulk_write(updates, ordered=False)
+    except Exception as e:
+        print(f"Error updating recipes versions: {str(e)}")
+
+async def get_recipes_version(user_id: str) -> str:
+    """Latest recipe change for the user, read from their user document by _id."""
+    if not ObjectId.is_valid(user_id):
+        return "0"
+    user = await get_users_collection().find_one({"_id": ObjectId(user_id)}, {"recipes_updated_at": 1})
+    updated_at = user.get("recipes_updated_at") if user else None
+    return updated_at.isoformat() if updated_at else "0"
+
+def recipes_etag(user_id: str, version: str, variant: str = "") -> str:
+    """Weak ETag for a view (path and query string) of the user's recipes at a version."""
+    digest = hashlib.sha1(f"{user_id}|{version}|{variant}".encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
@@ -0,0 +1,223 @@
+import os
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+from pymongo.errors import BulkWriteError
+from config.settings import load_env
+from config.database import get_recipes_collection
+from services.metrics import registry, Counter, Gauge, Histogram
+from services.recipe_index import recipe_index
+from services.recipe_versions import touch_recipes_versions
+
+load_env()
+
+# "async" returns as soon as the recipe is buffered; "sync" waits for the
+# batch it joined to be written, which still shares one round trip per batch.
+RECIPE_WRITE_DURABILITY = os.getenv("RECIPE_WRITE_DURABILITY", "async")
+RECIPE_WRITE_BATCH_SIZE = int(os.getenv("RECIPE_WRITE_BATCH_SIZE", "100"))
+RECIPE_WRITE_FLUSH_INTERVAL_MS = int(os.getenv("RECIPE_WRITE_FLUSH_INTERVAL_MS", "50"))
+# Past this many buffered recipes, callers write inline instead of queueing
+RECIPE_WRITE_MAX_PENDING = int(os.getenv("RECIPE_WRITE_MAX_PENDING", "5000"))
+RECIPE_WRITE_MAX_RETRIES = int(os.getenv("RECIPE_WRITE_MAX_RETRIES", "5"))
+RECIPE_WRITE_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("RECIPE_WRITE_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+DUPLICATE_KEY_ERROR = 11000
+
+recipe_write_flush_size = registry.register(Histogram(
+    "recipe_write_flush_size", "Recipes written per bulk flush", buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+))
+recipe_write_lag = registry.register(Histogram(
+    "recipe_write_lag_seconds", "Time from buffering a recipe to it being written"
+))
+recipe_writes_dropped = registry.register(Counter(
+    "recipe_writes_dropped", "Recipes given up on after exhausting retries or at shutdown"
+))
+recipe_writes_pending = registry.register(Gauge(
+    "recipe_writes_pending", "Recipes buffered and not yet written"
+))
+
+class _PendingWrite:
+    __slots__ = ("doc", "submitted_at", "attempts", "future")
+
+    def __init__(self, doc: Dict, future: Optional[asyncio.Future]):
+        self.doc = doc
+        self.submitted_at = time.monotonic()
+        self.attempts = 0
+        self.future = future
+
+async def write_recipes(docs: List[Dict]) -> Dict[int, str]:
+    """insert_many the documents, then index them and bump their owners' versions.
+
+    Returns the positions that failed with their error. A duplicate _id means
+    an earlier attempt already landed, so it counts as written. Versions move
+    to the flush time rather than the documents' updated_at: a retried batch
+    can land after newer recipes, and must still change the ETag.
+    """
+    failed: Dict[int, str] = {}
+    try:
+        await get_recipes_collection().insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {
+            error["index"]: error.get("errmsg", "Failed to save recipe")
+            for error in e.details.get("writeErrors", [])
+            if error.get("code") != DUPLICATE_KEY_ERROR
+        }
+    except Exception as e:
+        failed = {position: str(e) for position in range(len(docs))}
+
+    now = datetime.utcnow()
+    versions: Dict[str, datetime] = {}
+    for position, doc in enumerate(docs):
+        if position in failed:
+            continue
+        recipe_index.add(doc)
+        versions[doc["user_id"]] = now
+    await touch_recipes_versions(versions)
+    return failed
+
+class RecipeWriter:
+    """Write-behind buffer for generated recipes, flushed with one insert_many per batch.
+
+    Recipes carry their ObjectId before they are buffered, so handlers can
+    return them immediately. A batch is flushed once it reaches batch_size or
+    its oldest recipe has waited flush_interval seconds, and everything left
+    is flushed on stop(). Failed writes are retried with backoff and dropped
+    after max_retries.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        max_retries: int,
+        durability: str = "async"
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.durability = durability
+        self.running = False
+        self._pending: Deque[_PendingWrite] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush what is buffered, giving up after the shutdown timeout."""
+        if self._task is None:
+            return
+        self.running = False
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, RECIPE_WRITE_SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"Recipe writer did not drain in time; dropping {len(self._pending)} recipes")
+            while self._pending:
+                self._drop(self._pending.popleft(), "shutdown timeout")
+        self._task = None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, doc: Dict):
+        """Persist a recipe document that already has its _id.
+
+        Writes inline when the writer is not running or the buffer is full.
+        """
+        if not self.running or len(self._pending) >= self.max_pending:
+            failed = await write_recipes([doc])
+            if failed:
+                raise RuntimeError(f"Failed to save recipe: {failed[0]}")
+            return
+
+        future = asyncio.get_running_loop().create_future() if self.durability == "sync" else None
+        self._pending.append(_PendingWrite(doc, future))
+        if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while self.running or self._pending:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Let the batch fill until it is full or its oldest write is due
+            delay = self._pending[0].submitted_at + self.flush_interval - time.monotonic()
+            if self.running and len(self._pending) < self.batch_size and delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                # _flush handles write errors itself; never leave a waiting submit() hanging
+                print(f"Error flushing recipe writes: {str(e)}")
+                for entry in batch:
+                    if entry.future is not None and not entry.future.done():
+                        self._drop(entry, str(e))
+
+    async def _flush(self, batch: List[_PendingWrite]):
+        recipe_write_flush_size.observe(len(batch))
+        try:
+            failed = await write_recipes([entry.doc for entry in batch])
+        except Exception as e:
+            # Indexing or the version bump after the insert failed. A retry is
+            # safe: recipes that already landed come back as duplicate keys.
+            failed = {position: str(e) for position in range(len(batch))}
+
+        now = time.monotonic()
+        retry: List[_PendingWrite] = []
+        for position, entry in enumerate(batch):
+            if position not in failed:
+                recipe_write_lag.observe(now - entry.submitted_at)
+                if entry.future is not None and not entry.future.done():
+                    entry.future.set_result(None)
+                continue
+            entry.attempts += 1
+            if entry.attempts > self.max_retries:
+                self._drop(entry, failed[position])
+            else:
+                retry.append(entry)
+
+        if retry:
+            attempts = max(entry.attempts for entry in retry)
+            print(f"Retrying {len(retry)} recipe writes (attempt {attempts}): {next(iter(failed.values()))}")
+            # Back to the front so retried recipes keep their place, and are
+            # still counted if shutdown gives up during the backoff
+            self._pending.extendleft(reversed(retry))
+            await asyncio.sleep(min(0.1 * 2 ** attempts, 5.0))
+
+    def _drop(self, entry: _PendingWrite, error: str):
+        recipe_writes_dropped.inc()
+        print(f"Dropping recipe {entry.doc.get('_id')} for user {entry.doc.get('user_id')}: {error}")
+        if entry.future is not None and not entry.future.done():
+            entry.future.set_exception(RuntimeError(f"Failed to save recipe: {error}"))
+
+recipe_writer = RecipeWriter(
+    RECIPE_WRITE_BATCH_SIZE,
+    RECIPE_WRITE_FLUSH_INTERVAL_MS / 1000,
+    RECIPE_WRITE_MAX_PENDING,
+    RECIPE_WRITE_MAX_RETRIES,
+    RECIPE_WRITE_DURABILITY
+)
+
+def _collect_recipe_writer():
+    recipe_writes_pending.set(recipe_writer.pending())
+
+registry.register_collector(_collect_recipe_writer)
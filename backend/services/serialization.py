@@ -0,0 +1,23 @@
+from typing import Any
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding for Mongo documents: datetimes natively, ObjectIds as strings."""
+    return orjson.dumps(content, default=_default)
+
+class MongoJSONResponse(ORJSONResponse):
+    """Response for documents already in the response shape.
+
+    Returning it from a route skips FastAPI's response_model validation and
+    jsonable_encoder pass, so the route must produce the documented schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
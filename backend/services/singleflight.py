@@ -0,0 +1,127 @@
+import os
+import asyncio
+import socket
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from pymongo.errors import DuplicateKeyError
+from config.settings import load_env
+from config.database import get_inflight_locks_collection
+from services.metrics import registry, Gauge
+
+load_env()
+
+# Cross-worker coordination through Mongo; only useful together with a shared
+# result store such as RECIPE_CACHE_SHARED.
+SINGLEFLIGHT_SHARED = os.getenv("SINGLEFLIGHT_SHARED", "false").lower() == "true"
+SINGLEFLIGHT_LOCK_TTL_SECONDS = int(os.getenv("SINGLEFLIGHT_LOCK_TTL_SECONDS", "90"))
+SINGLEFLIGHT_POLL_INTERVAL_SECONDS = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL_SECONDS", "0.25"))
+
+T = TypeVar("T")
+
+_owner = f"{socket.gethostname()}-{os.getpid()}"
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Share one in-flight coroutine between concurrent callers with the same key.
+
+    The shared work runs in its own task, so a waiter that disconnects only
+    stops waiting; the work is cancelled once every waiter has gone.
+    Exceptions raised by the work propagate to every waiter.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Last waiter gone: stop the work and let new callers start afresh
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+async def acquire_shared_lock(key: str) -> bool:
+    """Try to become the one worker computing key. Expired locks are taken over."""
+    now = datetime.utcnow()
+    locks = get_inflight_locks_collection()
+    try:
+        await locks.insert_one({
+            "_id": key,
+            "owner": _owner,
+            "expires_at": now + timedelta(seconds=SINGLEFLIGHT_LOCK_TTL_SECONDS)
+        })
+        return True
+    except DuplicateKeyError:
+        result = await locks.update_one(
+            {"_id": key, "expires_at": {"$lt": now}},
+            {"$set": {"owner": _owner, "expires_at": now + timedelta(seconds=SINGLEFLIGHT_LOCK_TTL_SECONDS)}}
+        )
+        return result.modified_count == 1
+
+async def release_shared_lock(key: str):
+    await get_inflight_locks_collection().delete_one({"_id": key, "owner": _owner})
+
+async def wait_for_shared_result(
+    key: str,
+    fetch: Callable[[], Awaitable[Optional[T]]],
+    timeout: float = SINGLEFLIGHT_LOCK_TTL_SECONDS
+) -> Optional[T]:
+    """Poll for another worker's result until it appears or its lock goes away."""
+    locks = get_inflight_locks_collection()
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(SINGLEFLIGHT_POLL_INTERVAL_SECONDS)
+        result = await fetch()
+        if result is not None:
+            return result
+        if not await locks.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"_id": 1}):
+            return await fetch()
+    return None
+
+_flights: List[SingleFlight] = []
+
+def create_flight(name: str) -> SingleFlight:
+    flight = SingleFlight(name)
+    _flights.append(flight)
+    return flight
+
+singleflight_calls = registry.register(Gauge(
+    "singleflight_calls", "Upstream calls started (leader) or shared (coalesced)", ("flight", "role")
+))
+
+def _collect_singleflight():
+    for flight in _flights:
+        singleflight_calls.set(flight.leaders, flight=flight.name, role="leader")
+        singleflight_calls.set(flight.coalesced, flight=flight.name, role="coalesced")
+
+registry.register_collector(_collect_singleflight)
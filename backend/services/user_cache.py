@@ -0,0 +1,74 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from config.settings import load_env
+
+load_env()
+
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# The only fields authentication needs; never pull the full user document.
+USER_PROJECTION = {"_id": 1, "email": 1, "is_active": 1}
+
+class UserCache:
+    """Bounded TTL/LRU cache of minimal user projections.
+
+    Entries are keyed by (subject, token expiry) and never outlive the token
+    they were loaded for. Authentication checks is_active on every request,
+    so a change made directly in the database applies within ttl_seconds;
+    code that changes a user calls invalidate_user to apply it at once on
+    this worker.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Dict]]" = OrderedDict()
+        self._keys_by_subject: Dict[str, Set[Tuple[str, int]]] = {}
+
+    def get(self, subject: str, token_exp: int) -> Optional[Dict]:
+        key = (subject, token_exp)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.time():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return user
+
+    def set(self, subject: str, token_exp: int, user: Dict):
+        key = (subject, token_exp)
+        expires_at = min(time.time() + self.ttl_seconds, token_exp)
+        self._entries[key] = (expires_at, user)
+        self._entries.move_to_end(key)
+        self._keys_by_subject.setdefault(subject, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest, _ = next(iter(self._entries.items()))
+            self._discard(oldest)
+
+    def invalidate(self, subject: str):
+        """Drop every cached entry for a subject."""
+        for key in self._keys_by_subject.pop(subject, set()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_subject.clear()
+
+    def _discard(self, key: Tuple[str, int]):
+        self._entries.pop(key, None)
+        keys = self._keys_by_subject.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_subject[key[0]]
+
+user_cache = UserCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(email: str):
+    """Call after changing a user's is_active or email, or creating a user with that email."""
+    user_cache.invalidate(email)
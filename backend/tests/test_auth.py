@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from routers import auth
+from routers.auth import create_access_token, get_current_user, get_current_user_id
+from services.user_cache import invalidate_user, user_cache
+
+EMAIL = "cook@example.com"
+
+class FakeUsers:
+    def __init__(self, *users):
+        self.users = list(users)
+        self.lookups = 0
+
+    async def find_one(self, query, projection=None):
+        self.lookups += 1
+        return next((dict(user) for user in self.users if user["email"] == query["email"]), None)
+
+@pytest.fixture
+def users(monkeypatch) -> FakeUsers:
+    users = FakeUsers({"_id": ObjectId(), "email": EMAIL, "is_active": True})
+    monkeypatch.setattr(auth, "get_users_collection", lambda: users)
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret")
+    user_cache.clear()
+    yield users
+    user_cache.clear()
+
+def token(**claims) -> str:
+    return create_access_token({"sub": EMAIL, **claims})
+
+def user_id_for(token: str) -> str:
+    return asyncio.run(get_current_user_id(token))
+
+def test_uid_and_legacy_tokens_resolve_to_the_user(users):
+    user_id = str(users.users[0]["_id"])
+    assert user_id_for(token(uid=user_id)) == user_id
+    assert user_id_for(token()) == user_id
+
+def test_lookups_are_cached_per_token(users):
+    uid_token = token(uid=str(users.users[0]["_id"]))
+    for _ in range(3):
+        user_id_for(uid_token)
+    assert users.lookups == 1
+
+def test_inactive_user_is_rejected(users):
+    users.users[0]["is_active"] = False
+    with pytest.raises(HTTPException) as error:
+        user_id_for(token(uid=str(users.users[0]["_id"])))
+    assert error.value.status_code == 401
+    with pytest.raises(HTTPException):
+        asyncio.run(get_current_user(token()))
+
+def test_deactivation_applies_once_the_user_is_invalidated(users):
+    uid_token = token(uid=str(users.users[0]["_id"]))
+    user_id_for(uid_token)
+    users.users[0]["is_active"] = False
+    invalidate_user(EMAIL)
+    with pytest.raises(HTTPException):
+        user_id_for(uid_token)
+
+def test_uid_of_a_removed_account_is_rejected(users):
+    with pytest.raises(HTTPException):
+        user_id_for(token(uid=str(ObjectId())))
@@ -0,0 +1,96 @@
+import pytest
+from services import circuit_breaker
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", failure_rate=0.5, slow_call_seconds=1.0, slow_call_rate=0.8,
+                          window=4, min_calls=4, open_seconds=10.0, half_open_probes=2)
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(4):
+        breaker.record_failure(breaker.acquire())
+    assert breaker.state == OPEN
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure(breaker.acquire())
+    assert breaker.state == CLOSED
+
+def test_opens_on_failure_rate_and_rejects(clock):
+    breaker = make_breaker()
+    for failed in (True, False, True, False):
+        probe = breaker.acquire()
+        breaker.record_failure(probe) if failed else breaker.record_success(probe, 0.1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.acquire()
+    assert error.value.retry_after == 10.0
+    assert breaker.rejected == 1
+    assert breaker.opens == 1
+
+def test_opens_on_slow_call_rate(clock):
+    breaker = make_breaker()
+    for elapsed in (0.1, 2.0, 2.0, 2.0):
+        breaker.record_success(breaker.acquire(), elapsed)
+    assert breaker.state == CLOSED
+    # The fast call slides out of the window
+    breaker.record_success(breaker.acquire(), 2.0)
+    assert breaker.state == OPEN
+
+def test_half_open_closes_after_successful_probes(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 5
+    assert breaker.retry_after() == 5.0
+    clock.now += 5
+    assert breaker.state == HALF_OPEN
+    probes = [breaker.acquire(), breaker.acquire()]
+    assert probes == [True, True]
+    assert not breaker.available()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.record_success(probes[0], 0.1)
+    assert breaker.state == HALF_OPEN
+    breaker.record_success(probes[1], 0.1)
+    assert breaker.state == CLOSED
+    # The window starts empty again after closing
+    for _ in range(3):
+        breaker.record_failure(breaker.acquire())
+    assert breaker.state == CLOSED
+
+@pytest.mark.parametrize("outcome", ["failure", "slow"])
+def test_half_open_probe_failure_reopens(clock, outcome):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 10
+    probe = breaker.acquire()
+    if outcome == "failure":
+        breaker.record_failure(probe)
+    else:
+        breaker.record_success(probe, 2.0)
+    assert breaker.state == OPEN
+    assert breaker.opens == 2
+
+def test_released_probe_frees_its_slot(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 10
+    probes = [breaker.acquire(), breaker.acquire()]
+    assert not breaker.available()
+    breaker.release(probes[0])
+    assert breaker.available()
+    assert breaker.state == HALF_OPEN
@@ -0,0 +1,29 @@
+import asyncio
+from services.job_service import JobManager
+
+def test_waiters_are_released_after_a_job_finishes():
+    async def run():
+        manager = JobManager(workers=1, queue_size=10, backend="local")
+        manager.register_handler("echo", lambda payload, user_id: asyncio.sleep(0, result=payload))
+        manager.start()
+        job = await manager.submit("echo", {"value": 1}, "user")
+        finished = await manager.wait(job["id"], "user", timeout=5)
+        await manager.stop()
+        return manager, finished
+
+    manager, finished = asyncio.run(run())
+    assert finished["status"] == "succeeded"
+    assert finished["result"] == {"value": 1}
+    assert manager._waiters == {}
+
+def test_wait_for_a_missing_job_returns_none():
+    async def run():
+        manager = JobManager(workers=1, queue_size=10, backend="local")
+        manager.start()
+        job = await manager.wait("missing", "user", timeout=1)
+        await manager.stop()
+        return manager, job
+
+    manager, job = asyncio.run(run())
+    assert job is None
+    assert manager._waiters == {}
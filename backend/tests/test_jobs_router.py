@@ -0,0 +1,41 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from routers import auth, jobs
+from routers.auth import create_access_token
+from services.user_cache import user_cache
+
+USER_ID = ObjectId()
+EMAIL = "cook@example.com"
+
+class FakeUsers:
+    async def find_one(self, query, projection=None):
+        if query["email"] == EMAIL:
+            return {"_id": USER_ID, "email": EMAIL, "is_active": True}
+        return None
+
+async def get_job(job_id, user_id):
+    if user_id != str(USER_ID):
+        return None
+    return {"id": job_id, "kind": "random", "status": "succeeded", "result": {"id": "r1"}, "created_at": datetime.utcnow()}
+
+@pytest.fixture
+def client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(auth, "get_users_collection", lambda: FakeUsers())
+    monkeypatch.setattr(jobs.job_manager, "get", get_job)
+    user_cache.clear()
+    app = FastAPI()
+    app.include_router(jobs.router, prefix="/api/jobs")
+    yield TestClient(app)
+    user_cache.clear()
+
+@pytest.mark.parametrize("claims", [{"uid": str(USER_ID)}, {}])
+def test_websocket_accepts_uid_and_legacy_tokens(client, claims):
+    token = create_access_token({"sub": EMAIL, **claims})
+    with client.websocket_connect(f"/api/jobs/job-1/ws?token={token}") as websocket:
+        message = websocket.receive_json()
+    assert message["status"] == "succeeded"
+    assert message["id"] == "job-1"
@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+from services import llm_router
+from services.llm_router import LLMRouter, parse_routes
+
+def fake_upstream(latencies, calls):
+    """chat_completion stand-in taking latencies[base_url] seconds."""
+    async def chat_completion(base_url=None, model=None, **kwargs):
+        calls.append(base_url)
+        await asyncio.sleep(latencies[base_url])
+        return SimpleNamespace(usage=None, choices=[])
+    return chat_completion
+
+def slow_primary_router(monkeypatch, routes, latencies, calls):
+    monkeypatch.setattr(llm_router, "chat_completion", fake_upstream(latencies, calls))
+    monkeypatch.setattr(llm_router, "LLM_HEDGING_ENABLED", True)
+    router = LLMRouter("recipe", parse_routes(routes))
+    # Short hedge delay without needing LLM_HEDGE_MIN_SAMPLES warm-up calls
+    router.hedge_delay = lambda backend: 0.01
+    return router
+
+def test_single_backend_is_not_hedged_by_default(monkeypatch):
+    calls = []
+    router = slow_primary_router(monkeypatch, "m@a", {"a": 0.05}, calls)
+    asyncio.run(router.complete(messages=[]))
+    assert calls == ["a"]
+    assert router.hedges == 0
+
+def test_single_backend_hedges_against_itself_when_enabled(monkeypatch):
+    calls = []
+    router = slow_primary_router(monkeypatch, "m@a", {"a": 0.05}, calls)
+    monkeypatch.setattr(llm_router, "LLM_HEDGE_SAME_BACKEND", True)
+    asyncio.run(router.complete(messages=[]))
+    assert calls == ["a", "a"]
+    assert router.hedges == 1
+
+def test_cancelled_loser_does_not_record_latency(monkeypatch):
+    calls = []
+    router = slow_primary_router(monkeypatch, "m@a,m@b", {"a": 0.2, "b": 0.01}, calls)
+    asyncio.run(router.complete(messages=[]))
+    primary, secondary = router.backends
+    assert router.hedge_wins == 1
+    assert list(primary._latencies) == []
+    assert len(secondary._latencies) == 1
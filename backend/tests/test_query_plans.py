@@ -0,0 +1,53 @@
+"""Explain the API's history, search, favorites and export queries against a real mongod.
+
+The explain tests are skipped unless MONGODB_URL is set; explain is not
+available on mongomock.
+"""
+import asyncio
+import os
+import pytest
+from scripts.check_query_plans import plan_stages
+
+needs_mongod = pytest.mark.skipif(not os.getenv("MONGODB_URL"), reason="needs a real mongod in MONGODB_URL")
+
+@pytest.fixture(scope="module")
+def explains():
+    from config.database import close_db_connection
+    from scripts.check_query_plans import collect_explains
+
+    async def run():
+        try:
+            return await collect_explains()
+        finally:
+            await close_db_connection()
+    return asyncio.run(run())
+
+QUERIES = [
+    "history_first_page", "history_next_page", "export", "favorites",
+    "search_all", "search_text", "search_cuisine", "search_diet_and_time",
+    "search_calories", "search_text_and_filters"
+]
+
+def test_plan_stages_ignore_rejected_plans():
+    explain = {
+        "queryPlanner": {
+            "winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+            "rejectedPlans": [{"stage": "COLLSCAN"}]
+        }
+    }
+    assert plan_stages(explain) == {"FETCH", "IXSCAN"}
+
+def test_collection_scan_in_a_nested_winning_plan_is_found():
+    explain = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}}]}
+    assert "COLLSCAN" in plan_stages(explain)
+
+@needs_mongod
+def test_every_query_is_explained(explains):
+    assert sorted(explains) == sorted(QUERIES)
+
+@needs_mongod
+@pytest.mark.parametrize("name", QUERIES)
+def test_query_uses_an_index(explains, name):
+    names = plan_stages(explains[name])
+    assert names, f"{name} has no winning plan"
+    assert "COLLSCAN" not in names, f"{name} scans the collection: {sorted(names)}"
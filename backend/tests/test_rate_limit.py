@@ -0,0 +1,56 @@
+import pytest
+from services import rate_limit
+from services.rate_limit import RateLimiter, parse_costs
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def test_burst_then_limited_with_retry_after(clock):
+    # 10 units, one unit back every 6 seconds
+    limiter = RateLimiter(capacity=10, refill_per_minute=10, max_users=10)
+    assert limiter.take_local("user", 4).remaining == 6
+    assert limiter.take_local("user", 6).remaining == 0
+    result = limiter.take_local("user", 2)
+    assert not result.allowed
+    assert result.retry_after == pytest.approx(12)
+
+def test_refill_is_proportional_to_elapsed_time_and_capped(clock):
+    limiter = RateLimiter(capacity=10, refill_per_minute=10, max_users=10)
+    limiter.take_local("user", 10)
+    clock.now += 18
+    result = limiter.take_local("user", 3)
+    assert result.allowed
+    assert result.remaining == pytest.approx(0)
+    clock.now += 3600
+    assert limiter.take_local("user", 1).remaining == pytest.approx(9)
+
+def test_cost_above_capacity_needs_a_full_bucket(clock):
+    limiter = RateLimiter(capacity=10, refill_per_minute=10, max_users=10)
+    assert limiter.take_local("user", 25).allowed
+    result = limiter.take_local("user", 25)
+    assert not result.allowed
+    assert result.retry_after == pytest.approx(60)
+
+def test_users_have_separate_buckets_and_lru_eviction(clock):
+    limiter = RateLimiter(capacity=5, refill_per_minute=0, max_users=2)
+    limiter.take_local("a", 5)
+    limiter.take_local("b", 5)
+    assert not limiter.take_local("a", 1).allowed
+    limiter.take_local("c", 5)
+    # "b" was least recently used and comes back with a full bucket
+    assert limiter.take_local("b", 1).allowed
+    # No refill at all: the retry hint falls back to an hour
+    assert limiter.take_local("c", 1).retry_after == 3600.0
+
+def test_parse_costs():
+    assert parse_costs("text=1, image=4,,batch = 0.5") == {"text": 1.0, "image": 4.0, "batch": 0.5}
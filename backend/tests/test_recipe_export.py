@@ -0,0 +1,152 @@
+import asyncio
+import json
+import zlib
+import pytest
+from bson import ObjectId
+from routers import recipe as recipe_router
+from services import recipe_export, recipe_index as index_module, recipe_writer
+from services.recipe_export import _iter_lines, import_recipes
+from services.recipe_index import RecipeIndex
+
+def collect(chunks, compressed=False):
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def run():
+        return [line async for line in _iter_lines(source(), compressed)]
+    return asyncio.run(run())
+
+def gzip(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def test_lines_split_across_chunks():
+    assert collect([b'{"a": 1}\n{"b"', b': 2}\n', b'{"c": 3}']) == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+def test_gzip_stream_in_small_chunks(monkeypatch):
+    monkeypatch.setattr(recipe_export, "IMPORT_DECOMPRESS_CHUNK_BYTES", 64)
+    lines = [f'{{"n": {index}}}'.encode() for index in range(500)]
+    compressed = gzip(b"\n".join(lines) + b"\n")
+    chunks = [compressed[start:start + 100] for start in range(0, len(compressed), 100)]
+    assert collect(chunks, compressed=True) == lines
+
+def test_long_complete_line_inside_a_chunk_is_rejected(monkeypatch):
+    monkeypatch.setattr(recipe_export, "IMPORT_MAX_LINE_BYTES", 100)
+    with pytest.raises(ValueError):
+        collect([b"x" * 200 + b"\nshort\n"])
+
+def test_gzip_bomb_is_rejected_before_full_expansion(monkeypatch):
+    monkeypatch.setattr(recipe_export, "IMPORT_MAX_LINE_BYTES", 1024)
+    expanded = []
+    real_decompressobj = zlib.decompressobj
+
+    class CountingDecompressor:
+        def __init__(self, wbits):
+            self._inner = real_decompressobj(wbits)
+
+        @property
+        def unconsumed_tail(self):
+            return self._inner.unconsumed_tail
+
+        def decompress(self, data, max_length=0):
+            out = self._inner.decompress(data, max_length)
+            expanded.append(len(out))
+            return out
+
+        def flush(self):
+            return self._inner.flush()
+
+    monkeypatch.setattr(recipe_export.zlib, "decompressobj", CountingDecompressor)
+    # 64 MB of zeros compresses to about 64 KB
+    with pytest.raises(ValueError):
+        collect([gzip(b"0" * (64 * 1024 * 1024))], compressed=True)
+    assert sum(expanded) <= 2 * recipe_export.IMPORT_DECOMPRESS_CHUNK_BYTES
+
+def matches(doc, query) -> bool:
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if "$exists" in condition and (field in doc) != condition["$exists"]:
+                return False
+            if "$ne" in condition and doc.get(field) == condition["$ne"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeRecipes:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self.docs.append(dict(doc))
+
+    async def find_one(self, query, projection=None):
+        return next((dict(doc) for doc in self.docs if matches(doc, query)), None)
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+RECIPE = {
+    "title": "Garlic chicken rice",
+    "ingredients": ["2 chicken breasts", "1 cup rice", "3 cloves garlic"],
+    "instructions": ["Cook everything."],
+    "cooking_time": 30,
+    "servings": 2
+}
+
+def test_imported_recipes_are_never_served_to_other_users(monkeypatch):
+    recipes = FakeRecipes()
+    index = RecipeIndex()
+    index.ready = True
+
+    async def no_version_bump(*args):
+        pass
+
+    for module in (recipe_writer, index_module, recipe_router):
+        monkeypatch.setattr(module, "get_recipes_collection", lambda: recipes)
+    monkeypatch.setattr(recipe_writer, "recipe_index", index)
+    monkeypatch.setattr(recipe_router, "recipe_index", index)
+    monkeypatch.setattr(recipe_writer, "touch_recipes_versions", no_version_bump)
+    monkeypatch.setattr(recipe_export, "touch_recipes_version", no_version_bump)
+
+    async def upload():
+        yield json.dumps(RECIPE).encode() + b"\n"
+
+    async def run():
+        result = await import_recipes(upload(), str(ObjectId()))
+        await index.catch_up()
+        retrieved = await recipe_router.retrieve_stored_recipe(["chicken", "rice", "garlic"], None, 0.5)
+        # Even an id that reached the index some other way is not loaded
+        loaded = await recipe_router._load_stored_recipe([str(recipes.docs[0]["_id"])])
+        return result, retrieved, loaded
+
+    result, retrieved, loaded = asyncio.run(run())
+    assert result["imported"] == 1
+    assert recipes.docs[0]["imported"] is True
+    assert len(index) == 0
+    assert retrieved is None
+    assert loaded is None
+
+    # A generated recipe with the same ingredients is still shared
+    recipes.docs.append({**RECIPE, "_id": ObjectId(), "user_id": str(ObjectId())})
+    asyncio.run(index.catch_up())
+    assert len(index) == 1
@@ -0,0 +1,42 @@
+import pytest
+from bson import ObjectId
+from services.recipe_index import RecipeIndex
+
+def make_index() -> RecipeIndex:
+    index = RecipeIndex()
+    index.add({
+        "_id": ObjectId(),
+        "ingredients": ["2 chicken breasts", "1 cup rice", "3 cloves garlic"],
+        "cuisine_type": "Asian",
+        "cooking_time": 30
+    })
+    index.add({
+        "_id": ObjectId(),
+        "ingredients": ["500 g beef", "2 onions", "1 cup rice"],
+        "cuisine_type": "Mexican",
+        "cooking_time": 120
+    })
+    return index
+
+def test_search_ranks_by_coverage():
+    matches = make_index().search(["chicken", "rice", "garlic"])
+    assert matches[0][1] == 1.0
+    assert len(matches) == 2
+
+@pytest.mark.parametrize("cooking_time, expected", [
+    (30, 1),
+    ("30", 1),
+    ("30 minutes", 1),
+    ("2 hours", 2),
+    ("quick", 2),
+    ("", 2)
+])
+def test_cooking_time_preference_is_parsed_or_ignored(cooking_time, expected):
+    matches = make_index().search(["rice"], {"cookingTime": cooking_time})
+    assert len(matches) == expected
+
+def test_sample_respects_filters():
+    index = make_index()
+    assert len(index.sample({"cuisineType": "mexican"}, limit=5)) == 1
+    assert len(index.sample(None, limit=5)) == 2
+    assert RecipeIndex().sample() == []
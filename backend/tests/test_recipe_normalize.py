@@ -0,0 +1,42 @@
+import json
+import os
+import pytest
+from services.recipe_normalize import coerce_minutes, normalize_recipe_output
+
+FIXTURES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "malformed_recipes.jsonl"
+)
+
+def load_cases():
+    with open(FIXTURES) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+CASES = load_cases()
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_malformed_output_is_repaired(case):
+    recipe, missing = normalize_recipe_output(case["output"])
+    assert sorted(missing) == sorted(case["missing"])
+    for field, value in case["expected"].items():
+        assert recipe.get(field) == value, field
+    for field in case.get("absent", []):
+        assert field not in recipe
+
+@pytest.mark.parametrize("value, minutes", [
+    (30, 30),
+    ("30", 30),
+    ("30 minutes", 30),
+    ("45m", 45),
+    ("1 hour 15 mins", 75),
+    ("1 hour and 5 minutes", 65),
+    ("1.5 hours", 90),
+    ("2 hrs", 120),
+    ("1h30", 90),
+    ("1hr30min", 90),
+    ("1H 30M", 90),
+    ("0", None),
+    ("N/A", None),
+    (None, None)
+])
+def test_coerce_minutes(value, minutes):
+    assert coerce_minutes(value) == minutes
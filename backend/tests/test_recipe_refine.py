@@ -0,0 +1,74 @@
+import pytest
+from services.recipe_refine import (
+    convert_ingredient,
+    convert_temperatures,
+    format_amount,
+    parse_local_edit,
+    scale_ingredient,
+    scale_recipe
+)
+
+@pytest.mark.parametrize("value, expected", [
+    (0.5, "1/2"),
+    (0.25, "1/4"),
+    (0.125, "1/8"),
+    (1 / 3, "1/3"),
+    (1.5, "1 1/2"),
+    (2.98, "3"),
+    (0.2, "0.2"),
+    (0.1, "0.1"),
+    (0.3, "0.3"),
+    (12.4, "12")
+])
+def test_format_amount(value, expected):
+    assert format_amount(value) == expected
+
+@pytest.mark.parametrize("ingredient, factor, expected", [
+    ("2 cups flour", 2, "4 cups flour"),
+    ("1/2 tsp salt", 0.5, "1/4 tsp salt"),
+    ("1 1/2 cups milk", 2, "3 cups milk"),
+    ("2-3 cloves garlic", 2, "4-6 cloves garlic"),
+    ("½ onion", 3, "1 1/2 onion"),
+    ("salt to taste", 4, "salt to taste")
+])
+def test_scale_ingredient(ingredient, factor, expected):
+    assert scale_ingredient(ingredient, factor) == expected
+
+def test_scale_recipe_keeps_calories_per_serving():
+    recipe = {"servings": 2, "calories": 400, "ingredients": ["1 cup rice"]}
+    scaled = scale_recipe(recipe, 4)
+    assert scaled["servings"] == 4
+    assert scaled["calories"] == 400
+    assert scaled["ingredients"] == ["2 cup rice"]
+
+@pytest.mark.parametrize("ingredient, system, expected", [
+    ("1 cup milk", "metric", "235 ml milk"),
+    ("1 lb beef", "metric", "455 g beef"),
+    ("500 g beef", "imperial", "1 1/8 lb beef"),
+    ("250 ml stock", "imperial", "1.06 cups stock"),
+    ("1 cup milk", "imperial", "1 cup milk"),
+    ("2 eggs", "metric", "2 eggs")
+])
+def test_convert_ingredient(ingredient, system, expected):
+    assert convert_ingredient(ingredient, system) == expected
+
+@pytest.mark.parametrize("step, system, expected", [
+    ("Bake at 350°F for 20 minutes", "metric", "Bake at 180°C for 20 minutes"),
+    ("Bake at 350 °F", "metric", "Bake at 180°C"),
+    ("Bake at 350 degrees F", "metric", "Bake at 180°C"),
+    ("Preheat to 400F", "metric", "Preheat to 200°C"),
+    ("Roast at 180 C", "imperial", "Roast at 350°F"),
+    ("Roast at 180°C", "metric", "Roast at 180°C"),
+    ("Stir in 2 c sugar", "metric", "Stir in 2 c sugar")
+])
+def test_convert_temperatures(step, system, expected):
+    assert convert_temperatures(step, system) == expected
+
+@pytest.mark.parametrize("instruction, expected", [
+    ("make it for 6 servings", {"servings": 6}),
+    ("convert to metric", {"units": "metric"}),
+    ("make it spicier", {}),
+    (None, {})
+])
+def test_parse_local_edit(instruction, expected):
+    assert parse_local_edit(instruction) == expected
@@ -0,0 +1,49 @@
+import json
+import pytest
+from services.recipe_stream import IncrementalJSONParser
+
+RECIPE = {
+    "title": "Garlic \"rice\" \\ bowl",
+    "servings": 2,
+    "vegetarian": True,
+    "calories": None,
+    "ingredients": ["1 cup rice", "3 cloves garlic, minced"],
+    "nutrition": {"protein": 12, "tags": ["quick"]},
+    "instructions": ["Rinse the rice.", "Cook for 12 minutes."]
+}
+
+EXPECTED = [
+    ("field", "title", "Garlic \"rice\" \\ bowl"),
+    ("field", "servings", 2),
+    ("field", "vegetarian", True),
+    ("field", "calories", None),
+    ("item", "ingredients", "1 cup rice"),
+    ("item", "ingredients", "3 cloves garlic, minced"),
+    ("item", "instructions", "Rinse the rice."),
+    ("item", "instructions", "Cook for 12 minutes.")
+]
+
+def parse(text: str, chunk_size: int):
+    parser = IncrementalJSONParser()
+    events = []
+    for start in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[start:start + chunk_size]))
+    return parser, events
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 10000])
+def test_events_do_not_depend_on_chunking(chunk_size):
+    parser, events = parse(json.dumps(RECIPE, indent=2), chunk_size)
+    assert events == EXPECTED
+    assert parser.done
+
+def test_markdown_fence_and_trailing_text_are_ignored():
+    text = "```json\n" + json.dumps({"title": "Soup", "servings": 4}) + "\n```\n{\"title\": \"ignored\"}"
+    parser, events = parse(text, 3)
+    assert events == [("field", "title", "Soup"), ("field", "servings", 4)]
+    assert parser.done
+
+def test_scalar_is_reported_only_once_complete():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"servings": 1') == []
+    assert parser.feed("2, ") == [("field", "servings", 12)]
+    assert not parser.done
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from services import recipe_versions, recipe_writer as writer_module
+from services.recipe_writer import RecipeWriter
+
+def make_writer(durability: str = "sync", max_retries: int = 2) -> RecipeWriter:
+    return RecipeWriter(batch_size=10, flush_interval=0.01, max_pending=100, max_retries=max_retries, durability=durability)
+
+def test_sync_submit_resolves_after_a_failed_flush_is_retried(monkeypatch):
+    calls = []
+
+    async def flaky_write(docs):
+        calls.append(len(docs))
+        if len(calls) == 1:
+            raise KeyError("updated_at")
+        return {}
+
+    monkeypatch.setattr(writer_module, "write_recipes", flaky_write)
+
+    async def run():
+        writer = make_writer()
+        writer.start()
+        await asyncio.wait_for(writer.submit({"_id": ObjectId()}), 5)
+        await writer.stop()
+    asyncio.run(run())
+    assert calls == [1, 1]
+
+def test_sync_submit_raises_once_retries_are_exhausted(monkeypatch):
+    async def failing_write(docs):
+        raise KeyError("updated_at")
+
+    monkeypatch.setattr(writer_module, "write_recipes", failing_write)
+    dropped = writer_module.recipe_writes_dropped
+
+    async def run():
+        writer = make_writer(max_retries=1)
+        writer.start()
+        try:
+            await asyncio.wait_for(writer.submit({"_id": ObjectId()}), 5)
+        except RuntimeError as e:
+            return e
+        finally:
+            await writer.stop()
+
+    before = sum(dropped._values.values())
+    error = asyncio.run(run())
+    assert isinstance(error, RuntimeError)
+    assert sum(dropped._values.values()) == before + 1
+
+def test_async_writes_are_batched(monkeypatch):
+    batches = []
+
+    async def write(docs):
+        batches.append(len(docs))
+        return {}
+
+    monkeypatch.setattr(writer_module, "write_recipes", write)
+
+    async def run():
+        writer = make_writer(durability="async")
+        writer.start()
+        for _ in range(25):
+            await writer.submit({"_id": ObjectId()})
+        await writer.stop()
+    asyncio.run(run())
+    assert sum(batches) == 25
+    assert max(batches) == 10
+
+class FakeRecipes:
+    async def insert_many(self, docs, ordered=True):
+        pass
+
+class FakeUsers:
+    def __init__(self):
+        self.versions = {}
+
+    async def bulk_write(self, updates, ordered=True):
+        for update in updates:
+            user_id = update._filter["_id"]
+            updated_at = update._doc["$max"]["recipes_updated_at"]
+            self.versions[user_id] = max(self.versions.get(user_id, updated_at), updated_at)
+
+def test_retried_batch_landing_late_still_bumps_the_version(monkeypatch):
+    users = FakeUsers()
+    monkeypatch.setattr(writer_module, "get_recipes_collection", lambda: FakeRecipes())
+    monkeypatch.setattr(recipe_versions, "get_users_collection", lambda: users)
+    monkeypatch.setattr(writer_module.recipe_index, "add", lambda doc: False)
+    user_id = ObjectId()
+    submitted = datetime.utcnow()
+    older = {"_id": ObjectId(), "user_id": str(user_id), "updated_at": submitted}
+    newer = {"_id": ObjectId(), "user_id": str(user_id), "updated_at": submitted + timedelta(seconds=1)}
+
+    # The newer recipe is flushed first; the older one lands on a retry
+    asyncio.run(writer_module.write_recipes([newer]))
+    version = users.versions[user_id]
+    time.sleep(0.001)
+    asyncio.run(writer_module.write_recipes([older]))
+    assert users.versions[user_id] > version
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from services.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert (flight.leaders, flight.coalesced) == (1, 4)
+    assert flight.in_flight() == 0
+
+def test_error_propagates_to_every_waiter():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def scenario():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)), return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.in_flight() == 0
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "result"
+
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second
+
+    first, result = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result == "result"
+
+def test_last_waiter_cancelling_stops_the_work():
+    async def scenario():
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do("key", slow))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+        assert flight.in_flight() == 0
+
+        # A new caller starts the work afresh instead of joining the cancelled task
+        async def fast():
+            return "fresh"
+        assert await flight.do("key", fast) == "fresh"
+        assert flight.leaders == 2
+
+    asyncio.run(scenario())